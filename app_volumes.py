@@ -0,0 +1,207 @@
+# === Âm lượng riêng cho từng ứng dụng (audio session) ===
+# Luật lưu ngay trong volume_config.json, dưới khóa "apps" của từng thiết bị:
+#   "Speakers (Realtek Audio)": {"default": 0.5, "apps": {"discord.exe": 0.4, "chrome.exe": 0.7}}
+#
+# Session được đưa vào chỉ mục qua thông báo OnSessionCreated (cộng một lần liệt kê lúc
+# bắt đầu theo dõi endpoint), không liệt kê lại định kỳ. Chỉ mục theo tiến trình và theo
+# endpoint nên khi đổi thiết bị hay một ứng dụng mở ra chỉ các session liên quan bị chạm tới.
+#
+# Thông báo session của Windows cần apartment MTA, nên mọi thao tác session chạy trên
+# một luồng làm việc riêng (khởi tạo bằng init_thread), các callback COM chỉ xếp hàng việc.
+import logging
+import queue
+import threading
+from collections import namedtuple
+
+import device_events
+from device_registry import STATE_ACTIVE
+
+# volume: đối tượng có SetMasterVolume(level, context) (ISimpleAudioVolume)
+SessionEntry = namedtuple("SessionEntry", "key endpoint_id pid process volume")
+
+
+def process_name(pid):
+    # Tên file thực thi (chữ thường) của PID, None nếu tiến trình hệ thống/đã thoát
+    if not pid:
+        return None
+    try:
+        import psutil
+        return psutil.Process(pid).name().lower()
+    except Exception:
+        return None
+
+
+class SessionIndex:
+    def __init__(self):
+        self._sessions = {}     # key -> SessionEntry
+        self._by_process = {}   # tên tiến trình -> set(key)
+        self._by_endpoint = {}  # endpoint_id -> set(key)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, entry):
+        self.remove(entry.key)
+        self._sessions[entry.key] = entry
+        self._by_endpoint.setdefault(entry.endpoint_id, set()).add(entry.key)
+        if entry.process:
+            self._by_process.setdefault(entry.process, set()).add(entry.key)
+
+    def remove(self, key):
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            return None
+        self._discard(self._by_endpoint, entry.endpoint_id, key)
+        if entry.process:
+            self._discard(self._by_process, entry.process, key)
+        return entry
+
+    @staticmethod
+    def _discard(index, name, key):
+        keys = index.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[name]
+
+    def remove_endpoint(self, endpoint_id):
+        for key in list(self._by_endpoint.get(endpoint_id, ())):
+            self.remove(key)
+
+    def for_endpoint(self, endpoint_id):
+        return [self._sessions[key] for key in self._by_endpoint.get(endpoint_id, ())]
+
+    def for_process(self, process, endpoint_id=None):
+        entries = [self._sessions[key] for key in self._by_process.get(process, ())]
+        if endpoint_id is not None:
+            entries = [e for e in entries if e.endpoint_id == endpoint_id]
+        return entries
+
+
+class AppVolumeManager:
+    #   get_rules(endpoint_id) -> {tên_tiến_trình: mức} của thiết bị đó
+    #   watch_sessions(endpoint_id, on_created, on_expired) -> hàm hủy theo dõi
+    #       on_created(key, pid, volume), on_expired(key) có thể được gọi từ luồng bất kỳ
+    #   resolve_name(pid) -> tên tiến trình chữ thường hoặc None
+    def __init__(self, get_rules, watch_sessions, resolve_name=process_name, init_thread=None):
+        self.get_rules = get_rules
+        self.watch_sessions = watch_sessions
+        self.resolve_name = resolve_name
+        self.init_thread = init_thread
+        self.index = SessionIndex()
+        self.applied = 0  # số lần đặt âm lượng session, dùng để kiểm tra/đo đạc
+        self._watches = {}  # endpoint_id -> hàm hủy theo dõi
+        self._requests = queue.Queue()
+        self._thread = None
+
+    # --- Thao tác đồng bộ (chỉ gọi trên luồng làm việc) ---
+    def watch(self, endpoint_id):
+        if endpoint_id is None or endpoint_id in self._watches:
+            return False
+        self._watches[endpoint_id] = self.watch_sessions(
+            endpoint_id,
+            lambda key, pid, volume: self._submit(self.session_created, endpoint_id, key, pid, volume),
+            lambda key: self._submit(self.session_expired, key))
+        logging.debug("AppVolumeManager: Bắt đầu theo dõi session của endpoint %s", endpoint_id)
+        return True
+
+    def unwatch(self, endpoint_id):
+        unwatch = self._watches.pop(endpoint_id, None)
+        if unwatch is not None:
+            try:
+                unwatch()
+            except Exception as e:
+                logging.debug("AppVolumeManager: Lỗi khi hủy theo dõi endpoint %s: %s", endpoint_id, e)
+        self.index.remove_endpoint(endpoint_id)
+
+    def session_created(self, endpoint_id, key, pid, volume):
+        entry = SessionEntry(key, endpoint_id, pid, self.resolve_name(pid), volume)
+        self.index.add(entry)
+        if entry.process:
+            level = self.get_rules(endpoint_id).get(entry.process)
+            if level is not None:
+                self._apply(entry, level)
+
+    def session_expired(self, key):
+        self.index.remove(key)
+
+    def apply_endpoint(self, endpoint_id):
+        # Đổi thiết bị: chỉ các session đang chạy trên endpoint đó
+        rules = self.get_rules(endpoint_id)
+        if not rules:
+            return 0
+        count = 0
+        for entry in self.index.for_endpoint(endpoint_id):
+            level = rules.get(entry.process)
+            if level is not None and self._apply(entry, level):
+                count += 1
+        return count
+
+    def apply_process(self, process, endpoint_id=None):
+        # Luật của một ứng dụng vừa đổi: chỉ các session của tiến trình đó
+        count = 0
+        for entry in self.index.for_process(process.lower(), endpoint_id):
+            level = self.get_rules(entry.endpoint_id).get(entry.process)
+            if level is not None and self._apply(entry, level):
+                count += 1
+        return count
+
+    def _apply(self, entry, level):
+        try:
+            entry.volume.SetMasterVolume(level, None)
+            self.applied += 1
+            logging.info("AppVolumeManager: Đặt âm lượng %s%% cho %s (PID %s)", int(level * 100), entry.process, entry.pid)
+            return True
+        except Exception as e:
+            # Session đã hết hạn mà chưa kịp nhận thông báo
+            logging.debug("AppVolumeManager: Bỏ session %s sau lỗi: %s", entry.key, e)
+            self.index.remove(entry.key)
+            return False
+
+    def on_event(self, event):
+        if event.kind == device_events.DEVICE_REMOVED:
+            self._submit(self.unwatch, event.device_id)
+        elif event.kind == device_events.STATE_CHANGED:
+            # Endpoint bị tắt/bật lại: theo dõi lại từ đầu nếu còn hoạt động
+            self._submit(self.unwatch, event.device_id)
+            if event.state == STATE_ACTIVE:
+                self._submit(self.watch, event.device_id)
+
+    # --- Luồng làm việc ---
+    def start(self, endpoint_ids=()):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="AppVolumeManager", daemon=True)
+            self._thread.start()
+        for endpoint_id in endpoint_ids:
+            self._submit(self.watch, endpoint_id)
+
+    def stop(self):
+        self._requests.put(None)
+
+    def request_watch(self, endpoint_id):
+        self._submit(self.watch, endpoint_id)
+
+    def request_apply_endpoint(self, endpoint_id):
+        self._submit(self.watch, endpoint_id)
+        self._submit(self.apply_endpoint, endpoint_id)
+
+    def request_apply_process(self, process):
+        self._submit(self.apply_process, process)
+
+    def _submit(self, func, *args):
+        self._requests.put((func, args))
+
+    def _run(self):
+        if self.init_thread is not None:
+            self.init_thread()
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                logging.error("AppVolumeManager: Lỗi khi xử lý session: %s", e)
+        for endpoint_id in list(self._watches):
+            self.unwatch(endpoint_id)
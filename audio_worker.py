@@ -0,0 +1,138 @@
+# === Luồng âm thanh duy nhất sở hữu mọi đối tượng COM ===
+# Duyệt thiết bị, đặt âm lượng, đổi thiết bị mặc định... đều là lệnh xếp vào một hàng
+# đợi và chạy lần lượt trên luồng này (đã CoInitialize một lần), nên handle COM không
+# bao giờ bị dùng chéo apartment và không có hai lời gọi âm thanh chạy song song.
+# submit() trả về Future; call() chờ kết quả (gọi từ chính luồng âm thanh thì chạy ngay).
+#
+# Gom lệnh: mỗi lần thức dậy, luồng lấy hết các lệnh đang chờ (đến dồn dập trong lúc
+# nó bận) và chạy trong một lượt. Các lệnh cùng `key` trong một lượt chỉ chạy lần cuối,
+# mọi Future của chúng nhận chung kết quả (vd. ba lần duyệt lại thiết bị → một lần,
+# năm lần kéo âm lượng của cùng thiết bị → chỉ đặt mức cuối).
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+from metrics import metrics
+
+MAX_BATCH = 64
+
+_Command = namedtuple("_Command", "func args key future queued_at")
+
+
+class AudioWorker:
+    #   init_thread(): khởi tạo COM cho luồng âm thanh
+    #   batch_window: giây chờ thêm lệnh sau lệnh đầu tiên (0 = chỉ gom lệnh đã có sẵn)
+    def __init__(self, init_thread=None, batch_window=0.0, max_batch=MAX_BATCH, name="AudioWorker"):
+        self.init_thread = init_thread
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._requests = queue.Queue()
+        self._thread = None
+        self._thread_id = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    # --- Phía người gọi ---
+    def submit(self, func, *args, key=None):
+        future = Future()
+        if self._stopped:
+            future.set_exception(RuntimeError("AudioWorker đã dừng"))
+            return future
+        self._ensure_started()
+        self._requests.put(_Command(func, args, key, future, time.perf_counter()))
+        return future
+
+    def call(self, func, *args, key=None, timeout=None):
+        if threading.get_ident() == self._thread_id:
+            return func(*args)  # lệnh đang chạy trên luồng âm thanh gọi tiếp: không xếp hàng
+        return self.submit(func, *args, key=key).result(timeout)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is not None:
+            self._requests.put(None)
+
+    # --- Luồng âm thanh ---
+    def _run(self):
+        self._thread_id = threading.get_ident()
+        if self.init_thread is not None:
+            try:
+                self.init_thread()
+            except Exception as e:
+                logging.error("AudioWorker: Không khởi tạo được COM cho luồng âm thanh: %s", e)
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            self.run_batch(batch)
+        # Lệnh đến sau khi dừng không bao giờ chạy: báo lỗi thay vì để người gọi chờ mãi
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("AudioWorker đã dừng"))
+
+    def _next_batch(self):
+        item = self._requests.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._requests.put(None)  # dừng sau khi chạy xong lượt này
+                break
+            batch.append(item)
+        return batch
+
+    def run_batch(self, batch):
+        self.batches += 1
+        last = {}
+        for i, command in enumerate(batch):
+            if command.key is not None:
+                last[command.key] = i
+        followers = {}
+        for i, command in enumerate(batch):
+            if command.key is not None and last[command.key] != i:
+                followers.setdefault(last[command.key], []).append(command.future)
+                self.coalesced += 1
+
+        for i, command in enumerate(batch):
+            if command.key is not None and last[command.key] != i:
+                continue
+            futures = [command.future] + followers.get(i, [])
+            futures = [f for f in futures if f.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            metrics.observe("audio_queue_wait", time.perf_counter() - command.queued_at)
+            try:
+                result = command.func(*command.args)
+            except Exception as e:
+                logging.debug("AudioWorker: Lệnh %s lỗi: %s", getattr(command.func, "__name__", command.func), e)
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future in futures:
+                    future.set_result(result)
+            self.executed += 1
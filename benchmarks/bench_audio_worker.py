@@ -0,0 +1,89 @@
+# Đo AudioWorker trên backend giả lập: thời gian luồng giao diện bị chặn khi gửi lệnh
+# (chỉ xếp hàng), và số lời gọi COM thực sự khi nhiều luồng gửi dồn dập lệnh duyệt lại
+# thiết bị + đặt âm lượng (được gom và gộp theo key) so với chạy thẳng từng lệnh.
+#   python benchmarks/bench_audio_worker.py [số_luồng] [số_lệnh_mỗi_luồng] [độ_trễ_COM_ms]
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigCache  # noqa: E402
+from engine import VolumeEngine  # noqa: E402
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+
+
+def make_engine(latency, tmp):
+    backend = SimulatedAudioBackend(8, latency)
+    engine = VolumeEngine(config=ConfigCache(os.path.join(tmp, "volume_config.json"), flush_delay=None),
+                          **backend.engine_options())
+    engine.refresh_devices()
+    backend.calls.clear()
+    return backend, engine
+
+
+def burst(engine, threads, commands):
+    # Mỗi luồng gửi xen kẽ lệnh duyệt lại và đặt âm lượng, không chờ kết quả từng lệnh
+    futures = []
+    submit_us = []
+    lock = threading.Lock()
+
+    def worker(n):
+        local, timings = [], []
+        for i in range(commands):
+            start = time.perf_counter()
+            if i % 4 == 0:
+                local.append(engine.refresh_devices_async())
+            else:
+                local.append(engine.set_volume_async(((n + i) % 100) / 100))
+            timings.append((time.perf_counter() - start) * 1e6)
+        with lock:
+            futures.extend(local)
+            submit_us.extend(timings)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    for future in futures:
+        future.result()
+    return (time.perf_counter() - start) * 1000, max(submit_us), len(futures)
+
+
+def run(threads, commands, latency):
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, engine = make_engine(latency, tmp)
+        start = time.perf_counter()
+        for i in range(threads * commands):
+            if i % 4 == 0:
+                engine.registry.refresh()
+            else:
+                engine.volume_pool.set_volume(engine.registry.default_id(), (i % 100) / 100)
+        direct_ms = (time.perf_counter() - start) * 1000
+        direct_calls = dict(backend.calls)
+
+        backend.calls.clear()
+        worker_ms, max_submit_us, submitted = burst(engine, threads, commands)
+        results = {
+            "threads": threads,
+            "commands": submitted,
+            "com_latency_ms": latency * 1000,
+            "direct": {"elapsed_ms": direct_ms, "com_calls": direct_calls},
+            "worker": {"elapsed_ms": worker_ms, "com_calls": dict(backend.calls),
+                       "max_submit_us": max_submit_us, "executed": engine.audio.executed,
+                       "coalesced": engine.audio.coalesced, "batches": engine.audio.batches},
+        }
+        engine.stop()
+    return results
+
+
+if __name__ == "__main__":
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_commands = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    print(json.dumps(run(n_threads, n_commands, latency_ms / 1000), indent=4))
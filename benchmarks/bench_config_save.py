@@ -0,0 +1,54 @@
+# Đo thông lượng save_config: ghi lại toàn bộ file mỗi lần (cách cũ)
+# so với write-behind của config_store (gom thay đổi, ghi nguyên tử một lần).
+#   python benchmarks/bench_config_save.py [số_lần_cập_nhật]
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigCache  # noqa: E402
+
+
+def legacy_save(path, device_name, volume_level, context="default"):
+    # Cách cũ: đọc → sửa → json.dump(indent=4) ghi đè trực tiếp
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.setdefault(device_name, {})[context] = volume_level
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4)
+
+
+def run(updates, devices=20):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "volume_config.json")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+        start = time.perf_counter()
+        for i in range(updates):
+            legacy_save(path, f"Device {i % devices}", (i % 100) / 100)
+        elapsed = time.perf_counter() - start
+        results["legacy_rewrite"] = {"seconds": elapsed, "updates_per_s": updates / elapsed, "writes": updates}
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+        cache = ConfigCache(path, flush_delay=60)
+        start = time.perf_counter()
+        for i in range(updates):
+            cache.update(f"Device {i % devices}", (i % 100) / 100)
+        cache.flush()
+        elapsed = time.perf_counter() - start
+        results["write_behind"] = {"seconds": elapsed, "updates_per_s": updates / elapsed, "writes": cache.writes}
+
+        with open(path, "r", encoding="utf-8") as f:
+            assert len(json.load(f)) == min(devices, updates)
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(json.dumps(run(n), indent=4))
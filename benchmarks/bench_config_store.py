@@ -0,0 +1,71 @@
+# So sánh hai nơi lưu cấu hình ở quy mô 1k thiết bị × 10 ngữ cảnh: ConfigCache (JSON,
+# mỗi thay đổi được ghi xuống đĩa = ghi lại cả file) và SQLiteStore (mỗi thay đổi một
+# transaction nhỏ). Đo: chuyển dữ liệu/nạp lần đầu, một lần cập nhật đã ghi bền, tra cứu.
+#   python benchmarks/bench_config_store.py [số_thiết_bị] [số_ngữ_cảnh] [số_lần_cập_nhật]
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigCache  # noqa: E402
+from sqlite_store import SQLiteStore  # noqa: E402
+
+
+def make_config(devices, contexts):
+    return {f"Device {d}": {f"ctx{c}" if c else "default": ((d + c) % 100) / 100 for c in range(contexts)}
+            for d in range(devices)}
+
+
+def time_updates(store, devices, contexts, updates):
+    start = time.perf_counter()
+    for i in range(updates):
+        store.update(f"Device {(i * 7) % devices}", (i % 100) / 100, f"ctx{i % contexts}" if i % contexts else "default")
+        store.flush()  # mỗi thay đổi đều được ghi xuống đĩa
+    return (time.perf_counter() - start) / updates * 1000
+
+
+def time_lookups(store, devices, lookups=10000):
+    start = time.perf_counter()
+    for i in range(lookups):
+        store.get().get(f"Device {i % devices}", {}).get("default")
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def run(devices, contexts, updates):
+    results = {"devices": devices, "contexts": contexts, "updates": updates}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "volume_config.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(make_config(devices, contexts), f, indent=4)
+        results["json_file_bytes"] = os.path.getsize(json_path)
+
+        cache = ConfigCache(json_path, flush_delay=None)
+        start = time.perf_counter()
+        cache.get()
+        load_ms = (time.perf_counter() - start) * 1000
+        results["json"] = {"load_ms": load_ms,
+                           "update_ms": time_updates(cache, devices, contexts, updates),
+                           "lookup_us": time_lookups(cache, devices)}
+
+        start = time.perf_counter()
+        store = SQLiteStore(os.path.join(tmp, "volume_config.db"), json_path=json_path)
+        migrate_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        store.get()
+        load_ms = (time.perf_counter() - start) * 1000
+        results["sqlite"] = {"migrate_ms": migrate_ms, "load_ms": load_ms,
+                             "update_ms": time_updates(store, devices, contexts, updates),
+                             "lookup_us": time_lookups(store, devices),
+                             "history_rows": len(store.history("Device 0", limit=updates))}
+        store.close()
+    return results
+
+
+if __name__ == "__main__":
+    n_devices = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_contexts = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n_updates = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    print(json.dumps(run(n_devices, n_contexts, n_updates), indent=4))
@@ -0,0 +1,98 @@
+# Đo chi phí CPU của ContextEngine với hàng nghìn tiến trình giả lập: mỗi tick lấy
+# mẫu foreground, danh sách tiến trình chỉ quét lại sau scan_interval và chỉ tiến
+# trình mới bị hỏi tên. So sánh với cách quét toàn bộ và hỏi tên mọi tiến trình mỗi tick.
+#   python benchmarks/bench_context_profiles.py [số_tiến_trình] [số_tick] [ngân_sách_us_mỗi_tick]
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_profiles import ContextEngine, DEFAULT_RULES  # noqa: E402
+
+
+class FakeProcessSource:
+    # Bảng tiến trình giả: mỗi tick có vài tiến trình thoát/sinh mới và foreground đổi thỉnh thoảng
+    def __init__(self, processes, seed=1):
+        self.random = random.Random(seed)
+        names = list(DEFAULT_RULES) + [f"app{i}.exe" for i in range(200)]
+        self.names = names
+        self.table = {}
+        self.next_pid = 4
+        for _ in range(processes):
+            self.spawn()
+        self.foreground = self.random.choice(list(self.table))
+        self.identify_calls = 0
+
+    def spawn(self):
+        pid = self.next_pid
+        self.next_pid += 4
+        # Đa số là tiến trình không khớp luật
+        name = self.random.choice(self.names[len(DEFAULT_RULES):]) if self.random.random() < 0.99 \
+            else self.random.choice(self.names[:len(DEFAULT_RULES)])
+        self.table[pid] = (time.time(), name)
+
+    def churn(self, exits=2):
+        for pid in self.random.sample(list(self.table), exits):
+            del self.table[pid]
+        for _ in range(exits):
+            self.spawn()
+        if self.random.random() < 0.2 or self.foreground not in self.table:
+            self.foreground = self.random.choice(list(self.table))
+
+    def pids(self):
+        return list(self.table)
+
+    def identify(self, pid):
+        self.identify_calls += 1
+        return self.table.get(pid)
+
+    def foreground_pid(self):
+        return self.foreground
+
+
+def run(processes, ticks, budget_us):
+    results = {"processes": processes, "ticks": ticks}
+
+    # Cách cũ giả định: quét và hỏi tên mọi tiến trình ở mỗi tick
+    source = FakeProcessSource(processes)
+    rules = dict(DEFAULT_RULES)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        source.churn()
+        contexts = set()
+        for pid in source.pids():
+            info = source.identify(pid)
+            if info is not None and info[1] in rules:
+                contexts.add(rules[info[1]])
+    elapsed = time.perf_counter() - start
+    results["full_scan_every_tick"] = {"us_per_tick": elapsed / ticks * 1e6, "identify_calls": source.identify_calls}
+
+    # ContextEngine: tick 1 giây, quét lại danh sách mỗi 15 tick
+    source = FakeProcessSource(processes)
+    clock = [0.0]
+    engine = ContextEngine(DEFAULT_RULES, source=source, clock=lambda: clock[0],
+                           sample_interval=1.0, scan_interval=15.0)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        source.churn()
+        engine.sample()
+        clock[0] += 1.0
+    elapsed = time.perf_counter() - start
+    us_per_tick = elapsed / ticks * 1e6
+    results["context_engine"] = {"us_per_tick": us_per_tick, "identify_calls": source.identify_calls,
+                                 "cached_pids": len(engine._cache), "active_context": engine.active_context}
+    results["budget_us_per_tick"] = budget_us
+    results["within_budget"] = us_per_tick <= budget_us
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else 1000.0  # 1 ms mỗi giây lấy mẫu = 0.1% CPU
+    results = run(n, ticks, budget)
+    print(json.dumps(results, indent=4))
+    sys.exit(0 if results["within_budget"] else 1)
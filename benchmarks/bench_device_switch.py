@@ -0,0 +1,84 @@
+# Đo thời gian chuyển thiết bị mặc định + áp dụng âm lượng đã lưu (mục tiêu < 50 ms)
+# với registry, DeviceSwitcher và VolumeHandlePool thật trên lớp COM giả lập có độ trễ.
+#   python benchmarks/bench_device_switch.py [số_thiết_bị] [số_lần_chuyển] [độ_trễ_COM_ms]
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from device_registry import DeviceRegistry, EndpointRecord, RENDER, ROLES, STATE_ACTIVE  # noqa: E402
+from device_switch import DeviceSwitcher  # noqa: E402
+from volume_control import VolumeHandlePool  # noqa: E402
+
+BUDGET_MS = 50
+
+
+class FakeEndpointVolume:
+    def __init__(self, latency):
+        self.latency = latency
+        self.level = 1.0
+
+    def SetMasterVolumeLevelScalar(self, level, context):
+        time.sleep(self.latency)
+        self.level = level
+
+
+class FakeAudioSystem:
+    def __init__(self, devices, latency):
+        self.latency = latency
+        self.records = [EndpointRecord(f"dev-{i}", f"Device {i}", STATE_ACTIVE, RENDER) for i in range(devices)]
+        self.default = self.records[0].id
+        self.set_default_calls = 0
+        self.activations = 0
+
+    def enumerate_endpoints(self):
+        return list(self.records), {(RENDER, role): self.default for role in ROLES}
+
+    def set_default_endpoint(self, device_id):
+        for _ in ROLES:
+            time.sleep(self.latency)
+            self.set_default_calls += 1
+        self.default = device_id
+
+    def activate(self, device_id):
+        time.sleep(self.latency * 3)  # GetDevice + Activate + QueryInterface
+        self.activations += 1
+        return FakeEndpointVolume(self.latency)
+
+
+def run(devices, switches, latency):
+    system = FakeAudioSystem(devices, latency)
+    registry = DeviceRegistry(system.enumerate_endpoints)
+    pool = VolumeHandlePool(system.activate)
+    switcher = DeviceSwitcher(registry, system.set_default_endpoint,
+                              apply_volume=lambda device_id: pool.set_volume(device_id, 0.3))
+    registry.refresh()
+
+    timings = []
+    for _ in range(switches):
+        start = time.perf_counter()
+        switcher.cycle_next()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "devices": devices,
+        "switches": switches,
+        "com_latency_ms": latency * 1000,
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "max_ms": timings[-1],
+        "within_budget": timings[-1] < BUDGET_MS,
+        "enumerations": registry.enumerations,
+        "activations": system.activations,
+    }
+
+
+if __name__ == "__main__":
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    switches = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    print(json.dumps(run(devices, switches, latency_ms / 1000), indent=4))
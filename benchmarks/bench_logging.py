@@ -0,0 +1,66 @@
+# Đo chi phí mỗi vòng kiểm tra của DeviceMonitor (registry + tên thiết bị mặc định + log)
+# ở mức INFO và DEBUG với pipeline log bất đồng bộ (log_setup), so với handler ghi file
+# đồng bộ ở mức DEBUG như trước đây.
+#   python benchmarks/bench_logging.py [số_vòng]
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import TimedRotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_setup  # noqa: E402
+from device_events import DeviceMonitor, make_event, POLL  # noqa: E402
+from device_registry import DeviceRegistry, EndpointRecord, RENDER, ROLES, STATE_ACTIVE  # noqa: E402
+
+
+def make_monitor(devices=8):
+    records = [EndpointRecord(f"dev-{i}", f"Device {i}", STATE_ACTIVE, RENDER) for i in range(devices)]
+    registry = DeviceRegistry(lambda: (list(records), {(RENDER, role): "dev-0" for role in ROLES}))
+
+    def get_current_device():
+        registry.ensure_loaded()
+        return registry.name(registry.default_id())
+
+    def on_event(event):
+        registry.refresh()
+
+    return DeviceMonitor(get_current_device, lambda name, event: None, on_event=on_event)
+
+
+def time_checks(monitor, iterations):
+    events = [make_event(POLL)]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        monitor.check(events)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations):
+    results = {"iterations": iterations}
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Cách cũ: ghi file đồng bộ trên luồng gọi, mức DEBUG
+        handler = TimedRotatingFileHandler(os.path.join(log_dir, "sync.log"), when="midnight", encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        results["sync_debug_us_per_check"] = time_checks(make_monitor(), iterations)
+        root.removeHandler(handler)
+        handler.close()
+
+        # Pipeline mới: QueueHandler -> QueueListener, giới hạn dòng lặp lại
+        log_setup.setup_logging(log_dir, "DEBUG")
+        results["async_debug_us_per_check"] = time_checks(make_monitor(), iterations)
+        log_setup.set_log_level("INFO")
+        results["async_info_us_per_check"] = time_checks(make_monitor(), iterations)
+        log_setup.stop_logging()
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(json.dumps(run(n), indent=4))
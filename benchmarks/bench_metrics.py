@@ -0,0 +1,72 @@
+# Đo chi phí của lớp số liệu (metrics) trên đường nóng: DeviceMonitor.check và
+# VolumeHandlePool.set_volume, khi bật so với khi tắt. Thoát với mã 1 nếu chi phí thêm
+# mỗi lời gọi vượt ngân sách.
+#   python benchmarks/bench_metrics.py [số_vòng] [ngân_sách_us_mỗi_lời_gọi]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from device_events import DeviceMonitor, make_event, DEFAULT_CHANGED  # noqa: E402
+from device_registry import DeviceRegistry, EndpointRecord, RENDER, ROLES, STATE_ACTIVE  # noqa: E402
+from metrics import metrics  # noqa: E402
+from volume_control import VolumeHandlePool  # noqa: E402
+
+
+class FakeEndpointVolume:
+    def SetMasterVolumeLevelScalar(self, level, context):
+        self.level = level
+
+
+def make_monitor():
+    records = [EndpointRecord(f"dev-{i}", f"Device {i}", STATE_ACTIVE, RENDER) for i in range(8)]
+    registry = DeviceRegistry(lambda: (list(records), {(RENDER, role): "dev-0" for role in ROLES}))
+    registry.refresh()
+    return DeviceMonitor(lambda: registry.name(registry.default_id()), lambda name, event: None,
+                         on_event=registry.apply_event)
+
+
+def time_calls(iterations):
+    monitor = make_monitor()
+    pool = VolumeHandlePool(lambda device_id: FakeEndpointVolume())
+    events = [make_event(DEFAULT_CHANGED, "dev-0", RENDER, 1)]
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        monitor.check(events)
+    check_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        pool.set_volume("dev-0", (i % 100) / 100)
+    set_volume_us = (time.perf_counter() - start) / iterations * 1e6
+    return check_us, set_volume_us
+
+
+def run(iterations, budget_us):
+    metrics.enabled = False
+    check_off, set_off = time_calls(iterations)
+    metrics.enabled = True
+    metrics.reset()
+    check_on, set_on = time_calls(iterations)
+
+    overhead = max(check_on - check_off, set_on - set_off)
+    return {
+        "iterations": iterations,
+        "monitor_check_us": {"disabled": check_off, "enabled": check_on},
+        "set_volume_us": {"disabled": set_off, "enabled": set_on},
+        "max_overhead_us_per_call": overhead,
+        "budget_us_per_call": budget_us,
+        "within_budget": overhead <= budget_us,
+        "snapshot": metrics.snapshot()["histograms"],
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    results = run(n, budget)
+    print(json.dumps(results, indent=4))
+    sys.exit(0 if results["within_budget"] else 1)
@@ -0,0 +1,100 @@
+# Đo lịch âm lượng với đồng hồ giả: hàng nghìn luật ngẫu nhiên chạy qua một tuần bằng cách
+# nhảy thẳng tới từng mốc. So với cách lấy mẫu mỗi 5 giây và tính lại mọi luật, kiểm tra
+# giới hạn tại các thời điểm ngẫu nhiên (kể cả sau khi đồng hồ bị chỉnh lùi / máy ngủ qua
+# nhiều mốc) với cách tính trực tiếp.
+#   python benchmarks/bench_schedule.py [số_luật] [số_ngày] [số_thiết_bị]
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from volume_schedule import DAY_NAMES, VolumeSchedule, is_active, parse_rule  # noqa: E402
+
+POLL_INTERVAL = 5.0  # giây, như vòng lặp time.sleep(5) cũ
+
+
+def make_rules(count, devices, seed=1):
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        rule = {"name": f"rule-{i}",
+                "days": rng.sample(DAY_NAMES, rng.randint(1, 7)),
+                "from": f"{rng.randrange(24)}:{rng.choice(('00', '15', '30', '45'))}",
+                "to": f"{rng.randrange(24)}:{rng.choice(('00', '15', '30', '45'))}",
+                "max": round(rng.uniform(0.2, 1.0), 2)}
+        if rng.random() < 0.8:
+            rule["devices"] = [f"Simulated Device {rng.randrange(devices)}"]
+        rules.append(parse_rule(rule, i))
+    return rules
+
+
+def brute_force(rules, now):
+    limits = {}
+    for rule in rules:
+        if is_active(rule, now):
+            for key in rule.devices or (None,):
+                low, high = limits.get(key, (0.0, 1.0))
+                limits[key] = (max(low, rule.min_level), min(high, rule.max_level))
+    return limits
+
+
+def run(count, days, devices):
+    rules = make_rules(count, devices)
+    start = datetime(2024, 1, 1)  # thứ Hai
+    end = start + timedelta(days=days)
+    clock = {"now": start}
+
+    setup = time.perf_counter()
+    schedule = VolumeSchedule(rules, now=lambda: clock["now"])
+    setup_ms = (time.perf_counter() - setup) * 1000
+
+    changes = 0
+    elapsed = time.perf_counter()
+    while schedule.next_due() is not None and schedule.next_due() <= end:
+        clock["now"] = schedule.next_due()
+        changes += schedule.process()
+    elapsed = time.perf_counter() - elapsed
+    boundaries, evaluations = schedule.boundaries, schedule.evaluations
+
+    # Cách cũ: mỗi lần lấy mẫu duyệt lại toàn bộ luật
+    sample = time.perf_counter()
+    for i in range(20):
+        brute_force(rules, start + timedelta(minutes=37 * i))
+    poll_ms = (time.perf_counter() - sample) * 1000 / 20
+    polls = days * 86400 / POLL_INTERVAL
+
+    # Độ chính xác: đồng hồ nhảy tới lui ngẫu nhiên (máy ngủ, chỉnh giờ)
+    rng = random.Random(2)
+    mismatches = 0
+    checks = 200
+    for _ in range(checks):
+        clock["now"] = start + timedelta(seconds=rng.uniform(0, days * 86400))
+        schedule.process()
+        if schedule.limits != brute_force(rules, clock["now"]):
+            mismatches += 1
+
+    return {
+        "rules": count,
+        "days": days,
+        "setup_ms": setup_ms,
+        "boundaries": boundaries,
+        "limit_evaluations": evaluations,
+        "limit_changes": changes,
+        "schedule_total_ms": elapsed * 1000,
+        "us_per_boundary": elapsed * 1e6 / max(1, boundaries),
+        "polling": {"polls": polls, "ms_per_poll": poll_ms, "total_ms": poll_ms * polls},
+        "jump_checks": checks,
+        "jump_mismatches": mismatches,
+        "resyncs": schedule.resyncs,
+    }
+
+
+if __name__ == "__main__":
+    n_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    n_devices = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    print(json.dumps(run(n_rules, n_days, n_devices), indent=4))
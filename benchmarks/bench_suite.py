@@ -0,0 +1,241 @@
+# Bộ benchmark chạy các đường xử lý thật của ứng dụng trên SimulatedAudioBackend
+# (không cần Windows/âm thanh thật): duyệt thiết bị, tra thiết bị mặc định, vòng giám
+# sát (độ trễ phát hiện → áp dụng), set_volume, save_config/load_volume_config và cập
+# nhật ảnh chụp cho giao diện. Kết quả là một dict phẳng {tên_số_liệu: giá_trị} để so
+# sánh giữa các lần chạy; so với ngưỡng trong thresholds.json (và tùy chọn với một lần
+# chạy trước qua --baseline). Thoát với mã 1 nếu có số liệu vượt ngưỡng.
+#   python benchmarks/bench_suite.py [--quick] [--latency-ms 0.05] [--output kết_quả.json]
+#                                    [--baseline lần_trước.json] [--tolerance 1.5]
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config_store  # noqa: E402
+from config_store import ConfigCache  # noqa: E402
+from engine import VolumeEngine  # noqa: E402
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+from sqlite_store import SQLiteStore  # noqa: E402
+from view_model import DeviceViewModel  # noqa: E402
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+ENDPOINT_COUNTS = (2, 20, 200)
+CONFIG_DEVICES = 10000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def make_config(path, devices):
+    data = {f"Simulated Device {i}": {"default": (i % 100) / 100} for i in range(devices)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def make_engine(backend, tmp, saved_devices):
+    fd, path = tempfile.mkstemp(suffix=".json", dir=tmp)
+    os.close(fd)
+    make_config(path, saved_devices)
+    config = ConfigCache(path, flush_delay=None)
+    return VolumeEngine(config=config, **backend.engine_options())
+
+
+# --- Duyệt thiết bị & tra thiết bị mặc định ---
+def bench_registry(endpoints, latency, iterations, tmp):
+    backend = SimulatedAudioBackend(endpoints, latency)
+    engine = make_engine(backend, tmp, endpoints)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        engine.refresh_devices()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        f"enumerate_p50_ms@{endpoints}": statistics.median(timings),
+        f"default_lookup_us@{endpoints}": per_call_us(lambda i: engine.get_default_device_name(), iterations * 100),
+        f"active_devices_us@{endpoints}": per_call_us(lambda i: engine.get_audio_devices(), iterations * 100),
+    }
+
+
+# --- Vòng giám sát: đổi thiết bị mặc định (kèm thay đổi phần cứng khác) → âm lượng được đặt ---
+def bench_detection(endpoints, latency, switches, churn, tmp):
+    backend = SimulatedAudioBackend(endpoints, latency)
+    engine = make_engine(backend, tmp, endpoints * 2 + switches * churn + 10)
+    engine.start()
+    try:
+        if not backend.wait_for_volume(1):
+            raise RuntimeError("Vòng giám sát không áp dụng âm lượng lần đầu")
+        timings = []
+        for _ in range(switches):
+            for _ in range(churn):
+                backend.churn()
+            target = backend.pick_other() or backend.add_device()  # mọi thiết bị khác đã bị tắt
+            writes = backend.volume_writes
+            start = time.perf_counter()
+            backend.set_default(target)
+            if not backend.wait_for_volume(writes + 1):
+                raise RuntimeError(f"Không áp dụng âm lượng sau khi chuyển sang {target}")
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        engine.stop()
+    return {
+        f"detect_p50_ms@{endpoints}": statistics.median(timings),
+        f"detect_p95_ms@{endpoints}": percentile(timings, 95),
+        f"detect_enumerations@{endpoints}": engine.registry.enumerations,
+    }
+
+
+# --- set_volume qua engine (handle được giữ lại) ---
+def bench_set_volume(latency, calls, tmp):
+    backend = SimulatedAudioBackend(4, latency)
+    engine = make_engine(backend, tmp, 4)
+    engine.registry.refresh()
+    us = per_call_us(lambda i: engine.set_volume((i % 100) / 100), calls)
+    return {"set_volume_us": us, "set_volume_activations": backend.calls.get("activate", 0)}
+
+
+# --- save_config / load_volume_config ở quy mô CONFIG_DEVICES thiết bị ---
+def bench_config(devices, calls, tmp):
+    results = {}
+    json_path = os.path.join(tmp, "volume_config_large.json")
+    make_config(json_path, devices)
+    stores = {
+        "json": lambda: ConfigCache(json_path, flush_delay=None),
+        "sqlite": lambda: SQLiteStore(os.path.join(tmp, "volume_config_large.db"), json_path=json_path),
+    }
+    previous = config_store.config_cache
+    try:
+        for backend, open_store in stores.items():
+            start = time.perf_counter()
+            store = open_store()
+            config_store.set_store(store)
+            config_store.load_volume_config()
+            results[f"config_{backend}_cold_load_ms"] = (time.perf_counter() - start) * 1000
+            results[f"config_{backend}_load_us"] = per_call_us(lambda i: config_store.load_volume_config(), calls)
+            results[f"config_{backend}_lookup_us"] = per_call_us(
+                lambda i: config_store.get_volume_level(f"Simulated Device {i % devices}"), calls)
+            results[f"config_{backend}_save_us"] = per_call_us(
+                lambda i: config_store.save_config(f"Simulated Device {(i * 7) % devices}", (i % 100) / 100), calls)
+            start = time.perf_counter()
+            config_store.flush_config()
+            results[f"config_{backend}_flush_ms"] = (time.perf_counter() - start) * 1000
+            if hasattr(store, "close"):
+                store.close()
+    finally:
+        config_store.set_store(previous)
+    return results
+
+
+# --- Ảnh chụp cho giao diện sau mỗi lần kiểm tra của vòng giám sát ---
+def bench_snapshots(endpoints, latency, iterations, tmp):
+    backend = SimulatedAudioBackend(endpoints, latency)
+    engine = make_engine(backend, tmp, endpoints)
+    published = []
+    view_model = DeviceViewModel(engine, published.append)
+    events = []
+    backend.source.start(events.append)
+    engine.monitor.check()
+
+    unchanged_us = per_call_us(lambda i: view_model.publish_if_changed(), iterations)
+    timings = []
+    for _ in range(iterations):
+        backend.churn()
+        batch, events[:] = list(events), []
+        start = time.perf_counter()
+        engine.monitor.check(batch)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {
+        f"snapshot_unchanged_us@{endpoints}": unchanged_us,
+        f"snapshot_update_p50_us@{endpoints}": statistics.median(timings),
+        f"snapshot_published@{endpoints}": view_model.published,
+    }
+
+
+def run(quick=False, latency=0.00005, churn=2):
+    scale = 1 if quick else 5
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for endpoints in ENDPOINT_COUNTS:
+            results.update(bench_registry(endpoints, latency, 4 * scale, tmp))
+            results.update(bench_detection(endpoints, latency, 10 * scale, churn, tmp))
+            results.update(bench_snapshots(endpoints, latency, 40 * scale, tmp))
+        results.update(bench_set_volume(latency, 400 * scale, tmp))
+        results.update(bench_config(CONFIG_DEVICES, 2000 * scale, tmp))
+    return results
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_thresholds(results, thresholds):
+    # thresholds: {tên_số_liệu: giá_trị_tối_đa}
+    return [{"metric": name, "value": results[name], "max": limit}
+            for name, limit in sorted(thresholds.items())
+            if name in results and results[name] > limit]
+
+
+def compare_baseline(results, baseline, tolerance):
+    # Chỉ so các số liệu thời gian (_ms/_us): chậm hơn lần trước quá `tolerance` lần là hồi quy
+    regressions = []
+    for name, value in sorted(results.items()):
+        old = baseline.get(name)
+        if not old or not (name.split("@")[0].endswith(("_ms", "_us"))):
+            continue
+        if value > old * tolerance:
+            regressions.append({"metric": name, "value": value, "baseline": old, "ratio": value / old})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark VolumeSetter trên backend âm thanh giả lập")
+    parser.add_argument("--quick", action="store_true", help="ít vòng lặp hơn (dùng cho CI)")
+    parser.add_argument("--latency-ms", type=float, default=0.05, help="độ trễ mỗi lời gọi COM giả lập")
+    parser.add_argument("--churn", type=int, default=2, help="số thay đổi phần cứng khác trước mỗi lần chuyển thiết bị")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--baseline", help="kết quả JSON của lần chạy trước để so sánh")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="hệ số chậm hơn baseline được chấp nhận")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file")
+    args = parser.parse_args(argv)
+    # Cảnh báo từ các thay đổi phần cứng giả lập (thiết bị rút ra trước khi kịp đọc...) là
+    # bình thường; chỉ giữ stdout là JSON
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    results = run(args.quick, args.latency_ms / 1000, args.churn)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "quick": args.quick,
+                 "latency_ms": args.latency_ms, "churn": args.churn, "time": time.time()},
+        "results": results,
+        "regressions": check_thresholds(results, load_json(args.thresholds)) if os.path.exists(args.thresholds) else [],
+    }
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        report["regressions"] += compare_baseline(results, baseline.get("results", baseline), args.tolerance)
+    report["passed"] = not report["regressions"]
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# Microbenchmark set_volume trên lớp COM giả lập: kích hoạt IAudioEndpointVolume
+# mỗi lần (cách cũ) so với VolumeHandlePool dùng lại handle theo endpoint.
+#   python benchmarks/bench_volume_handles.py [số_lần] [độ_trễ_activate_ms]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from volume_control import VolumeHandlePool  # noqa: E402
+
+
+class FakeEndpointVolume:
+    def __init__(self):
+        self.level = 0.0
+
+    def SetMasterVolumeLevelScalar(self, level, context):
+        self.level = level
+
+    def GetMasterVolumeLevelScalar(self):
+        return self.level
+
+
+class FakeComLayer:
+    # Đếm số lần Activate và mô phỏng chi phí GetDevice + Activate + QueryInterface
+    def __init__(self, activate_latency=0.0):
+        self.activate_latency = activate_latency
+        self.activations = 0
+        self.endpoints = {}
+
+    def activate(self, device_id):
+        self.activations += 1
+        if self.activate_latency:
+            time.sleep(self.activate_latency)
+        return self.endpoints.setdefault(device_id, FakeEndpointVolume())
+
+
+def run(calls, activate_latency, devices=4):
+    results = {}
+
+    com = FakeComLayer(activate_latency)
+    start = time.perf_counter()
+    for i in range(calls):
+        com.activate(f"dev-{i % devices}").SetMasterVolumeLevelScalar(i / calls, None)
+    elapsed = time.perf_counter() - start
+    results["activate_per_call"] = {"seconds": elapsed, "us_per_call": elapsed / calls * 1e6,
+                                    "activations": com.activations}
+
+    com = FakeComLayer(activate_latency)
+    pool = VolumeHandlePool(com.activate)
+    start = time.perf_counter()
+    for i in range(calls):
+        pool.set_volume(f"dev-{i % devices}", i / calls)
+    elapsed = time.perf_counter() - start
+    results["pooled_handles"] = {"seconds": elapsed, "us_per_call": elapsed / calls * 1e6,
+                                 "activations": com.activations}
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    print(json.dumps(run(n, latency_ms / 1000), indent=4))
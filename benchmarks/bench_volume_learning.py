@@ -0,0 +1,62 @@
+# Đo tự học âm lượng trên backend giả lập: người dùng lăn chuột trong một khoảng thời
+# gian (hàng trăm callback), xen kẽ các lần VolumeSetter tự đặt âm lượng. Kết quả: số
+# lần lưu cấu hình (mong đợi 1), số thay đổi của chính mình bị lọc, thời gian mỗi callback.
+#   python benchmarks/bench_volume_learning.py [số_callback] [thời_gian_lăn_giây] [debounce_giây]
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigCache  # noqa: E402
+from engine import VolumeEngine  # noqa: E402
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+
+
+def run(callbacks, sweep, debounce):
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SimulatedAudioBackend(4)
+        config = ConfigCache(os.path.join(tmp, "volume_config.json"), flush_delay=None)
+        engine = VolumeEngine(config=config, **backend.engine_options())
+        engine.enable_volume_learning(debounce=debounce)
+        learner = engine.volume_learner
+        device_id = backend.default_id()
+
+        # VolumeSetter áp dụng mức đã lưu: callback của chính mình không được học
+        engine.set_volume(0.3, device_id)
+
+        callback_us = []
+        start = time.perf_counter()
+        for i in range(callbacks):
+            before = time.perf_counter()
+            backend.user_set_volume(device_id, 0.3 + 0.4 * (i + 1) / callbacks)
+            callback_us.append((time.perf_counter() - before) * 1e6)
+            time.sleep(sweep / callbacks)
+        sweep_ms = (time.perf_counter() - start) * 1000
+
+        deadline = time.monotonic() + debounce + 5
+        while learner.saved < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        save_delay_ms = (time.perf_counter() - start) * 1000 - sweep_ms
+        name = engine.registry.name(device_id)
+        results = {
+            "callbacks": learner.changes,
+            "sweep_ms": sweep_ms,
+            "saves": learner.saved,
+            "own_writes_ignored": learner.ignored,
+            "save_after_sweep_ms": save_delay_ms,
+            "learned_level": engine.get_volume_level(name),
+            "max_callback_us": max(callback_us),
+            "mean_callback_us": sum(callback_us) / len(callback_us),
+        }
+        engine.stop()
+    return results
+
+
+if __name__ == "__main__":
+    n_callbacks = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    sweep_s = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    debounce_s = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    print(json.dumps(run(n_callbacks, sweep_s, debounce_s), indent=4))
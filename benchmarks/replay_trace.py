@@ -0,0 +1,190 @@
+# Phát lại một trace (VolumeSetter.exe --dump-trace / menu khay "Xuất trace để báo lỗi")
+# qua VolumeEngine thật với backend âm thanh giả lập, trên Linux, không cần thiết bị thật.
+#
+# Trạng thái ban đầu: endpoint/thiết bị mặc định từ bản ghi "endpoints" đầu tiên của trace
+# (hoặc header nếu ring buffer đã đẩy nó ra), cấu hình từ header (lúc xuất trace: mức được
+# lưu giữa chừng trace có thể đã là giá trị cuối). Dữ liệu vào được phát lại theo thứ tự:
+# sự kiện thiết bị, lệnh chuyển thiết bị của chính VolumeSetter (khay, phím tắt, IPC; phát
+# lại qua DeviceSwitcher của engine), người dùng chỉnh âm lượng ngoài VolumeSetter, lưu cấu
+# hình, đổi ngữ cảnh. Kết quả (các lần đặt âm lượng, đổi thiết bị mặc định) được so với trace gốc.
+#
+#   --speed 1   : đúng nhịp gốc, vòng giám sát chạy thật (gộp sự kiện như trên máy người dùng)
+#   --speed 10  : nhanh gấp 10 lần
+#   --speed 0   : từng bước, nhanh nhất có thể, tất định (các sự kiện cách nhau dưới
+#                 BURST_GAP giây được kiểm tra chung một lần, như Windows báo đổi thiết bị
+#                 cho từng role gần như cùng lúc)
+#
+#   python benchmarks/replay_trace.py trace.jsonl [--speed 0] [--latency-ms 0.2] [--output replay.jsonl]
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import device_events  # noqa: E402
+from config_store import ConfigCache, write_json_atomic  # noqa: E402
+from device_registry import ROLES  # noqa: E402
+from engine import VolumeEngine  # noqa: E402
+from metrics import metrics  # noqa: E402
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+from trace_recorder import load_trace, tracer  # noqa: E402
+
+INPUT_KINDS = ("event", "switch", "volume_change", "config_update", "context")
+BURST_GAP = 0.01  # giây
+
+
+def initial_state(header, entries):
+    # Bản ghi "endpoints" sớm nhất, nếu trước nó chưa có dữ liệu vào nào làm đổi thiết bị (lượt
+    # POLL lúc khởi động chỉ duyệt lại: endpoints được ghi ngay trong lần kiểm tra đó). Ring
+    # buffer đã đẩy đầu trace ra thì dùng header (trạng thái lúc xuất).
+    first_input = next((e["t"] for e in entries if e["kind"] in INPUT_KINDS
+                        and e.get("event") != device_events.POLL), None)
+    first_endpoints = next((e for e in entries if e["kind"] == "endpoints"), None)
+    if first_endpoints is not None and (first_input is None or first_endpoints["t"] <= first_input):
+        return first_endpoints["records"], first_endpoints["defaults"]
+    return header.get("records", []), header.get("defaults", [])
+
+
+def apply_hardware(backend, entry, names):
+    # Đổi trạng thái backend theo sự kiện, không tự phát sự kiện (người gọi phát đúng sự kiện gốc)
+    kind, device_id = entry["event"], entry.get("device")
+    if kind == device_events.DEFAULT_CHANGED and device_id:
+        backend.set_default(device_id, roles=(entry["role"],), flow=entry["flow"], notify=False)
+    elif kind == device_events.DEVICE_ADDED and device_id and device_id not in backend.records:
+        backend.add_device(names.get(device_id, device_id), notify=False, device_id=device_id, flow=entry.get("flow"))
+    elif kind == device_events.DEVICE_REMOVED and device_id:
+        backend.remove_device(device_id, notify=False)
+    elif kind == device_events.STATE_CHANGED and device_id and entry.get("state") is not None:
+        backend.set_state(device_id, entry["state"], notify=False)
+
+
+def outputs(entries):
+    applies = [(e["device"], round(e["level"], 4)) for e in entries if e["kind"] == "set_volume"]
+    switches = [e for e in entries if e["kind"] == "default_changed"]
+    return applies, switches
+
+
+def summarize_latency(switches):
+    values = sorted(e["latency_ms"] for e in switches if e.get("latency_ms") is not None)
+    if not values:
+        return None
+    return {"count": len(values), "p50_ms": values[len(values) // 2], "max_ms": values[-1]}
+
+
+def replay(path, speed=0.0, latency=0.0, output=None):
+    header, entries = load_trace(path)
+    records, defaults = initial_state(header, entries)
+    names = {}
+    for entry in entries:
+        if entry["kind"] == "endpoints":
+            names.update((r[0], r[1]) for r in entry["records"])
+    names.update((r[0], r[1]) for r in header.get("records", []))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "volume_config.json")
+        write_json_atomic(config_path, header.get("config", {}))
+        backend = SimulatedAudioBackend(0, latency)
+        backend.load_snapshot(records, defaults)
+        options = backend.engine_options()
+        # Sự kiện Windows báo sau mỗi lần chuyển đã có trong trace: backend không phát thêm
+        options["set_default_endpoint"] = lambda device_id, roles=ROLES: backend.set_default(device_id, roles, notify=False)
+        engine = VolumeEngine(config=ConfigCache(config_path, flush_delay=None), **options)
+        if not any(e["kind"] == "context" for e in entries):
+            engine.active_context = header.get("context", "default")
+
+        tracer.clear()
+        metrics.reset()
+        start = time.perf_counter()
+        if speed > 0:
+            engine.start()
+        else:
+            engine.audio.call(engine.monitor.check)  # lần kiểm tra đầu tiên như lúc khởi động
+
+        burst = []  # chế độ từng bước: sự kiện chờ kiểm tra chung
+
+        def check_burst():
+            if burst:
+                engine.audio.call(engine.monitor.check, list(burst))
+                burst.clear()
+
+        last_event_t = None
+        for entry in entries:
+            kind = entry["kind"]
+            if kind not in INPUT_KINDS:
+                continue
+            if speed <= 0 and (kind != "event" or last_event_t is None or entry["t"] - last_event_t >= BURST_GAP):
+                check_burst()
+            if speed > 0:
+                delay = start + entry["t"] / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == "event":
+                apply_hardware(backend, entry, names)
+                event = device_events.make_event(entry["event"], entry.get("device"), entry.get("flow"),
+                                                 entry.get("role"), entry.get("state"))
+                if speed > 0:
+                    engine.monitor.emit(event)
+                else:
+                    burst.append(event)
+                    last_event_t = entry["t"]
+            elif kind == "switch":
+                engine.audio.call(engine.switcher.switch_to, entry["device"])
+            elif kind == "volume_change" and not entry.get("own"):
+                backend.user_set_volume(entry["device"], entry["level"])
+            elif kind == "config_update":
+                engine.config.update(entry["device"], entry["level"], entry["context"])
+            elif kind == "context":
+                engine.set_active_context(entry["context"])
+
+        check_burst()
+        # Chờ vòng giám sát xử lý nốt sự kiện cuối
+        while speed > 0 and not engine.monitor.events.empty():
+            time.sleep(0.005)
+        engine.audio.call(lambda: None)
+        elapsed = time.perf_counter() - start
+        engine.stop()
+
+        replayed, _ = tracer.entries()
+        if output:
+            tracer.dump(output, {"replay_of": os.path.abspath(path), "speed": speed})
+
+    original_applies, original_switches = outputs(entries)
+    replay_applies, replay_switches = outputs(replayed)
+    diverged_at = next((i for i, (a, b) in enumerate(zip(original_applies, replay_applies)) if a != b), None)
+    if diverged_at is None and len(original_applies) != len(replay_applies):
+        diverged_at = min(len(original_applies), len(replay_applies))
+    trace_span = entries[-1]["t"] if entries else 0.0
+    return {
+        "trace": os.path.abspath(path),
+        "entries": len(entries),
+        "dropped_in_trace": header.get("dropped", 0),
+        "inputs": sum(1 for e in entries if e["kind"] in INPUT_KINDS),
+        "speed": speed,
+        "trace_span_s": trace_span,
+        "replay_elapsed_s": elapsed,
+        "original": {"applies": len(original_applies), "switches": len(original_switches),
+                     "detect_to_apply": summarize_latency(original_switches)},
+        "replay": {"applies": len(replay_applies), "switches": len(replay_switches),
+                   "detect_to_apply": summarize_latency(replay_switches), "com_calls": dict(backend.calls)},
+        "applies_match": diverged_at is None,
+        "diverged_at": diverged_at,
+        "first_difference": None if diverged_at is None else {
+            "original": original_applies[diverged_at] if diverged_at < len(original_applies) else None,
+            "replay": replay_applies[diverged_at] if diverged_at < len(replay_applies) else None,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Phát lại trace của VolumeSetter với backend giả lập")
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = nhịp gốc, 10 = nhanh gấp 10, 0 = từng bước (mặc định)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="độ trễ mỗi lời gọi COM giả")
+    parser.add_argument("--output", help="ghi trace của lần phát lại (JSONL) để so sánh")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    print(json.dumps(replay(args.trace, args.speed, args.latency_ms / 1000, args.output), indent=4, ensure_ascii=False))
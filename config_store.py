@@ -0,0 +1,276 @@
+# === Cấu hình âm lượng: đường dẫn, bộ nhớ đệm và lưu file ===
+# Cấu hình được giữ trong bộ nhớ cho cả tiến trình. Mỗi lần tra cứu chỉ os.stat()
+# file để so mtime/size, chỉ đọc & parse lại JSON khi file thật sự thay đổi trên đĩa
+# (vd. người dùng sửa tay), nên đường xử lý đổi thiết bị không đọc file khi không cần.
+#
+# Ghi file theo kiểu write-behind: save_config() chỉ cập nhật bộ nhớ, các thay đổi
+# dồn lại và được ghi một lần sau FLUSH_DELAY giây (hoặc khi thoát), ghi ra file tạm
+# rồi os.replace để file cấu hình không bao giờ bị cắt cụt giữa chừng. Ghi lỗi (vd. file
+# bị antivirus khóa) thì các thay đổi được giữ lại và tự ghi lại sau RETRY_DELAY giây,
+# thời gian chờ tăng gấp đôi sau mỗi lần lỗi.
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from device_registry import CAPTURE
+from metrics import metrics
+from trace_recorder import tracer
+
+CONFIG_FILE = "volume_config.json"
+APPS_KEY = "apps"  # khóa dành riêng trong dict của thiết bị cho luật theo ứng dụng
+CAPTURE_PREFIX = "capture:"  # thiết bị thu (micro) lưu dưới "capture:<tên>" để không trùng thiết bị phát
+FLUSH_DELAY = 1.0  # giây
+RETRY_DELAY = 1.0       # giây, chờ trước lần ghi lại đầu tiên khi ghi lỗi (gấp đôi sau mỗi lần lỗi)
+MAX_RETRY_DELAY = 60.0  # giây
+
+_config_path = None
+
+
+def resource_path(relative_path):
+    if hasattr(sys, '_MEIPASS'):
+        resolved_path = os.path.join(sys._MEIPASS, relative_path)
+        logging.debug("resource_path: Đang chạy trong môi trường PyInstaller, trả về đường dẫn: %s", resolved_path)
+        return resolved_path
+    else:
+        resolved_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
+        logging.debug("resource_path: Đang chạy từ mã nguồn, trả về đường dẫn: %s", resolved_path)
+        return resolved_path
+
+
+def get_config_path():
+    global _config_path
+    if _config_path is None:
+        appdata_dir = os.path.join(os.getenv("APPDATA"), "VolumeSetter")
+        os.makedirs(appdata_dir, exist_ok=True)
+        _config_path = os.path.join(appdata_dir, CONFIG_FILE)
+        logging.debug("get_config_path: Đường dẫn file cấu hình tại: %s", _config_path)
+    return _config_path
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def write_json_atomic(path, data, retries=3):
+    # Ghi ra file tạm cùng thư mục rồi os.replace (nguyên tử trên cùng ổ đĩa)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".volume_config.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(retries):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                # Windows: file đích có thể đang bị mở tạm bởi tiến trình khác (antivirus...)
+                if attempt == retries - 1:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigCache:
+    # Dict trả về từ get() được dùng chung, người gọi không được sửa trực tiếp;
+    # mọi thay đổi đi qua update().
+    #   flush_delay=None: không có timer nền, người gọi tự flush() (kiểm thử, benchmark)
+    def __init__(self, path=None, flush_delay=FLUSH_DELAY, retry_delay=RETRY_DELAY):
+        self._path = path
+        self.flush_delay = flush_delay
+        self.retry_delay = retry_delay
+        self._lock = threading.RLock()
+        self._data = None
+        self._signature = None
+        self._pending = {}  # (device, context) -> level chưa ghi xuống đĩa
+        self._timer = None
+        self.reads = 0   # số lần thực sự đọc file, dùng để kiểm tra/đo đạc
+        self.writes = 0  # số lần thực sự ghi file
+        self.failures = 0  # số lần ghi lỗi liên tiếp
+
+    @property
+    def path(self):
+        return self._path or get_config_path()
+
+    def get(self):
+        path = self.path
+        signature = _file_signature(path)
+        with self._lock:
+            if self._data is not None and signature is not None and signature == self._signature:
+                return self._data
+
+            data = self._read(path, signature)
+            if data is None and signature is not None and self._data is not None:
+                # File đang sửa dở/hỏng: giữ bản đã tải, thử lại khi file đổi tiếp
+                logging.warning("Giữ cấu hình đã tải trước đó do file cấu hình không hợp lệ")
+                self._signature = signature
+                return self._data
+            if data is None:
+                data = self._copy_bundled(path)
+                signature = _file_signature(path)
+
+            # Thay đổi chưa kịp ghi vẫn được giữ lại trên nền dữ liệu mới đọc
+            for (device_name, context), level in self._pending.items():
+                data.setdefault(device_name, {})[context] = level
+
+            self._data = data
+            self._signature = signature
+            return data
+
+    def _read(self, path, signature):
+        if signature is None:
+            logging.warning("Không tìm thấy file cấu hình")
+            return None
+        try:
+            self.reads += 1
+            with metrics.timer("config_io", op="read"), open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            logging.info("Đã tải cấu hình từ %s (%s thiết bị)", path, len(data))
+            tracer.record("config_read", devices=len(data))
+            return data
+        except Exception as e:
+            logging.error("Lỗi đọc file cấu hình: %s", e)
+            return None
+
+    def _copy_bundled(self, path):
+        # Nếu chưa có, sao chép từ _MEIPASS
+        try:
+            bundled = resource_path(CONFIG_FILE)
+            with open(bundled, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            write_json_atomic(path, data)
+            logging.info("Đã sao chép cấu hình mặc định từ _MEIPASS")
+            return data
+        except Exception as e:
+            logging.error("Lỗi sao chép file cấu hình mặc định: %s", e)
+            return {}
+
+    def update(self, device_name, volume_level, context="default"):
+        with self._lock:
+            data = self.get()
+            # Thay dict của thiết bị thay vì sửa tại chỗ để luồng khác đang đọc không bị ảnh hưởng
+            levels = dict(data.get(device_name, {}))
+            levels[context] = volume_level
+            data[device_name] = levels
+            self._pending[(device_name, context)] = volume_level
+            tracer.record("config_update", device=device_name, context=context, level=volume_level)
+            self._schedule_flush()
+
+    def update_app(self, device_name, process, volume_level):
+        # Luật âm lượng theo ứng dụng: data[thiết_bị]["apps"][tên_tiến_trình] = mức
+        with self._lock:
+            data = self.get()
+            levels = dict(data.get(device_name, {}))
+            apps = dict(levels.get(APPS_KEY, {}))
+            apps[process.lower()] = volume_level
+            levels[APPS_KEY] = apps
+            data[device_name] = levels
+            self._pending[(device_name, APPS_KEY)] = apps
+            self._schedule_flush()
+
+    def record_apply(self, device_name, volume_level, context="default", device_id=None):
+        # File JSON không lưu lịch sử áp dụng (xem SQLiteStore)
+        pass
+
+    def _schedule_flush(self, delay=None):
+        if self._timer is None and self.flush_delay is not None:
+            self._timer = threading.Timer(self.flush_delay if delay is None else delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return True
+            pending = self._pending
+            self._pending = {}
+            try:
+                with metrics.timer("config_io", op="write"):
+                    write_json_atomic(self.path, self._data)
+            except Exception as e:
+                pending.update(self._pending)
+                self._pending = pending
+                self.failures += 1
+                delay = min(self.retry_delay * 2 ** (self.failures - 1), MAX_RETRY_DELAY)
+                logging.error("save_config: Lỗi khi ghi file cấu hình (lần %s), thử lại sau %s giây: %s",
+                              self.failures, delay, e)
+                self._schedule_flush(delay)
+                return False
+            self._signature = _file_signature(self.path)
+            self.failures = 0
+            self.writes += 1
+            tracer.record("config_write", changes=len(pending))
+            logging.debug("save_config: Đã ghi %s thay đổi xuống file cấu hình", len(pending))
+            return True
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self._signature = None
+
+
+config_cache = ConfigCache()
+
+
+def set_store(store):
+    # Thay nơi lưu cấu hình (vd. SQLiteStore) cho cả tiến trình; gọi trước khi tạo VolumeEngine
+    global config_cache
+    config_cache = store
+
+
+def open_store(backend="json"):
+    # "json": volume_config.json (mặc định); "sqlite": volume_config.db, lần đầu chuyển dữ liệu từ JSON
+    if backend == "sqlite":
+        from sqlite_store import SQLiteStore
+        set_store(SQLiteStore(json_path=get_config_path()))
+    return config_cache
+
+
+def device_key(device_name, flow=None):
+    # Khóa cấu hình của thiết bị: tên thiết bị phát giữ nguyên như cũ, thiết bị thu có tiền tố
+    if flow == CAPTURE and device_name is not None:
+        return CAPTURE_PREFIX + device_name
+    return device_name
+
+
+# === Tải cấu hình âm lượng ===
+def load_volume_config():
+    return config_cache.get()
+
+
+def get_volume_level(device_name, context="default"):
+    return load_volume_config().get(device_name, {}).get(context)
+
+
+# === Lưu cấu hình âm lượng ===
+def save_config(device_name, volume_level, context="default"):
+    try:
+        config_cache.update(device_name, volume_level, context)
+        logging.info("save_config: Đã lưu cấu hình cho thiết bị '%s' (%s: %s)", device_name, context, volume_level)
+        return True
+
+    except Exception as e:
+        logging.error("save_config: Lỗi khi lưu cấu hình: %s", e)
+        return False
+
+
+def flush_config():
+    return config_cache.flush()
@@ -0,0 +1,212 @@
+# === Ngữ cảnh âm lượng theo ứng dụng đang chạy ===
+# Ánh xạ tiến trình (theo tên file thực thi) sang ngữ cảnh (default/music/video...)
+# bằng luật của người dùng trong context_rules.json. Ứng dụng ở foreground được ưu
+# tiên, sau đó tới các tiến trình đang chạy theo thứ tự luật.
+#
+# Chi phí thấp: foreground chỉ là một lời gọi hệ thống mỗi giây; danh sách tiến trình
+# được quét thưa hơn (SCAN_INTERVAL) và chỉ tiến trình mới mới bị hỏi tên. Kết quả tra
+# cứu được lưu theo PID kèm create_time để không nhầm khi PID bị dùng lại.
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_CONTEXT = "default"
+RULES_FILE = "context_rules.json"
+SAMPLE_INTERVAL = 1.0   # giây, kiểm tra ứng dụng foreground
+SCAN_INTERVAL = 15.0    # giây, quét danh sách tiến trình đang chạy
+
+DEFAULT_RULES = {
+    "spotify.exe": "music",
+    "foobar2000.exe": "music",
+    "vlc.exe": "video",
+    "mpc-hc64.exe": "video",
+}
+
+
+def get_rules_path():
+    return os.path.join(os.getenv("APPDATA"), "VolumeSetter", RULES_FILE)
+
+
+def load_context_rules(path=None):
+    # {tên_tiến_trình: ngữ_cảnh}; tạo file mẫu nếu chưa có để người dùng sửa
+    path = path or get_rules_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+        return {name.lower(): context for name, context in rules.items()}
+    except FileNotFoundError:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(DEFAULT_RULES, f, indent=4)
+            logging.info("load_context_rules: Đã tạo file luật ngữ cảnh mặc định: %s", path)
+        except OSError as e:
+            logging.error("load_context_rules: Không tạo được file luật ngữ cảnh: %s", e)
+        return dict(DEFAULT_RULES)
+    except Exception as e:
+        logging.error("load_context_rules: Lỗi đọc file luật ngữ cảnh: %s", e)
+        return {}
+
+
+class PsutilProcessSource:
+    # Nguồn tiến trình thật: psutil cho danh sách/tên, Win32 cho cửa sổ foreground
+    def __init__(self):
+        import psutil
+        self._psutil = psutil
+
+    def pids(self):
+        return self._psutil.pids()
+
+    def identify(self, pid):
+        # (create_time, tên) hoặc None nếu tiến trình đã thoát / không có quyền
+        try:
+            process = self._psutil.Process(pid)
+            return process.create_time(), process.name()
+        except (self._psutil.NoSuchProcess, self._psutil.AccessDenied, self._psutil.ZombieProcess):
+            return None
+
+    def foreground_pid(self):
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+        except (ImportError, AttributeError):
+            return None
+        hwnd = user32.GetForegroundWindow()
+        if not hwnd:
+            return None
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value or None
+
+
+class ContextEngine:
+    #   rules: {tên_tiến_trình (chữ thường): ngữ_cảnh}, thứ tự = độ ưu tiên
+    #   on_change(context): gọi khi ngữ cảnh đang áp dụng thay đổi
+    def __init__(self, rules, source=None, on_change=None, init_thread=None,
+                 sample_interval=SAMPLE_INTERVAL, scan_interval=SCAN_INTERVAL, clock=time.monotonic):
+        self.source = source if source is not None else PsutilProcessSource()
+        self.on_change = on_change
+        self.init_thread = init_thread
+        self.sample_interval = sample_interval
+        self.scan_interval = scan_interval
+        self.clock = clock
+        self.set_rules(rules)
+
+        self.active_context = DEFAULT_CONTEXT
+        self._cache = {}             # pid -> (create_time, context hoặc None)
+        self._running = {}           # context -> số tiến trình đang chạy khớp luật
+        self._foreground = (None, None)  # (pid, context)
+        self._last_scan = None
+        self.identify_calls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_rules(self, rules):
+        self.rules = {name.lower(): context for name, context in rules.items()}
+        # Ưu tiên ngữ cảnh theo lần xuất hiện đầu tiên trong luật
+        self._priority = list(dict.fromkeys(self.rules.values()))
+        self._cache = {}
+        self._running = {}
+        self._foreground = (None, None)
+        self._last_scan = None
+
+    def _lookup(self, pid):
+        info = self.source.identify(pid)
+        self.identify_calls += 1
+        if info is None:
+            return None
+        create_time, name = info
+        return create_time, self.rules.get(name.lower())
+
+    # --- Quét tiến trình đang chạy: chỉ hỏi tên của PID mới ---
+    def scan_running(self):
+        pids = set(self.source.pids())
+        for pid in [pid for pid in self._cache if pid not in pids]:
+            _, context = self._cache.pop(pid)
+            if context is not None:
+                self._running[context] -= 1
+                if not self._running[context]:
+                    del self._running[context]
+
+        for pid in pids:
+            if pid in self._cache:
+                continue
+            entry = self._lookup(pid)
+            if entry is None:
+                continue
+            self._cache[pid] = entry
+            context = entry[1]
+            if context is not None:
+                self._running[context] = self._running.get(context, 0) + 1
+
+    def _foreground_context(self):
+        pid = self.source.foreground_pid()
+        if pid is None:
+            self._foreground = (None, None)
+            return None
+        if pid == self._foreground[0]:
+            return self._foreground[1]
+
+        # Foreground đổi: xác minh lại create_time để phát hiện PID bị dùng lại
+        entry = self._lookup(pid)
+        cached = self._cache.get(pid)
+        if entry is not None and cached is not None and cached[0] != entry[0]:
+            self._cache.pop(pid)
+            if cached[1] is not None:
+                self._running[cached[1]] -= 1
+                if not self._running[cached[1]]:
+                    del self._running[cached[1]]
+        context = entry[1] if entry is not None else None
+        self._foreground = (pid, context)
+        return context
+
+    def resolve(self):
+        context = self._foreground_context()
+        if context is not None:
+            return context
+        for candidate in self._priority:
+            if self._running.get(candidate):
+                return candidate
+        return DEFAULT_CONTEXT
+
+    def sample(self):
+        now = self.clock()
+        if self._last_scan is None or now - self._last_scan >= self.scan_interval:
+            self.scan_running()
+            self._last_scan = now
+
+        context = self.resolve()
+        if context != self.active_context:
+            logging.info("ContextEngine: Ngữ cảnh đổi từ '%s' sang '%s'", self.active_context, context)
+            self.active_context = context
+            if self.on_change is not None:
+                self.on_change(context)
+            return True
+        return False
+
+    # --- Luồng lấy mẫu ---
+    def start(self):
+        if not self.rules:
+            logging.info("ContextEngine: Không có luật ngữ cảnh, không khởi động")
+            return False
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ContextEngine", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if self.init_thread is not None:
+            self.init_thread()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error("ContextEngine: Lỗi khi lấy mẫu ngữ cảnh: %s", e)
+            self._stop.wait(self.sample_interval)
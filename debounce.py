@@ -0,0 +1,117 @@
+# === Gom giá trị dồn dập theo khóa (debounce), xử lý trên luồng nền ===
+# Dùng chung cho hàng đợi thông báo (notifications) và tự học âm lượng (volume_learning).
+# Mỗi khóa chỉ giữ giá trị mới nhất; khóa được xử lý sau khi yên `quiet` giây, tối đa chờ
+# max_delay giây kể từ giá trị đầu nếu giá trị đổi liên tục. put() không bao giờ chặn: một
+# luồng riêng chờ tới hạn gần nhất rồi gọi handle(khóa, giá_trị).
+#
+# Lớp con ghi đè handle(), và nếu cần: _due_at() (thêm ràng buộc thời gian), _expire()
+# (bỏ giá trị lỗi thời), batch (số khóa tối đa mỗi lượt xử lý).
+import logging
+import threading
+import time
+
+
+class Debouncer:
+    #   clock(): nguồn thời gian, thay được khi kiểm thử
+    #   batch: số khóa xử lý tối đa mỗi lượt (None = mọi khóa đã đến hạn)
+    def __init__(self, quiet_period, max_delay, clock=time.monotonic, autostart=True, batch=None, name="Debouncer"):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.clock = clock
+        self.autostart = autostart
+        self.batch = batch
+        self.name = name
+        self._cond = threading.Condition()  # RLock: lớp con giữ khóa khi gọi put()/cancel()
+        self._pending = {}  # khóa -> dict(value, quiet, first, last)
+        self._stopped = False
+        self._thread = None
+        self.coalesced = 0  # số lần giá trị mới thay giá trị đang chờ
+
+    def handle(self, key, value):
+        # Trả về False nếu không làm gì (không tính là đã xử lý)
+        raise NotImplementedError
+
+    def put(self, key, value, quiet_period=None):
+        now = self.clock()
+        quiet = self.quiet_period if quiet_period is None else quiet_period
+        with self._cond:
+            item = self._pending.get(key)
+            if item is None:
+                self._pending[key] = {"value": value, "quiet": quiet, "first": now, "last": now}
+            else:
+                self.coalesced += 1
+                item.update(value=value, quiet=quiet, last=now)
+            self._cond.notify()
+        if self.autostart:
+            self.start()
+
+    def cancel(self, key):
+        with self._cond:
+            return self._pending.pop(key, None) is not None
+
+    def is_pending(self, key):
+        with self._cond:
+            return key in self._pending
+
+    def _due_at(self, item):
+        return min(item["last"] + item["quiet"], item["first"] + self.max_delay)
+
+    def _expire(self, now):
+        pass
+
+    def next_due(self):
+        with self._cond:
+            if not self._pending:
+                return None
+            return min(self._due_at(item) for item in self._pending.values())
+
+    def take_due(self, now=None):
+        # -> [(khóa, giá_trị)] đã đến hạn, hạn sớm nhất trước (tối đa `batch` khóa)
+        now = self.clock() if now is None else now
+        with self._cond:
+            self._expire(now)
+            due = [(self._due_at(item), key) for key, item in self._pending.items()]
+            due = sorted((d for d in due if d[0] <= now), key=lambda d: d[0])[:self.batch]
+            return [(key, self._pending.pop(key)["value"]) for _, key in due]
+
+    def process(self, now=None):
+        handled = 0
+        for key, value in self.take_due(now):
+            try:
+                if self.handle(key, value) is False:
+                    continue
+            except Exception as e:
+                logging.error("%s: Lỗi khi xử lý %s: %s", self.name, key, e)
+                continue
+            handled += 1
+        return handled
+
+    # --- Luồng xử lý ---
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    due = self.next_due()
+                    if due is None:
+                        self._cond.wait()
+                        continue
+                    delay = due - self.clock()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._stopped:
+                    return
+            self.process()
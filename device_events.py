@@ -0,0 +1,259 @@
+# === Nguồn sự kiện thiết bị âm thanh & vòng giám sát ===
+# Thay cho vòng lặp time.sleep(5): Windows báo thay đổi qua IMMNotificationClient,
+# vòng giám sát chỉ thức dậy khi có sự kiện. Poll định kỳ vẫn được giữ làm dự phòng.
+# Module này không import pycaw/comtypes ở cấp module để có thể chạy và đo độ trễ
+# trên Linux với ScriptedEventSource.
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from metrics import metrics
+from trace_recorder import tracer
+
+DEFAULT_CHANGED = "default_changed"
+DEVICE_ADDED = "device_added"
+DEVICE_REMOVED = "device_removed"
+STATE_CHANGED = "state_changed"
+POLL = "poll"
+
+# Chu kỳ poll khi không đăng ký được sự kiện (giữ nguyên hành vi cũ)
+POLL_INTERVAL = 5
+# Chu kỳ poll dự phòng khi đã có sự kiện từ hệ thống
+FALLBACK_POLL_INTERVAL = 30
+
+# flow/role theo EDataFlow/ERole của Windows (0 = eRender)
+DeviceEvent = namedtuple("DeviceEvent", ["kind", "device_id", "flow", "role", "state", "timestamp"])
+
+
+def make_event(kind, device_id=None, flow=None, role=None, state=None):
+    return DeviceEvent(kind, device_id, flow, role, state, time.perf_counter())
+
+
+class EventSource:
+    # Giao diện chung: start(emit) trả về True nếu nguồn hoạt động, emit(DeviceEvent)
+    # có thể được gọi từ bất kỳ luồng nào nên chỉ được phép đẩy sự kiện vào hàng đợi.
+    def start(self, emit):
+        return False
+
+    def stop(self):
+        pass
+
+
+class MMNotificationEventSource(EventSource):
+    # Nguồn sự kiện Windows qua IMMNotificationClient (pycaw.callbacks).
+    # Phải gọi start() trên luồng đã CoInitialize.
+    def __init__(self):
+        self._enumerator = None
+        self._client = None
+
+    def start(self, emit):
+        try:
+            from pycaw.callbacks import MMNotificationClient
+            from pycaw.pycaw import AudioUtilities
+        except ImportError as e:
+            logging.warning("MMNotificationEventSource: Không tải được pycaw.callbacks: %s", e)
+            return False
+
+        class _Client(MMNotificationClient):
+            # Callback chạy trên luồng của dịch vụ âm thanh: không gọi COM ở đây
+            def on_default_device_changed(self, flow, flow_id, role, role_id, default_device_id):
+                emit(make_event(DEFAULT_CHANGED, default_device_id, flow_id, role_id))
+
+            def on_device_added(self, added_device_id):
+                emit(make_event(DEVICE_ADDED, added_device_id))
+
+            def on_device_removed(self, removed_device_id):
+                emit(make_event(DEVICE_REMOVED, removed_device_id))
+
+            def on_device_state_changed(self, device_id, new_state, new_state_id):
+                emit(make_event(STATE_CHANGED, device_id, state=new_state_id))
+
+        try:
+            self._enumerator = AudioUtilities.GetDeviceEnumerator()
+            self._client = _Client()
+            self._enumerator.RegisterEndpointNotificationCallback(self._client)
+            logging.info("MMNotificationEventSource: Đã đăng ký nhận sự kiện thiết bị từ Windows")
+            return True
+        except Exception as e:
+            logging.error("MMNotificationEventSource: Không đăng ký được IMMNotificationClient: %s", e)
+            self._enumerator = None
+            self._client = None
+            return False
+
+    def stop(self):
+        if self._enumerator is not None and self._client is not None:
+            try:
+                self._enumerator.UnregisterEndpointNotificationCallback(self._client)
+            except Exception as e:
+                logging.error("MMNotificationEventSource: Lỗi khi hủy đăng ký: %s", e)
+        self._enumerator = None
+        self._client = None
+
+
+class ScriptedEventSource(EventSource):
+    # Nguồn giả lập để chạy vòng giám sát ngoài Windows: inject() đẩy sự kiện ngay,
+    # play() phát một kịch bản [(delay_giây, DeviceEvent hoặc kind), ...] trên luồng riêng.
+    def __init__(self, script=None):
+        self.script = list(script or [])
+        self._emit = None
+        self._stopped = threading.Event()
+
+    def start(self, emit):
+        self._emit = emit
+        self._stopped.clear()
+        if self.script:
+            threading.Thread(target=self.play, args=(self.script,), daemon=True).start()
+        return True
+
+    def inject(self, kind, device_id=None, flow=0, role=None, state=None):
+        event = make_event(kind, device_id, flow, role, state)
+        if self._emit is not None:
+            self._emit(event)
+        return event
+
+    def play(self, script):
+        for delay, item in script:
+            if self._stopped.wait(delay):
+                return
+            if isinstance(item, DeviceEvent):
+                self._emit(item._replace(timestamp=time.perf_counter()))
+            else:
+                self.inject(item)
+
+    def stop(self):
+        self._stopped.set()
+        self._emit = None
+
+
+class DeviceMonitor:
+    # Vòng giám sát thiết bị mặc định.
+    #   get_current_device(): trả về tên thiết bị mặc định hiện tại (hoặc None)
+    #   on_device_changed(name, event): áp dụng cấu hình khi thiết bị đổi
+    #   on_event(event): nhận từng sự kiện trước khi kiểm tra (vd. cập nhật DeviceRegistry)
+    #   on_check(name): gọi sau mỗi lần kiểm tra (vd. cập nhật giao diện)
+    #   execute(func, *args): nơi chạy mỗi lần kiểm tra (vd. AudioWorker.call); mặc định chạy ngay
+    def __init__(self, get_current_device, on_device_changed, source=None, on_event=None, on_check=None,
+                 poll_interval=POLL_INTERVAL, fallback_interval=FALLBACK_POLL_INTERVAL,
+                 max_errors=3, error_backoff=15, execute=None):
+        self.get_current_device = get_current_device
+        self.on_device_changed = on_device_changed
+        self.on_event = on_event
+        self.on_check = on_check
+        self.source = source
+        self.poll_interval = poll_interval
+        self.fallback_interval = fallback_interval
+        self.max_errors = max_errors
+        self.error_backoff = error_backoff
+        self.execute = execute
+
+        self.events = queue.Queue()
+        self.last_device = None
+        self.last_latency = None
+        self.event_driven = False
+        self._stop = threading.Event()
+
+    def emit(self, event):
+        self.events.put(event)
+
+    def stop(self):
+        self._stop.set()
+        self.events.put(None)
+        if self.source is not None:
+            self.source.stop()
+
+    def _start_source(self):
+        if self.source is None:
+            return False
+        try:
+            return bool(self.source.start(self.emit))
+        except Exception as e:
+            logging.error("DeviceMonitor: Không khởi động được nguồn sự kiện: %s", e)
+            return False
+
+    def _next_events(self, timeout):
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return [make_event(POLL)]
+        if event is None:
+            return None
+
+        # Gom các sự kiện đến dồn dập (mỗi lần đổi thiết bị Windows báo cho từng role)
+        # thành một lần kiểm tra; sự kiện đầu tiên được dùng để tính độ trễ.
+        events = [event]
+        while True:
+            try:
+                extra = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if extra is None:
+                return None
+            events.append(extra)
+        return events
+
+    def check(self, events=None):
+        with metrics.timer("monitor_check"):
+            return self._check(events or [make_event(POLL)])
+
+    def _check(self, events):
+        for event in events:
+            metrics.inc("monitor_events", kind=event.kind)
+            tracer.record("event", at=event.timestamp, event=event.kind, device=event.device_id,
+                          flow=event.flow, role=event.role, state=event.state)
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+
+        current_device = self.get_current_device()
+        logging.debug("DeviceMonitor: Thiết bị hiện tại: %s", current_device)
+
+        if self.on_check is not None:
+            self.on_check(current_device)
+
+        if current_device and current_device != self.last_device:
+            logging.info("DeviceMonitor: Phát hiện thiết bị mới: %s", current_device)
+            self.on_device_changed(current_device, events[0])
+            self.last_latency = time.perf_counter() - events[0].timestamp
+            metrics.observe("detect_to_apply", self.last_latency, kind=events[0].kind)
+            tracer.record("default_changed", device=current_device, latency_ms=round(self.last_latency * 1000, 3))
+            logging.debug("DeviceMonitor: Độ trễ phát hiện → áp dụng: %.1f ms (%s)", self.last_latency * 1000, events[0].kind)
+            self.last_device = current_device
+            return True
+        return False
+
+    def run(self):
+        self._stop.clear()
+        self.event_driven = self._start_source()
+        interval = self.fallback_interval if self.event_driven else self.poll_interval
+        if self.event_driven:
+            logging.info("DeviceMonitor: Chạy theo sự kiện, poll dự phòng mỗi %s giây", interval)
+        else:
+            logging.warning("DeviceMonitor: Không có nguồn sự kiện, quay lại poll mỗi %s giây", interval)
+
+        consecutive_errors = 0
+        events = [make_event(POLL)]  # kiểm tra ngay lần đầu
+        while not self._stop.is_set():
+            if events:
+                try:
+                    if self.execute is not None:
+                        self.execute(self.check, events)
+                    else:
+                        self.check(events)
+                    consecutive_errors = 0
+                except Exception as e:
+                    consecutive_errors += 1
+                    logging.error("DeviceMonitor: Lỗi khi theo dõi thiết bị (lần %s): %s", consecutive_errors, e)
+
+                    if consecutive_errors >= self.max_errors:
+                        logging.warning("DeviceMonitor: Quá nhiều lỗi liên tiếp, tăng thời gian chờ...")
+                        self._stop.wait(self.error_backoff)
+                        consecutive_errors = 0
+
+            if self._stop.is_set():
+                break
+            events = self._next_events(interval)
+
+        if self.source is not None:
+            self.source.stop()
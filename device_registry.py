@@ -0,0 +1,155 @@
+# === Danh bạ endpoint âm thanh dùng chung ===
+# Giữ bản ghi gọn cho từng endpoint (id, FriendlyName, state, flow) và thiết bị mặc
+# định theo từng (flow, role). Được làm mới bằng một lượt duyệt duy nhất hoặc từng
+# phần theo sự kiện thiết bị; mọi tra cứu giữa hai lần thay đổi phần cứng chỉ đọc
+# từ dict trong bộ nhớ, không gọi COM.
+import logging
+import threading
+from collections import namedtuple
+
+import device_events
+from metrics import metrics
+from trace_recorder import tracer
+
+RENDER = 0    # EDataFlow.eRender
+CAPTURE = 1   # EDataFlow.eCapture
+FLOWS = (RENDER, CAPTURE)
+
+ROLE_CONSOLE = 0         # ERole.eConsole
+ROLE_MULTIMEDIA = 1      # ERole.eMultimedia
+ROLE_COMMUNICATIONS = 2  # ERole.eCommunications
+ROLES = (ROLE_CONSOLE, ROLE_MULTIMEDIA, ROLE_COMMUNICATIONS)
+
+STATE_ACTIVE = 0x1  # DEVICE_STATE_ACTIVE
+
+EndpointRecord = namedtuple("EndpointRecord", ["id", "name", "state", "flow"])
+
+
+class DeviceRegistry:
+    #   enumerate_endpoints() -> ([EndpointRecord], {(flow, role): device_id})
+    #   read_endpoint(device_id) -> EndpointRecord  (dùng khi có thiết bị mới)
+    def __init__(self, enumerate_endpoints, read_endpoint=None):
+        self._enumerate_endpoints = enumerate_endpoints
+        self._read_endpoint = read_endpoint
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_name = {}   # (flow, name) -> id
+        self._defaults = {}  # (flow, role) -> id
+        self._active = {}    # flow -> tuple tên thiết bị đang hoạt động
+        self._active_ids = {}  # flow -> tuple ID thiết bị đang hoạt động (cùng thứ tự)
+        self.loaded = False
+        self.version = 0     # tăng mỗi khi nội dung thay đổi
+        self.enumerations = 0
+
+    # --- Cập nhật ---
+    def refresh(self):
+        with metrics.timer("com_call", op="enumerate_endpoints"):
+            records, defaults = self._enumerate_endpoints()
+        with self._lock:
+            self.enumerations += 1
+            changed = (not self.loaded or defaults != self._defaults
+                       or set(records) != set(self._by_id.values()))
+            self._by_id = {r.id: r for r in records}
+            self._defaults = dict(defaults)
+            self.loaded = True
+            if changed:
+                self._reindex()
+                tracer.record("endpoints", **self.snapshot())
+            logging.debug("DeviceRegistry: Đã làm mới %s endpoint", len(records))
+            return changed
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.refresh()
+
+    def _reindex(self):
+        by_name = {}
+        active = {flow: [] for flow in FLOWS}
+        for record in self._by_id.values():
+            if record.name:
+                by_name.setdefault((record.flow, record.name), record.id)
+                if record.state == STATE_ACTIVE:
+                    active.setdefault(record.flow, []).append(record)
+        self._by_name = by_name
+        self._active = {flow: tuple(r.name for r in records) for flow, records in active.items()}
+        self._active_ids = {flow: tuple(r.id for r in records) for flow, records in active.items()}
+        self.version += 1
+
+    def _put(self, record):
+        self._by_id[record.id] = record
+        self._reindex()
+
+    def apply_event(self, event):
+        # Cập nhật từng phần theo sự kiện; trả về True nếu registry thay đổi
+        with self._lock:
+            if not self.loaded:
+                return False
+            kind = event.kind
+            if kind == device_events.DEFAULT_CHANGED:
+                key = (event.flow, event.role)
+                if event.role is None:
+                    return False
+                if self._defaults.get(key) == event.device_id:
+                    return False
+                if event.device_id:
+                    self._defaults[key] = event.device_id
+                else:
+                    self._defaults.pop(key, None)
+                if event.device_id and event.device_id not in self._by_id:
+                    self._load_one(event.device_id)
+                self.version += 1
+                return True
+            if kind == device_events.DEVICE_REMOVED:
+                if self._by_id.pop(event.device_id, None) is None:
+                    return False
+                self._reindex()
+                return True
+            if kind == device_events.STATE_CHANGED and event.device_id in self._by_id and event.state is not None:
+                record = self._by_id[event.device_id]
+                if record.state == event.state:
+                    return False
+                self._put(record._replace(state=event.state))
+                return True
+            if kind in (device_events.DEVICE_ADDED, device_events.STATE_CHANGED):
+                return self._load_one(event.device_id)
+            return False
+
+    def _load_one(self, device_id):
+        if self._read_endpoint is None or not device_id:
+            return False
+        try:
+            record = self._read_endpoint(device_id)
+        except Exception as e:
+            logging.error("DeviceRegistry: Không đọc được endpoint %s: %s", device_id, e)
+            return False
+        self._put(record)
+        return True
+
+    # --- Tra cứu O(1), không gọi COM ---
+    def get(self, device_id):
+        return self._by_id.get(device_id)
+
+    def name(self, device_id):
+        record = self._by_id.get(device_id)
+        return record.name if record else None
+
+    def id_for_name(self, name, flow=RENDER):
+        return self._by_name.get((flow, name))
+
+    def active_names(self, flow=RENDER):
+        return self._active.get(flow, ())
+
+    def active_ids(self, flow=RENDER):
+        return self._active_ids.get(flow, ())
+
+    def default_id(self, flow=RENDER, role=ROLE_MULTIMEDIA):
+        return self._defaults.get((flow, role))
+
+    def default_name(self, flow=RENDER, role=ROLE_MULTIMEDIA):
+        return self.name(self._defaults.get((flow, role)))
+
+    def snapshot(self):
+        # Toàn bộ endpoint và thiết bị mặc định ở dạng JSON được (trace, phát lại)
+        with self._lock:
+            return {"records": [list(r) for r in self._by_id.values()],
+                    "defaults": [[flow, role, device_id] for (flow, role), device_id in self._defaults.items()]}
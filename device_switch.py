@@ -0,0 +1,69 @@
+# === Chuyển thiết bị phát mặc định ===
+# Các thao tác đồng bộ, không có luồng riêng: engine chạy chúng trên luồng âm thanh
+# (AudioWorker, qua audio.call/audio.submit - cùng luồng với execute= của DeviceMonitor),
+# nơi đối tượng PolicyConfig được tạo một lần. ID đích lấy từ DeviceRegistry (không duyệt
+# lại thiết bị), đặt đủ ba ERole rồi áp dụng ngay âm lượng đã lưu cho thiết bị mới.
+import logging
+import time
+
+import device_events
+from device_registry import RENDER, ROLES
+from metrics import metrics
+from trace_recorder import tracer
+
+
+class DeviceSwitcher:
+    #   set_default_endpoint(device_id): đặt thiết bị mặc định cho mọi role
+    #   apply_volume(device_id): áp dụng âm lượng đã lưu, trả về True/False
+    def __init__(self, registry, set_default_endpoint, apply_volume=None, flow=RENDER):
+        self.registry = registry
+        self.set_default_endpoint = set_default_endpoint
+        self.apply_volume = apply_volume
+        self.flow = flow
+        self.last_switch_latency = None
+
+    # --- Gọi trên luồng đã khởi tạo COM (AudioWorker của engine) ---
+    def switch_to(self, device_id):
+        start = time.perf_counter()
+        tracer.record("switch", device=device_id)  # dữ liệu vào khi phát lại trace
+        with metrics.timer("com_call", op="set_default_endpoint"):
+            self.set_default_endpoint(device_id)
+
+        # Cập nhật registry ngay, không chờ sự kiện OnDefaultDeviceChanged
+        for role in ROLES:
+            self.registry.apply_event(device_events.make_event(device_events.DEFAULT_CHANGED, device_id, self.flow, role))
+
+        if self.apply_volume is not None:
+            self.apply_volume(device_id)
+
+        self.last_switch_latency = time.perf_counter() - start
+        metrics.observe("device_switch", self.last_switch_latency)
+        tracer.record("default_changed", device=self.registry.name(device_id),
+                      latency_ms=round(self.last_switch_latency * 1000, 3))
+        logging.info("DeviceSwitcher: Đã chuyển sang %s trong %.1f ms", self.registry.name(device_id), self.last_switch_latency * 1000)
+        return True
+
+    def next_device_id(self):
+        self.registry.ensure_loaded()
+        active = self.registry.active_ids(self.flow)
+        if not active:
+            return None
+        current = self.registry.default_id(self.flow)
+        if current not in active:
+            return active[0]
+        return active[(active.index(current) + 1) % len(active)]
+
+    def cycle_next(self):
+        device_id = self.next_device_id()
+        if device_id is None or device_id == self.registry.default_id(self.flow):
+            logging.info("DeviceSwitcher: Không có thiết bị khác để chuyển")
+            return False
+        return self.switch_to(device_id)
+
+    def switch_to_name(self, device_name):
+        self.registry.ensure_loaded()
+        device_id = self.registry.id_for_name(device_name, self.flow)
+        if device_id is None:
+            logging.warning("DeviceSwitcher: Không tìm thấy thiết bị: %s", device_name)
+            return False
+        return self.switch_to(device_id)
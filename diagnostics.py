@@ -0,0 +1,238 @@
+# === Kiểm tra môi trường hệ thống ===
+# Chỉ được import khi người dùng bấm "Kiểm tra môi trường" hoặc khi chạy lần đầu,
+# để subprocess/winreg/pycaw không nằm trên đường khởi động.
+#
+# Các bước kiểm tra chạy song song trên một pool luồng, mỗi bước có thời hạn riêng,
+# nên tổng thời gian bằng bước chậm nhất chứ không phải tổng các bước. Kết quả được
+# lưu tạm CACHE_TTL giây và gửi về người gọi ngay khi từng bước xong. Thêm bước mới
+# bằng decorator @register_check.
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging.handlers import TimedRotatingFileHandler
+
+CACHE_TTL = 60.0          # giây
+DEFAULT_TIMEOUT = 5.0     # giây cho mỗi bước
+COM_LATENCY_WARN_MS = 200
+
+# ok: True/False; message: mô tả khi lỗi/quá hạn; cached: lấy từ bộ nhớ đệm
+CheckResult = namedtuple("CheckResult", "name ok message duration cached")
+Check = namedtuple("Check", "name func timeout")
+
+CHECKS = []
+
+
+def register_check(name, timeout=DEFAULT_TIMEOUT):
+    # func(logger) -> bool; đăng ký theo thứ tự khai báo
+    def decorator(func):
+        CHECKS.append(Check(name, func, timeout))
+        return func
+    return decorator
+
+
+#logger riêng diagnostic.log
+def setup_diagnostic_logger():
+    diag_logger = logging.getLogger("diagnostic")
+    if diag_logger.handlers:
+        return diag_logger
+
+    log_dir = os.path.join(os.getenv("APPDATA"), "VolumeSetter", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, "diagnostic.log")
+
+    handler = TimedRotatingFileHandler(
+        filename=log_path,
+        when="midnight",
+        interval=1,
+        backupCount=7,
+        encoding="utf-8"
+    )
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    handler.setFormatter(formatter)
+
+    diag_logger.setLevel(logging.DEBUG)
+    diag_logger.addHandler(handler)
+
+    return diag_logger
+
+
+@register_check("Dịch vụ Windows Audio")
+def check_windows_audio_service(logger):
+    try:
+        result = subprocess.run(["sc", "query", "Audiosrv"], capture_output=True, text=True, timeout=DEFAULT_TIMEOUT)
+        if "RUNNING" in result.stdout:
+            logger.info("✅ Dịch vụ Windows Audio đang chạy")
+            return True
+        else:
+            logger.warning("❌ Dịch vụ Windows Audio không chạy hoặc bị tắt")
+            return False
+    except Exception as e:
+        logger.error(f"Lỗi khi kiểm tra dịch vụ Windows Audio: {e}")
+        return False
+
+
+@register_check("Registry PolicyConfig", timeout=2.0)
+def check_policy_config_registry(logger):
+    try:
+        import winreg
+        key_path = r"CLSID\{870af99c-171d-4f9e-af0d-e63df40c2bc9}"
+        with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, key_path):
+            logger.info("✅ COM PolicyConfig tồn tại trong registry")
+            return True
+    except FileNotFoundError:
+        logger.warning("❌ COM PolicyConfig không tồn tại trong registry")
+        return False
+    except Exception as e:
+        logger.error(f"Lỗi khi kiểm tra registry PolicyConfig: {e}")
+        return False
+
+
+@register_check("Truy cập thiết bị âm thanh")
+def check_audio_devices_access(logger):
+    try:
+        from pycaw.pycaw import AudioUtilities
+        devices = AudioUtilities.GetAllDevices()
+        if devices:
+            logger.info(f"✅ Truy cập danh sách thiết bị âm thanh thành công ({len(devices)} thiết bị)")
+            return True
+        else:
+            logger.warning("❌ Không tìm thấy thiết bị âm thanh nào")
+            return False
+    except Exception as e:
+        logger.error(f"Lỗi khi truy cập thiết bị âm thanh: {e}")
+        return False
+
+
+@register_check("Độ trễ COM (duyệt endpoint)")
+def check_com_latency(logger):
+    try:
+        import windows_audio
+        start = time.perf_counter()
+        records, _ = windows_audio.enumerate_endpoints()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > COM_LATENCY_WARN_MS:
+            logger.warning(f"❌ Duyệt {len(records)} endpoint mất {elapsed_ms:.0f} ms (chậm)")
+            return False
+        logger.info(f"✅ Duyệt {len(records)} endpoint mất {elapsed_ms:.0f} ms")
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khi đo độ trễ COM: {e}")
+        return False
+
+
+def _init_worker():
+    # Luồng trong pool cần khởi tạo COM riêng cho các bước dùng pycaw
+    try:
+        import windows_audio
+        windows_audio.co_initialize()
+    except Exception:
+        pass
+
+
+class DiagnosticsRunner:
+    def __init__(self, checks=None, ttl=CACHE_TTL, max_workers=4, initializer=_init_worker, clock=time.monotonic):
+        self.checks = CHECKS if checks is None else checks
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.clock = clock
+        self._cache = {}  # tên -> (CheckResult, thời_điểm)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, name, now):
+        with self._lock:
+            entry = self._cache.get(name)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]._replace(cached=True)
+        return None
+
+    def _store(self, result):
+        with self._lock:
+            self._cache[result.name] = (result, self.clock())
+
+    def run(self, logger, on_result=None, force=False):
+        # Trả về {tên: CheckResult}; on_result(result) được gọi ngay khi từng bước xong
+        results = {}
+
+        def deliver(result):
+            results[result.name] = result
+            if on_result is not None:
+                on_result(result)
+
+        now = self.clock()
+        pending_checks = []
+        for check in self.checks:
+            cached = None if force else self._cached(check.name, now)
+            if cached is not None:
+                deliver(cached)
+            else:
+                pending_checks.append(check)
+        if not pending_checks:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending_checks)),
+                                      thread_name_prefix="diagnostics", initializer=self.initializer)
+        start = time.perf_counter()
+        futures = {executor.submit(check.func, logger): check for check in pending_checks}
+        try:
+            while futures:
+                elapsed = time.perf_counter() - start
+                next_deadline = min(check.timeout for check in futures.values()) - elapsed
+                done, _ = wait(futures, timeout=max(next_deadline, 0), return_when=FIRST_COMPLETED)
+                elapsed = time.perf_counter() - start
+
+                for future in done:
+                    check = futures.pop(future)
+                    try:
+                        ok, message = bool(future.result()), ""
+                    except Exception as e:
+                        ok, message = False, str(e)
+                        logger.error(f"Lỗi khi chạy bước kiểm tra '{check.name}': {e}")
+                    result = CheckResult(check.name, ok, message, elapsed, False)
+                    self._store(result)
+                    deliver(result)
+
+                for future, check in list(futures.items()):
+                    if elapsed >= check.timeout:
+                        # Không chờ bước bị treo; luồng của nó tự kết thúc sau
+                        del futures[future]
+                        future.cancel()
+                        logger.warning(f"❌ Bước kiểm tra '{check.name}' quá thời hạn {check.timeout:.0f} giây")
+                        result = CheckResult(check.name, False, "quá thời hạn", elapsed, False)
+                        self._store(result)
+                        deliver(result)
+        finally:
+            executor.shutdown(wait=False)
+        return results
+
+
+runner = DiagnosticsRunner()
+
+
+def run_environment_check(diag_logger, on_result=None, force=False):
+    # Trả về True nếu môi trường đầy đủ; việc hiện cảnh báo do giao diện quyết định
+    diag_logger.info("🔍 Bắt đầu kiểm tra môi trường hệ thống...")
+    start = time.perf_counter()
+
+    def report(result):
+        if result.cached:
+            diag_logger.info(f"{'✅' if result.ok else '❌'} {result.name} (kết quả đã lưu tạm)")
+        if on_result is not None:
+            on_result(result)
+
+    results = runner.run(diag_logger, on_result=report, force=force)
+
+    if not all(result.ok for result in results.values()):
+        diag_logger.warning("⚠️ Môi trường không đầy đủ. Một số chức năng có thể không hoạt động đúng.")
+        return False
+    diag_logger.info(f"✅ Môi trường đầy đủ. Sẵn sàng chạy ứng dụng. ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return True
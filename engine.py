@@ -0,0 +1,476 @@
+# === Lõi giám sát & áp dụng âm lượng (không phụ thuộc Tkinter) ===
+# VolumeEngine gom danh bạ thiết bị, vòng giám sát, chuyển thiết bị, cấu hình và
+# đặt âm lượng. Chạy được một mình (chế độ --daemon) hoặc để giao diện gắn vào qua
+# add_listener(). Mọi phần phụ thuộc Windows đều có thể thay bằng bản giả lập khi
+# khởi tạo, nên module import và kiểm thử được trên Linux.
+#
+# Mọi lời gọi âm thanh (duyệt thiết bị, đặt âm lượng, đổi thiết bị mặc định, mỗi lần
+# kiểm tra của vòng giám sát) chạy trên một AudioWorker duy nhất. Các hàm *_async trả
+# về Future để luồng giao diện/tray/phím tắt không bao giờ phải chờ lời gọi COM.
+import logging
+import threading
+
+import config_store
+import device_events
+import notifications
+import windows_audio
+from audio_worker import AudioWorker
+from device_events import DeviceMonitor, MMNotificationEventSource
+from device_registry import CAPTURE, RENDER, ROLES, ROLE_MULTIMEDIA, DeviceRegistry
+from device_switch import DeviceSwitcher
+from trace_recorder import tracer
+from volume_control import volume_pool as shared_volume_pool
+
+# Các loại thông báo gửi tới listener: listener(kind, device_name)
+CHECKED = "checked"                # sau mỗi lần kiểm tra thiết bị mặc định
+DEVICE_CHANGED = "device_changed"  # thiết bị mặc định vừa đổi
+CONTEXT_CHANGED = "context_changed"  # ngữ cảnh tự động vừa đổi
+
+# Thiết bị mặc định theo (flow, role) được theo dõi thêm, ngoài loa mặc định (RENDER,
+# Multimedia) do DeviceMonitor xử lý: loa cho cuộc gọi (Communications) và micro mặc định
+TRACKED_DEFAULTS = tuple((flow, role) for flow in (RENDER, CAPTURE) for role in ROLES
+                         if (flow, role) != (RENDER, ROLE_MULTIMEDIA))
+
+
+# Thông báo thay đổi thiết bị: chỉ xếp hàng, luồng của dispatcher hiển thị và gộp các lần
+# đổi liên tiếp thành một thông báo với trạng thái cuối
+def show_device_change_notification(device_name, volume_level):
+    notifications.dispatcher.post(
+        notifications.DEVICE_CHANGED_KEY,
+        "Thiết bị âm thanh đã thay đổi",
+        f"Đã chuyển sang: {device_name}\nÁp dụng âm lượng: {int(volume_level * 100)}%",
+        timeout=5  # thời gian hiển thị (giây)
+    )
+
+
+class VolumeEngine:
+    def __init__(self, registry=None, volume_pool=None, config=None, event_source=None,
+                 set_default_endpoint=None, init_thread=windows_audio.co_initialize,
+                 notify=show_device_change_notification, backend="windows", watch_volume=None,
+                 tracked_defaults=TRACKED_DEFAULTS, **monitor_options):
+        self.backend = backend  # "windows", "pulse" (pulse_audio) hoặc "simulated" (simulated_audio)
+        self.registry = registry or DeviceRegistry(windows_audio.enumerate_endpoints, windows_audio.read_endpoint)
+        self.volume_pool = volume_pool or shared_volume_pool
+        self.config = config or config_store.config_cache
+        self.init_thread = init_thread
+        self.notify = notify
+        self.tracked_defaults = tracked_defaults
+        self.watch_volume = watch_volume or windows_audio.watch_endpoint_volume
+        self._role_defaults = {}  # (flow, role) -> ID thiết bị mặc định đã xử lý lần trước
+
+        self.audio = AudioWorker(init_thread)
+        # Switcher không chạy luồng riêng: yêu cầu chuyển thiết bị được xếp vào AudioWorker
+        self.switcher = DeviceSwitcher(self.registry, set_default_endpoint or windows_audio.set_default_endpoint,
+                                       apply_volume=self._apply_switched_volume)
+        self.monitor = DeviceMonitor(
+            get_current_device=self.get_default_device_name,
+            on_device_changed=self._handle_device_change,
+            source=event_source if event_source is not None else MMNotificationEventSource(),
+            on_event=self._sync_registry,
+            on_check=self._on_check,
+            execute=self.audio.call,
+            **monitor_options
+        )
+        self.active_context = "default"  # ngữ cảnh đang áp dụng (do ContextEngine chọn)
+        self.context_engine = None
+        self.app_volumes = None
+        self.volume_learner = None
+        self.schedule = None
+        self._volume_watches = {}  # device_id -> hàm hủy theo dõi âm lượng
+        self._listeners = []
+        self._monitor_thread = None
+        self._stopped = threading.Event()
+
+    # --- Vòng đời ---
+    def start(self):
+        if self._monitor_thread is None:
+            self._stopped.clear()
+            self._monitor_thread = threading.Thread(target=self._run_monitor, name="VolumeEngine-monitor", daemon=True)
+            self._monitor_thread.start()
+
+    def _run_monitor(self):
+        # Luồng giám sát chỉ chờ sự kiện; COM ở đây chỉ để đăng ký IMMNotificationClient,
+        # mỗi lần kiểm tra được chạy trên AudioWorker
+        if self.init_thread is not None:
+            self.init_thread()
+            logging.debug("VolumeEngine: COM đã được khởi tạo cho luồng giám sát")
+        self.monitor.run()
+
+    def stop(self):
+        self.monitor.stop()
+        self.audio.stop()
+        if self.context_engine is not None:
+            self.context_engine.stop()
+        if self.app_volumes is not None:
+            self.app_volumes.stop()
+        if self.schedule is not None:
+            self.schedule.stop()
+        if self.volume_learner is not None:
+            self.volume_learner.stop()  # lưu nốt mức vừa chỉnh trước khi ghi cấu hình
+        self.config.flush()
+        notifications.dispatcher.stop()
+        self._stopped.set()
+
+    def wait(self, timeout=None):
+        return self._stopped.wait(timeout)
+
+    def enable_context_profiles(self, rules=None, source=None, **options):
+        # Tự chọn ngữ cảnh theo ứng dụng foreground/đang chạy (context_profiles chỉ được import ở đây)
+        import context_profiles
+        if rules is None:
+            rules = context_profiles.load_context_rules()
+        try:
+            self.context_engine = context_profiles.ContextEngine(
+                rules, source=source, on_change=self.set_active_context, **options)
+        except ImportError as e:
+            logging.warning("enable_context_profiles: Không dùng được ngữ cảnh tự động (thiếu psutil?): %s", e)
+            return False
+        return self.context_engine.start()
+
+    def enable_app_volumes(self, watch_sessions=None, init_thread=None, **options):
+        # Âm lượng theo ứng dụng qua audio session; theo dõi mọi loa đang hoạt động
+        from app_volumes import AppVolumeManager
+        self.app_volumes = AppVolumeManager(
+            self.get_app_rules,
+            watch_sessions or windows_audio.watch_sessions,
+            init_thread=init_thread or windows_audio.co_initialize_mta,
+            **options
+        )
+        try:
+            self._ensure_loaded()
+            endpoint_ids = self.registry.active_ids()
+        except Exception as e:
+            logging.error("enable_app_volumes: Lỗi khi lấy danh sách thiết bị: %s", e)
+            endpoint_ids = ()
+        self.app_volumes.start(endpoint_ids)
+        return True
+
+    def enable_volume_learning(self, **options):
+        # Tự lưu mức người dùng chỉnh bằng phím/flyout cho thiết bị và ngữ cảnh hiện tại
+        from volume_learning import VolumeLearner
+        self.volume_learner = VolumeLearner(self._learn_level, self.volume_pool.is_own_write, **options)
+        try:
+            self._ensure_loaded()
+            self.audio.call(self._sync_volume_watches)
+        except Exception as e:
+            logging.error("enable_volume_learning: Lỗi khi đăng ký theo dõi âm lượng: %s", e)
+            return False
+        self.volume_learner.start()
+        return True
+
+    def enable_schedule(self, rules=None, **options):
+        # Giới hạn âm lượng theo khung giờ (vd. giờ yên tĩnh), luật trong schedule_rules.json
+        import volume_schedule
+        if rules is None:
+            rules = volume_schedule.load_schedule_rules()
+        if not rules:
+            return False
+        self.schedule = volume_schedule.VolumeSchedule(rules, **options)
+        self.schedule.on_change = self._on_schedule_change
+        if self.schedule.limits:
+            self._on_schedule_change(self.schedule.limits)  # đang trong khung giờ lúc khởi động
+        return self.schedule.start()
+
+    def dump_trace(self, path=None):
+        # Xuất trace kèm trạng thái hiện tại (thiết bị, cấu hình) để phát lại ngoài máy người dùng
+        header = {"backend": self.backend, "context": self.active_context,
+                  "config": self.config.get(), **self.registry.snapshot()}
+        return tracer.dump(path, header)
+
+    # --- Listener (giao diện, IPC...) ---
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, kind, device_name):
+        for listener in list(self._listeners):
+            try:
+                listener(kind, device_name)
+            except Exception as e:
+                logging.error("VolumeEngine: Lỗi trong listener: %s", e)
+
+    # --- Thiết bị ---
+    def _sync_registry(self, event):
+        # Sự kiện từ Windows cập nhật từng phần; lượt poll dự phòng duyệt lại toàn bộ một lần
+        if event.kind == device_events.POLL or not self.registry.loaded:
+            self.registry.refresh()
+        else:
+            self.registry.apply_event(event)
+        self.volume_pool.on_event(event)
+        if self.app_volumes is not None:
+            self.app_volumes.on_event(event)
+        if self.volume_learner is not None:
+            self._sync_volume_watches()
+
+    def _sync_volume_watches(self):
+        # Chạy trên luồng âm thanh: theo dõi đúng các loa/micro đang hoạt động
+        wanted = set(self.registry.active_ids(RENDER)) | set(self.registry.active_ids(CAPTURE))
+        for device_id in [d for d in self._volume_watches if d not in wanted]:
+            unwatch = self._volume_watches.pop(device_id)
+            self.volume_learner.forget(device_id)
+            try:
+                unwatch()
+            except Exception as e:
+                logging.debug("VolumeEngine: Lỗi khi hủy theo dõi âm lượng %s: %s", device_id, e)
+        for device_id in wanted.difference(self._volume_watches):
+            try:
+                self.volume_learner.observe(device_id, self.volume_pool.get_volume(device_id))
+                self._volume_watches[device_id] = self.watch_volume(device_id, self.volume_learner.on_change)
+            except Exception as e:
+                logging.warning("VolumeEngine: Không theo dõi được âm lượng của %s: %s", device_id, e)
+
+    def _ensure_loaded(self):
+        # Lần duyệt đầu tiên (nếu chưa có) cũng chạy trên luồng âm thanh
+        if not self.registry.loaded:
+            self.audio.call(self.registry.refresh, key="refresh")
+
+    def get_default_device_name(self):
+        try:
+            self._ensure_loaded()
+            speaker_id = self.registry.default_id()
+            if speaker_id is None:
+                logging.warning("get_default_device_name: Không có thiết bị loa mặc định")
+                return "Unknown Device"
+
+            name = self.registry.name(speaker_id)
+            if name is None:
+                logging.warning("get_default_device_name: Không tìm thấy thiết bị phù hợp với ID loa mặc định")
+                return "Unknown Device"
+            return name
+
+        except Exception as e:
+            logging.error("get_default_device_name: Lỗi khi lấy tên thiết bị: %s", e)
+            logging.debug("Chi tiết lỗi:", exc_info=True)
+            return None
+
+    def get_audio_devices(self, flow=RENDER):
+        try:
+            self._ensure_loaded()
+            return list(self.registry.active_names(flow))
+
+        except Exception as e:
+            logging.error("get_audio_devices: Lỗi khi lấy danh sách thiết bị: %s", e)
+            return []
+
+    def refresh_devices(self):
+        try:
+            self.audio.call(self.registry.refresh, key="refresh")
+            return True
+        except Exception as e:
+            logging.error("refresh_devices: Lỗi khi duyệt thiết bị: %s", e)
+            return False
+
+    def refresh_devices_async(self):
+        # Nhiều yêu cầu duyệt lại dồn cùng lúc chỉ duyệt một lần
+        return self.audio.submit(self.registry.refresh, key="refresh")
+
+    def set_default_audio_device(self, device_name):
+        try:
+            logging.debug("set_default_audio_device: Bắt đầu chuyển sang thiết bị '%s'", device_name)
+            return self.audio.call(self.switcher.switch_to_name, device_name, key="switch")
+
+        except Exception as e:
+            logging.error("set_default_audio_device: Lỗi khi đặt thiết bị mặc định: %s", e)
+            logging.debug("Chi tiết lỗi:", exc_info=True)
+            return False
+
+    def set_default_audio_device_async(self, device_name):
+        # Chỉ yêu cầu chuyển cuối cùng trong một lượt được thực hiện
+        return self.audio.submit(self.switcher.switch_to_name, device_name, key="switch")
+
+    def cycle_output_device(self):
+        # Không chặn người gọi (tray, phím tắt): mỗi lần bấm là một lệnh trên luồng âm thanh
+        return self.audio.submit(self.switcher.cycle_next)
+
+    # --- Âm lượng ---
+    def set_volume(self, level, device_id=None):
+        # Gọi từ chính luồng âm thanh (vd. khi áp dụng cấu hình sau một lần kiểm tra) thì chạy ngay
+        try:
+            return self.audio.call(self._set_volume, level, device_id, key=("set_volume", device_id))
+        except Exception as e:
+            logging.error("set_volume: Lỗi khi đặt âm lượng: %s", e)
+            return False
+
+    def set_volume_async(self, level, device_id=None):
+        # Các lần đặt dồn dập cho cùng thiết bị trong một lượt chỉ đặt mức cuối
+        return self.audio.submit(self._set_volume, level, device_id, key=("set_volume", device_id))
+
+    def _set_volume(self, level, device_id=None):
+        # Mặc định là loa mặc định hiện tại; handle IAudioEndpointVolume được dùng lại qua pool
+        try:
+            if device_id is None:
+                self.registry.ensure_loaded()
+                device_id = self.registry.default_id()
+            if device_id is None:
+                logging.error("set_volume: Không có thiết bị loa mặc định")
+                return False
+
+            self.volume_pool.set_volume(device_id, level)
+            logging.info("set_volume: Đã đặt âm lượng thành công ở mức %s", level)
+            return True
+
+        except Exception as e:
+            logging.error("set_volume: Lỗi khi đặt âm lượng: %s", e)
+            return False
+
+    def get_volume_level(self, device_name, context="default"):
+        return self.config.get().get(device_name, {}).get(context)
+
+    def save_config(self, device_name, volume_level, context="default", flow=RENDER):
+        try:
+            self.config.update(config_store.device_key(device_name, flow), volume_level, context)
+            logging.info("save_config: Đã lưu cấu hình cho thiết bị '%s' (%s: %s)", device_name, context, volume_level)
+            return True
+        except Exception as e:
+            logging.error("save_config: Lỗi khi lưu cấu hình: %s", e)
+            return False
+
+    def _learn_level(self, device_id, volume_level):
+        # Gọi từ VolumeLearner sau khi người dùng ngừng chỉnh âm lượng
+        record = self.registry.get(device_id)
+        if record is None or record.name is None:
+            return False
+        device_name = config_store.device_key(record.name, record.flow)
+        volume_level = round(volume_level, 2)
+        if self.get_volume_level(device_name, self.active_context) == volume_level:
+            return False
+        self.config.update(device_name, volume_level, self.active_context)
+        logging.info("learn_volume: Đã học âm lượng %s%% cho '%s' (ngữ cảnh %s)",
+                     int(volume_level * 100), device_name, self.active_context)
+        return True
+
+    def get_app_rules(self, device_id):
+        # {tên_tiến_trình: mức} lưu dưới khóa "apps" của thiết bị
+        return self.config.get().get(self.registry.name(device_id), {}).get(config_store.APPS_KEY, {})
+
+    def save_app_volume(self, device_name, process, volume_level):
+        try:
+            self.config.update_app(device_name, process, volume_level)
+            logging.info("save_app_volume: Đã lưu âm lượng %s cho '%s' trên thiết bị '%s'", volume_level, process, device_name)
+        except Exception as e:
+            logging.error("save_app_volume: Lỗi khi lưu cấu hình: %s", e)
+            return False
+        if self.app_volumes is not None:
+            self.app_volumes.request_apply_process(process)
+        return True
+
+    def get_context_level(self, device_name, context=None):
+        # Mức của ngữ cảnh đang áp dụng; thiết bị chưa lưu mức cho ngữ cảnh đó thì dùng "default"
+        context = context or self.active_context
+        volume_level = self.get_volume_level(device_name, context)
+        if volume_level is None and context != "default":
+            volume_level = self.get_volume_level(device_name, "default")
+        if volume_level is not None and self.schedule is not None:
+            # Giới hạn của lịch đã được tính sẵn ở mốc gần nhất: chỉ tra bảng
+            volume_level = self.schedule.clamp(device_name, volume_level)
+        return volume_level
+
+    def apply_saved_volume(self, device_id):
+        # Áp dụng ngay âm lượng đã lưu (theo ngữ cảnh hiện tại) cho endpoint vừa được chọn làm mặc định
+        record = self.registry.get(device_id)
+        flow = record.flow if record is not None else RENDER
+        if self.app_volumes is not None and flow == RENDER:
+            self.app_volumes.request_apply_endpoint(device_id)
+        device_name = config_store.device_key(self.registry.name(device_id), flow)
+        volume_level = self.get_context_level(device_name)
+        if volume_level is None:
+            return False
+        if not self.set_volume(volume_level, device_id):
+            return False
+        self.config.record_apply(device_name, volume_level, self.active_context, device_id)
+        return True
+
+    def set_active_context(self, context):
+        # Ngữ cảnh đổi (vd. mở Spotify -> "music"): áp dụng mức đã lưu của thiết bị hiện tại
+        self.active_context = context
+        tracer.record("context", context=context)
+        current_device = self.get_default_device_name()
+        self._emit(CONTEXT_CHANGED, current_device)
+        if not current_device:
+            return False
+        volume_level = self.get_context_level(current_device, context)
+        if volume_level is None:
+            logging.debug("set_active_context: Thiết bị '%s' chưa có mức cho ngữ cảnh '%s'", current_device, context)
+            return False
+        logging.info("set_active_context: Ngữ cảnh '%s', đặt âm lượng %s%% cho: %s", context, int(volume_level * 100), current_device)
+        if not self.set_volume(volume_level):
+            return False
+        self.config.record_apply(current_device, volume_level, context, self.registry.default_id())
+        return True
+
+    def _on_schedule_change(self, limits):
+        # Gọi trên luồng lịch tại mỗi mốc: việc đặt âm lượng chạy trên luồng âm thanh
+        self.audio.submit(self._apply_schedule, key="schedule")
+
+    def _apply_schedule(self):
+        # Đặt lại mức cho các thiết bị mặc định: mức đã lưu trong giới hạn mới; thiết bị chưa
+        # lưu mức thì chỉ kéo mức hiện tại vào giới hạn
+        self.registry.ensure_loaded()
+        device_ids = [self.registry.default_id()] + [self.registry.default_id(flow, role)
+                                                     for flow, role in self.tracked_defaults]
+        for device_id in dict.fromkeys(d for d in device_ids if d):
+            record = self.registry.get(device_id)
+            if record is None or record.name is None:
+                continue
+            device_name = config_store.device_key(record.name, record.flow)
+            volume_level = self.get_context_level(device_name)
+            if volume_level is None:
+                current = self.volume_pool.get_volume(device_id)
+                volume_level = self.schedule.clamp(device_name, current)
+                if volume_level == current:
+                    continue
+            if self.set_volume(volume_level, device_id):
+                logging.info("apply_schedule: Đặt âm lượng %s%% cho '%s' theo lịch", int(volume_level * 100), device_name)
+
+    # === Theo dõi thay đổi thiết bị mặc định và tự động áp dụng âm lượng ===
+    def _on_check(self, current_device):
+        self._apply_role_defaults()
+        self._emit(CHECKED, current_device)
+
+    def _apply_role_defaults(self):
+        # Chỉ đọc registry (đã cập nhật từ cùng lượt duyệt/sự kiện với loa mặc định), không gọi
+        # COM thêm cho từng role. Thiết bị làm mặc định cho nhiều role chỉ được áp dụng một lần;
+        # loa mặc định chính để DeviceMonitor xử lý (kèm thông báo).
+        primary = self.registry.default_id()
+        changed = {}
+        for flow, role in self.tracked_defaults:
+            device_id = self.registry.default_id(flow, role)
+            if device_id == self._role_defaults.get((flow, role)):
+                continue
+            self._role_defaults[(flow, role)] = device_id
+            if device_id and device_id != primary:
+                changed.setdefault(device_id, (flow, role))
+        for device_id, (flow, role) in changed.items():
+            if self.apply_saved_volume(device_id):
+                logging.info("monitor_device_change: Đã áp dụng âm lượng đã lưu cho %s (flow %s, role %s)",
+                             self.registry.name(device_id), flow, role)
+
+    def _apply_switched_volume(self, device_id):
+        # Switcher vừa đặt mặc định (trên luồng âm thanh, cùng luồng với DeviceMonitor): áp dụng
+        # ngay rồi ghi nhận thiết bị cho monitor, để DEFAULT_CHANGED tới sau không áp dụng lần nữa
+        applied = self.apply_saved_volume(device_id)
+        if device_id == self.registry.default_id():
+            current_device = self.get_default_device_name()
+            self.monitor.last_device = current_device
+            self._emit(DEVICE_CHANGED, current_device)
+        return applied
+
+    def _handle_device_change(self, current_device, event=None):
+        self._emit(DEVICE_CHANGED, current_device)
+        if self.app_volumes is not None:
+            self.app_volumes.request_apply_endpoint(self.registry.default_id())
+
+        volume_level = self.get_context_level(current_device)
+        if volume_level is not None:
+            if self.set_volume(volume_level):
+                self.config.record_apply(current_device, volume_level, self.active_context, self.registry.default_id())
+                logging.info("monitor_device_change: Đã đặt âm lượng %s%% cho thiết bị mới: %s", int(volume_level * 100), current_device)
+                if self.notify is not None:
+                    self.notify(current_device, volume_level)
+            else:
+                logging.error("monitor_device_change: Không thể đặt âm lượng cho thiết bị: %s", current_device)
+        else:
+            logging.warning("monitor_device_change: Không tìm thấy cấu hình cho thiết bị: %s", current_device)
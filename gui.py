@@ -0,0 +1,406 @@
+# === Giao diện người dùng (Tkinter + system tray) ===
+# Gắn vào một VolumeEngine đang chạy: đọc/ghi thông qua engine, nhận thông báo thay
+# đổi thiết bị qua engine.add_listener(). Cửa sổ chính và cửa sổ Giới thiệu chỉ được
+# dựng ở lần hiển thị đầu tiên; lúc khởi động chỉ có Tk root (ẩn) để chạy vòng lặp sự kiện.
+import logging
+import os
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import log_setup
+import notifications
+from log_tail import LogTail, group_by_tag
+from metrics import metrics
+from view_model import DeviceViewModel
+
+HELP_URL = "https://github.com/NamNguyen237/auto-adjust-volumes-project/blob/main/how_to_use.md"
+GITHUB_URL = "https://github.com/NamNguyen237/auto-adjust-volumes-project"
+LOG_VIEW_MAX_LINES = 2000   # số dòng tối đa giữ trong ô xem log
+LOG_VIEW_POLL_MS = 2000     # chu kỳ đọc phần log mới khi cửa sổ đang hiện
+
+
+# Trợ giúp
+def open_help_link():
+    import webbrowser
+    webbrowser.open(HELP_URL)
+
+# GitHub
+def open_github_link():
+    import webbrowser
+    webbrowser.open(GITHUB_URL)
+
+
+# Chạy nền system tray (pystray/PIL chỉ được import khi dựng icon)
+def create_image():
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (64, 64), "white")
+    draw = ImageDraw.Draw(image)
+
+    # Vẽ hình loa
+    draw.polygon([(16, 24), (32, 24), (40, 16), (40, 48), (32, 40), (16, 40)], fill="blue")
+
+    # Vẽ sóng âm (vòng cung)
+    draw.arc([44, 20, 60, 44], start=300, end=60, fill="blue", width=3)
+    draw.arc([48, 16, 64, 48], start=300, end=60, fill="blue", width=2)
+
+    return image
+
+
+class VolumeSetterGUI:
+    def __init__(self, engine, root=None):
+        self.engine = engine
+        self.root = root or tk.Tk()
+        self.root.withdraw()
+        self.main_window_built = False
+        self.diag_logger = None
+        self.tray_icon = None
+        self.log_tail = LogTail(os.path.join(os.getenv("APPDATA"), "VolumeSetter", "logs", "diagnostic.log"),
+                                max_lines=LOG_VIEW_MAX_LINES)
+        self._log_reading = False
+        self._log_missing = False
+        self._checking = False
+        # Ảnh chụp trạng thái thiết bị: mới nhất nhận được / đang hiển thị
+        self._latest_snapshot = None
+        self._shown_snapshot = None
+        self.view_model = DeviceViewModel(engine, self._on_snapshot)
+
+    # Gọi từ luồng nền: chỉ chuyển ảnh chụp về luồng Tk
+    def _on_snapshot(self, snapshot):
+        self.root.after(0, self._apply_snapshot, snapshot)
+
+    # Ghi đè hành vi khi nhấn nút ❌
+    def on_close(self):
+        self.root.withdraw()
+        notifications.dispatcher.post(
+            notifications.BACKGROUND_KEY,
+            "VolumeSetter đang chạy nền",
+            "Bạn có thể mở lại từ biểu tượng ở góc phải màn hình.",
+            timeout=4,
+            quiet_period=0
+        )
+
+    def build_main_window(self):
+        if self.main_window_built:
+            return
+        root = self.root
+
+        root.title("Trình điều chỉnh âm lượng mặc định (Bản thử nghiệm)")
+        root.geometry("500x700")
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Frame chính
+        main_frame = tk.Frame(root, padx=10, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # Thiết bị âm thanh
+        tk.Label(main_frame, text="Chọn thiết bị âm thanh:").pack(pady=5)
+        device_frame = tk.Frame(main_frame)
+        device_frame.pack(fill=tk.X, pady=5)
+
+        self.device_var = tk.StringVar()
+        self.device_menu = ttk.Combobox(device_frame, textvariable=self.device_var, width=35)
+        self.device_menu.pack(side=tk.LEFT, padx=(0, 5))
+
+        refresh_btn = tk.Button(device_frame, text="🔄", command=self.manual_refresh_devices, width=3)
+        refresh_btn.pack(side=tk.LEFT)
+
+        # Ngữ cảnh
+        tk.Label(main_frame, text="Ngữ cảnh (default/music/video...):").pack(pady=5)
+        self.context_var = tk.StringVar(value="default")
+        context_menu = ttk.Combobox(main_frame, textvariable=self.context_var, values=["default", "music", "video"], width=35)
+        context_menu.pack()
+
+        # Âm lượng
+        tk.Label(main_frame, text="Âm lượng (0.0 - 1.0):").pack(pady=5)
+        self.volume_var = tk.StringVar(value="0.5")
+        volume_entry = tk.Entry(main_frame, textvariable=self.volume_var, width=37)
+        volume_entry.pack()
+
+        # Nút áp dụng
+        tk.Button(main_frame, text="Áp dụng & Lưu", command=self.apply_volume, bg="#4CAF50", fg="white",
+                  font=("Arial", 10, "bold"), width=20).pack(pady=15)
+
+        # Nút trợ giúp
+        tk.Button(root, text="Trợ giúp", command=open_help_link).pack(pady=5)
+
+        # Trạng thái
+        self.status_label = tk.Label(main_frame, text="", fg="blue", font=("Arial", 8))
+        self.status_label.pack(pady=5)
+
+        #Nút kiểm tra môi trường
+        check_button = ttk.Button(root, text="Kiểm tra môi trường", command=self.run_environment_check)
+        check_button.pack(pady=10)
+
+        # Tạo Frame hiển thị log
+        log_frame = ttk.LabelFrame(root, text="Kết quả kiểm tra môi trường")
+        log_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Text widget để hiển thị nội dung log
+        self.log_text = tk.Text(log_frame, wrap="word", height=15)
+        self.log_text.pack(fill="both", expand=True)
+        self.log_text.tag_config("INFO", foreground="green")
+        self.log_text.tag_config("WARNING", foreground="orange")
+        self.log_text.tag_config("ERROR", foreground="red")
+
+        # Nút để tải lại log
+        reload_button = ttk.Button(log_frame, text="Tải lại kết quả", command=self.show_diagnostic_log)
+        reload_button.pack(pady=5)
+
+        # Số liệu hiệu năng (độ trễ phát hiện → áp dụng, lời gọi COM, đọc/ghi cấu hình)
+        self.metrics_label = tk.Label(log_frame, text="", justify="left", anchor="w", font=("Consolas", 8))
+        self.metrics_label.pack(fill="x", padx=5, pady=(0, 5))
+
+        self.main_window_built = True
+        self._render_snapshot()
+        self.view_model.request_publish()
+        self.show_diagnostic_log()
+        self.root.after(LOG_VIEW_POLL_MS, self._poll_diagnostic_log)
+
+    # === Áp dụng âm lượng từ giao diện ===
+    def apply_volume(self):
+        device = self.device_var.get()
+        if not device:
+            logging.warning("apply_volume: Người dùng chưa chọn thiết bị âm thanh")
+            messagebox.showerror("Lỗi", "Vui lòng chọn thiết bị âm thanh")
+            return
+
+        context = self.context_var.get()
+        try:
+            level = float(self.volume_var.get())
+            logging.debug("apply_volume: Người dùng nhập mức âm lượng: %s", level)
+
+            if not 0 <= level <= 1:
+                logging.warning("apply_volume: Âm lượng không hợp lệ: %s", level)
+                raise ValueError
+
+            # Đặt âm lượng trên luồng của view-model, kết quả báo lại ở luồng Tk
+            self.view_model.request_apply_volume(
+                device, level, context,
+                lambda ok: self.root.after(0, self._on_volume_applied, ok, device, level, context))
+
+        except ValueError:
+            logging.error("apply_volume: Âm lượng nhập vào không hợp lệ (phải từ 0.0 đến 1.0)")
+            messagebox.showerror("Lỗi", "Âm lượng phải là số từ 0.0 đến 1.0")
+
+    def _on_volume_applied(self, ok, device, level, context):
+        if ok:
+            logging.info("apply_volume: Đã đặt âm lượng %s%% cho thiết bị '%s' (%s)", int(level * 100), device, context)
+            messagebox.showinfo("Thành công", f"Đã đặt âm lượng {int(level*100)}% cho {device} ({context})")
+        else:
+            logging.error("apply_volume: Không thể đặt âm lượng cho thiết bị '%s'", device)
+            messagebox.showerror("Lỗi", "Không thể đặt âm lượng")
+
+    # === Cập nhật danh sách thiết bị từ ảnh chụp (luồng Tk, không gọi COM) ===
+    def _apply_snapshot(self, snapshot):
+        self._latest_snapshot = snapshot
+        if self.main_window_built:
+            self._render_snapshot()
+
+    def _render_snapshot(self):
+        snapshot, shown = self._latest_snapshot, self._shown_snapshot
+        if snapshot is None or snapshot == shown:
+            return
+
+        if shown is None or snapshot.devices != shown.devices:
+            self.device_menu['values'] = snapshot.devices
+            logging.debug("refresh_devices: Danh sách thiết bị lấy được: %s", snapshot.devices)
+
+        if shown is None or snapshot.default_device != shown.default_device or snapshot.context != shown.context:
+            # Không ghi đè lựa chọn/nội dung người dùng đang gõ: chỉ đổi khi ô đang trống
+            # hoặc vẫn đang hiển thị thiết bị mặc định cũ
+            current = self.device_var.get()
+            previous_default = shown.default_device if shown is not None else None
+            editing = self.root.focus_get() is self.device_menu
+            if not editing and (not current or current == previous_default):
+                self.device_var.set(snapshot.default_device or (snapshot.devices[0] if snapshot.devices else ""))
+
+            if snapshot.default_device:
+                self.status_label.config(text=f"Thiết bị hiện tại: {snapshot.default_device} (ngữ cảnh: {snapshot.context})")
+                logging.info("refresh_devices: Thiết bị mặc định hiện tại: %s", snapshot.default_device)
+            else:
+                logging.warning("refresh_devices: Không lấy được thiết bị mặc định")
+
+        self._shown_snapshot = snapshot
+
+    def manual_refresh_devices(self):
+        # Người dùng bấm 🔄: duyệt lại phần cứng trên luồng nền, giao diện nhận ảnh chụp mới
+        self.view_model.request_refresh()
+
+    #kiểm tra môi trường (module diagnostics chỉ được import khi cần)
+    # Các bước chạy song song ở luồng nền; kết quả từng bước được đưa về luồng Tk ngay khi xong
+    def run_environment_check(self):
+        if self._checking:
+            return
+        self._checking = True
+        import diagnostics
+        if self.diag_logger is None:
+            self.diag_logger = diagnostics.setup_diagnostic_logger()
+
+        def worker():
+            ok = False
+            try:
+                ok = diagnostics.run_environment_check(
+                    self.diag_logger, on_result=lambda result: self.root.after(0, self._on_check_result, result))
+            finally:
+                self.root.after(0, self._on_environment_checked, ok)
+
+        threading.Thread(target=worker, name="environment-check", daemon=True).start()
+
+    def _on_check_result(self, result):
+        if self.main_window_built:
+            mark = "✅" if result.ok else "❌"
+            self.status_label.config(text=f"{mark} {result.name} ({result.duration * 1000:.0f} ms)")
+        self.show_diagnostic_log()
+
+    def _on_environment_checked(self, ok):
+        self._checking = False
+        if not ok:
+            messagebox.showwarning("Cảnh báo môi trường", "Phát hiện thiếu thành phần hệ thống. Một số chức năng có thể không hoạt động đúng.")
+        self.show_diagnostic_log()
+
+    #show kết quả khi ấn nút kiểm tra môi trường
+    def show_diagnostic_log(self):
+        # Chỉ đọc phần log mới, ở luồng nền; luồng Tk chỉ chèn các khối đã gom theo tag
+        if not self.main_window_built or self._log_reading:
+            return
+        self._log_reading = True
+        threading.Thread(target=self._read_diagnostic_log, daemon=True).start()
+
+    def _read_diagnostic_log(self):
+        reset, chunks = False, []
+        try:
+            reset, lines = self.log_tail.read_new()
+            chunks = group_by_tag(lines)
+            self._log_missing = False
+        except FileNotFoundError:
+            self.log_tail.reset()
+            if not self._log_missing:
+                self._log_missing = True
+                reset, chunks = True, [("Không tìm thấy file diagnostic.log", None)]
+        except OSError as e:
+            logging.error("show_diagnostic_log: Lỗi khi đọc diagnostic.log: %s", e)
+        self.root.after(0, self._append_diagnostic_log, reset, chunks)
+
+    def _append_diagnostic_log(self, reset, chunks):
+        self._log_reading = False
+        log_text = self.log_text
+        if reset:
+            log_text.delete(1.0, tk.END)
+        if not chunks:
+            return
+        for text, tag in chunks:
+            if tag:
+                log_text.insert(tk.END, text, tag)
+            else:
+                log_text.insert(tk.END, text)
+
+        # Chỉ giữ LOG_VIEW_MAX_LINES dòng cuối
+        excess = int(log_text.index("end-1c").split(".")[0]) - LOG_VIEW_MAX_LINES
+        if excess > 0:
+            log_text.delete(1.0, f"{excess + 1}.0")
+        log_text.see(tk.END)
+
+    def _poll_diagnostic_log(self):
+        if self.root.winfo_viewable():
+            self.show_diagnostic_log()
+            self.metrics_label.config(text=metrics.format_summary())
+        self.root.after(LOG_VIEW_POLL_MS, self._poll_diagnostic_log)
+
+    #About
+    def show_about_window(self):
+        root = self.root
+        about = tk.Toplevel(root)
+        about.title("Giới thiệu phần mềm")
+        about.geometry("900x690")
+        about.resizable(False, False)
+
+        # Đặt cửa sổ này luôn ở trên (không gắn với cửa sổ chính khi nó đang ẩn)
+        if root.winfo_viewable():
+            about.transient(root)
+        about.grab_set()
+        about.focus_force()
+
+        info = """
+🔊 VolumeSetter - Trình điều chỉnh âm lượng mặc định (Bản thử nghiệm)
+
+📌 Tác giả: Nam Nguyen
+🤖 Công cụ hỗ trợ: Microsoft Copilot, Claude.
+
+💬 Đôi lời tác giả:
+
+    Có một thằng bạn của mình rất hay quên chỉnh âm lượng khi chuyển đổi giữa các thiết bị âm thanh (tai nghe, loa ngoài...), điều đó thật phiền phức và đôi khi gây ảnh hưởng đến thính giác nếu lỡ để quá to.
+
+    Mình đã thử tìm kiếm phần mềm để giải quyết vấn đề này nhưng không thấy phần mềm nào phù hợp. Vì vậy, mình quyết định tự viết một phần mềm nhỏ để giúp bạn ấy và những người khác gặp vấn đề tương tự.
+
+    Phần mềm này được phát triển để giải quyết vấn đề âm lượng không đồng nhất khi sử dụng nhiều thiết bị âm thanh khác nhau trên Windows. Mục tiêu là giúp người dùng dễ dàng quản lý và tự động áp dụng mức âm lượng yêu thích cho từng thiết bị khi chúng được kết nối lại.
+
+
+🛠️ Chức năng:
+- Tự động đặt âm lượng cho từng thiết bị âm thanh khi kết nối lại
+- Lưu cấu hình theo ngữ cảnh (default, music, video...)
+- Khởi động cùng Windows
+
+📋 Hướng dẫn sử dụng:
+1. Chọn thiết bị âm thanh (Gõ tên nếu không thấy trong danh sách (đang là bug))
+2. Chọn ngữ cảnh và mức âm lượng (ngữ cảnh thì nên là default thôi, mấy cái kia mình chưa làm gì cả)
+3. Nhấn 'Áp dụng & Lưu'
+4. Phần mềm sẽ tự động áp dụng mức âm lượng đã lưu khi thiết bị được kết nối lại (Khi phần mềm còn đang chạy nền)
+
+🙏 Cảm ơn bạn đã sử dụng phần mềm!
+    """
+
+        label = tk.Label(about, text=info, justify="left", font=("Segoe UI", 10), anchor="nw", wraplength=780)
+        label.pack(padx=20, pady=20, fill="both", expand=True)
+        tk.Button(about, text="GitHub", command=open_github_link).pack(pady=5)
+        tk.Button(about, text="OK", command=about.destroy).pack(pady=10)
+
+    # === Cửa sổ & system tray ===
+    def hide_window(self):
+        self.root.withdraw()
+
+    def _show_main_window(self):
+        self.build_main_window()
+        self.root.deiconify()
+
+    def show_window(self, icon=None, item=None):
+        # Callback của pystray chạy trên luồng tray: chuyển việc dựng/hiện cửa sổ về luồng Tk
+        self.root.after(0, self._show_main_window)
+
+    def quit_app(self, icon=None, item=None):
+        self.view_model.stop()
+        self.engine.stop()
+        if self.tray_icon is not None:
+            self.tray_icon.stop()
+        self.root.after(0, self.root.quit)
+
+    def cycle_output_device(self, icon=None, item=None):
+        self.engine.cycle_output_device()
+
+    def toggle_debug_log(self, icon=None, item=None):
+        # Bật/tắt log chi tiết khi đang chạy, không cần khởi động lại
+        log_setup.set_log_level("INFO" if log_setup.get_log_level() <= logging.DEBUG else "DEBUG")
+
+    def dump_trace(self, icon=None, item=None):
+        try:
+            path = self.engine.dump_trace()
+        except Exception as e:
+            logging.error("dump_trace: Không xuất được trace: %s", e)
+            return
+        notifications.dispatcher.post(notifications.BACKGROUND_KEY, "Đã xuất trace", path, quiet_period=0)
+
+    def setup_tray(self):
+        from pystray import Icon, MenuItem, Menu
+        image = create_image()
+        menu = Menu(
+            MenuItem("Hiện cửa sổ", self.show_window),
+            MenuItem("Chuyển thiết bị tiếp theo", self.cycle_output_device),
+            MenuItem("Log chi tiết (DEBUG)", self.toggle_debug_log,
+                     checked=lambda item: log_setup.get_log_level() <= logging.DEBUG),
+            MenuItem("Xuất trace để báo lỗi", self.dump_trace),
+            MenuItem("Thoát", self.quit_app)
+        )
+        self.tray_icon = Icon("🔊 Nam's VolumeSetter", image, "🔊 Nam's VolumeSetter", menu)
+        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+
+    def run(self):
+        self.root.mainloop()  # Vẫn cần vòng lặp chính để giữ chương trình chạy
@@ -0,0 +1,64 @@
+# === Phím tắt toàn cục (RegisterHotKey của Windows) ===
+# Mỗi GlobalHotkey chạy một luồng riêng có vòng GetMessage: Windows gửi WM_HOTKEY vào
+# hàng đợi thông điệp của chính luồng đã đăng ký phím.
+import ctypes
+import logging
+import threading
+
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_SHIFT = 0x0004
+MOD_WIN = 0x0008
+MOD_NOREPEAT = 0x4000
+WM_HOTKEY = 0x0312
+WM_QUIT = 0x0012
+
+VK_F12 = 0x7B
+
+# Ctrl + Alt + F12: chuyển sang thiết bị phát tiếp theo
+CYCLE_DEVICE_HOTKEY = (MOD_CONTROL | MOD_ALT, VK_F12)
+
+
+class GlobalHotkey:
+    def __init__(self, modifiers, vk, callback, hotkey_id=1):
+        self.modifiers = modifiers
+        self.vk = vk
+        self.callback = callback
+        self.hotkey_id = hotkey_id
+        self._thread_id = None
+        self._thread = None
+
+    def start(self):
+        if not hasattr(ctypes, "windll"):
+            logging.warning("GlobalHotkey: Phím tắt toàn cục chỉ hỗ trợ trên Windows")
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        self._thread_id = kernel32.GetCurrentThreadId()
+
+        if not user32.RegisterHotKey(None, self.hotkey_id, self.modifiers | MOD_NOREPEAT, self.vk):
+            logging.error("GlobalHotkey: Không đăng ký được phím tắt (id %s), có thể đã bị ứng dụng khác chiếm", self.hotkey_id)
+            return
+        logging.info("GlobalHotkey: Đã đăng ký phím tắt (id %s)", self.hotkey_id)
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                if msg.message == WM_HOTKEY and msg.wParam == self.hotkey_id:
+                    try:
+                        self.callback()
+                    except Exception as e:
+                        logging.error("GlobalHotkey: Lỗi khi xử lý phím tắt: %s", e)
+        finally:
+            user32.UnregisterHotKey(None, self.hotkey_id)
+
+    def stop(self):
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = None
@@ -0,0 +1,205 @@
+# === Chỉ chạy một phiên & kênh lệnh IPC cục bộ ===
+# Phiên đầu tiên giữ khóa instance.lock (khóa được hệ điều hành nhả khi tiến trình chết,
+# nên không có khóa "mồ côi") và mở một socket TCP trên 127.0.0.1 với cổng ngẫu nhiên.
+# Cổng và token được ghi vào instance.json trong thư mục của người dùng. Lần chạy thứ
+# hai không giữ được khóa: chỉ gửi lệnh ("show", "apply-profile"...) cho phiên đang chạy
+# rồi thoát, không dựng Tk, không duyệt thiết bị, không chạy vòng giám sát thứ hai.
+#
+# Giao thức: mỗi kết nối một dòng JSON {"token", "command", "args"} và một dòng trả lời
+# {"ok": true, "result": ...} hoặc {"ok": false, "error": "..."}. Dùng được từ script:
+#   VolumeSetter.exe --status | --apply-profile music | --switch-device "Speakers" | --dump-trace
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+
+from config_store import write_json_atomic
+from device_registry import CAPTURE, RENDER, ROLE_COMMUNICATIONS
+
+LOCK_FILE = "instance.lock"
+INSTANCE_FILE = "instance.json"
+CONNECT_TIMEOUT = 2.0  # giây chờ phiên đang chạy mở xong kênh lệnh
+MAX_REQUEST_BYTES = 65536
+
+
+def get_instance_dir():
+    return os.path.join(os.getenv("APPDATA"), "VolumeSetter")
+
+
+class InstanceLock:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_instance_dir(), LOCK_FILE)
+        self._file = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()  # đóng file là nhả khóa
+            self._file = None
+
+
+# === Phía phiên đang chạy ===
+class CommandServer:
+    #   handlers: {tên_lệnh: hàm(**args) -> kết quả tuần tự hóa được JSON}
+    # Lệnh được xử lý lần lượt trên một luồng; lời gọi âm thanh từ lệnh đi qua AudioWorker
+    # của engine nên không chạy song song với vòng giám sát.
+    def __init__(self, handlers=None, path=None, init_thread=None, host="127.0.0.1"):
+        self.handlers = dict(handlers or {})
+        self.path = path or os.path.join(get_instance_dir(), INSTANCE_FILE)
+        self.init_thread = init_thread
+        self.host = host
+        self.token = secrets.token_hex(16)
+        self.port = None
+        self.handled = 0
+        self._server = None
+
+    def register(self, name, func):
+        self.handlers[name] = func
+
+    def handle(self, request):
+        if not hmac.compare_digest(str(request.get("token", "")), self.token):
+            return {"ok": False, "error": "Sai token"}
+        command = request.get("command")
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"Lệnh không hợp lệ: {command}", "commands": sorted(self.handlers)}
+        try:
+            result = handler(**(request.get("args") or {}))
+        except Exception as e:
+            logging.error("CommandServer: Lỗi khi xử lý lệnh '%s': %s", command, e)
+            return {"ok": False, "error": str(e)}
+        self.handled += 1
+        logging.info("CommandServer: Đã xử lý lệnh '%s'", command)
+        return {"ok": True, "result": result}
+
+    def start(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = CONNECT_TIMEOUT
+
+            def handle(self):
+                try:
+                    line = self.rfile.readline(MAX_REQUEST_BYTES)
+                    response = server.handle(json.loads(line))
+                except (OSError, ValueError) as e:
+                    response = {"ok": False, "error": f"Yêu cầu không hợp lệ: {e}"}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        try:
+            self._server = socketserver.TCPServer((self.host, 0), Handler)
+        except OSError as e:
+            logging.error("CommandServer: Không mở được kênh lệnh: %s", e)
+            return False
+        self.port = self._server.server_address[1]
+        write_json_atomic(self.path, {"pid": os.getpid(), "port": self.port, "token": self.token})
+        threading.Thread(target=self._run, name="CommandServer", daemon=True).start()
+        logging.info("CommandServer: Kênh lệnh tại %s:%s", self.host, self.port)
+        return True
+
+    def _run(self):
+        if self.init_thread is not None:
+            self.init_thread()
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# === Phía lần chạy thứ hai / script ===
+def send_command(command, args=None, path=None, timeout=CONNECT_TIMEOUT):
+    # Trả về dict trả lời của phiên đang chạy; None nếu không liên lạc được trong `timeout`
+    path = path or os.path.join(get_instance_dir(), INSTANCE_FILE)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            with socket.create_connection(("127.0.0.1", info["port"]), timeout=timeout) as sock:
+                request = {"token": info["token"], "command": command, "args": args or {}}
+                sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as reader:
+                    return json.loads(reader.readline())
+        except (OSError, ValueError, KeyError) as e:
+            # Phiên kia có thể vừa giữ khóa nhưng chưa mở xong kênh lệnh: thử lại một chút
+            if time.monotonic() >= deadline:
+                logging.debug("send_command: Không gửi được lệnh '%s': %s", command, e)
+                return None
+            time.sleep(0.02)
+
+
+# === Lệnh dùng chung cho chế độ nền và có giao diện ===
+def engine_commands(engine):
+    def status():
+        return {"device": engine.get_default_device_name(), "devices": engine.get_audio_devices(),
+                "communications_device": engine.registry.default_name(RENDER, ROLE_COMMUNICATIONS),
+                "capture_device": engine.registry.default_name(CAPTURE),
+                "capture_devices": engine.get_audio_devices(CAPTURE),
+                "context": engine.active_context, "backend": engine.backend,
+                "schedule": engine.schedule.active_rules() if engine.schedule is not None else []}
+
+    def apply_profile(name):
+        return engine.set_active_context(name)
+
+    def switch_device(name):
+        if name not in engine.get_audio_devices():
+            raise LookupError(f"Không tìm thấy thiết bị: {name}")
+        return engine.set_default_audio_device(name)
+
+    def set_volume(level):
+        level = float(level)
+        if not 0 <= level <= 1:
+            raise ValueError("Mức âm lượng phải trong khoảng 0-1")
+        return engine.set_volume(level)
+
+    def save_level(name, level, context="default", flow="render"):
+        # Lưu mức cho thiết bị phát ("render") hoặc micro ("capture") mà không cần giao diện
+        level = float(level)
+        if not 0 <= level <= 1:
+            raise ValueError("Mức âm lượng phải trong khoảng 0-1")
+        return engine.save_config(name, level, context, CAPTURE if flow == "capture" else RENDER)
+
+    def cycle_device():
+        engine.cycle_output_device().result(CONNECT_TIMEOUT)
+        return engine.get_default_device_name()
+
+    def dump_trace(path=None):
+        return engine.dump_trace(path)
+
+    return {
+        "status": status,
+        "apply-profile": apply_profile,
+        "switch-device": switch_device,
+        "set-volume": set_volume,
+        "save-level": save_level,
+        "cycle-device": cycle_device,
+        "dump-trace": dump_trace,
+    }
@@ -0,0 +1,141 @@
+# === Ghi log bất đồng bộ ===
+# Các luồng chỉ đẩy bản ghi vào hàng đợi (QueueHandler); một luồng QueueListener định
+# dạng và ghi xuống debug.log, nên luồng giám sát/Tk không phải chờ ổ đĩa. Phải gọi
+# setup_logging() trước khi bất kỳ luồng nào khởi động để không mất bản ghi sớm.
+#
+# Mức log mặc định là INFO (đổi bằng --log-level, biến môi trường VOLUMESETTER_LOG_LEVEL
+# hoặc set_log_level() khi đang chạy). Các dòng DEBUG lặp lại (cùng chỗ gọi, cùng tham số)
+# bị giới hạn RATE_LIMIT_BURST dòng mỗi RATE_LIMIT_INTERVAL giây; INFO trở lên không bị bỏ.
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_FILE = "debug.log"
+LEVEL_ENV = "VOLUMESETTER_LOG_LEVEL"
+DEFAULT_LEVEL = "INFO"
+RATE_LIMIT_INTERVAL = 60.0  # giây
+RATE_LIMIT_BURST = 5        # số dòng tối đa mỗi chỗ gọi trong một khoảng
+RATE_LIMIT_KEYS = 1024      # số khóa được theo dõi trước khi dọn các khóa đã hết khoảng
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    # Chỉ giới hạn bản ghi DEBUG (mức <= max_level); WARNING trở lên và các dòng INFO luôn
+    # được ghi. Khóa theo chỗ gọi kèm thông điệp và tham số, nên cùng một dòng log cho các
+    # thiết bị khác nhau được tính riêng.
+    def __init__(self, interval=RATE_LIMIT_INTERVAL, burst=RATE_LIMIT_BURST, max_level=logging.DEBUG,
+                 clock=time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_level = max_level
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = {}  # (pathname, lineno, msg, args) -> [bắt_đầu_khoảng, số_dòng, số_dòng_bị_bỏ]
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno, str(record.msg), repr(record.args))
+        now = self.clock()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.interval:
+                if state is None and len(self._state) >= RATE_LIMIT_KEYS:
+                    self._prune(now)
+                if state is not None and state[2]:
+                    record.suppressed = state[2]  # _Formatter ghi thêm số dòng bị bỏ
+                self._state[key] = [now, 1, 0]
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+    def _prune(self, now):
+        # Bỏ các khóa đã hết khoảng để bộ nhớ không tăng theo số giá trị tham số khác nhau
+        for key in [k for k, state in self._state.items() if now - state[0] >= self.interval]:
+            del self._state[key]
+
+
+class _Formatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text = f"{text} [đã bỏ qua {suppressed} dòng tương tự]"
+        return text
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # Hàng đợi nằm trong cùng tiến trình nên không cần định dạng sẵn (QueueHandler mặc định
+    # gọi format() trên luồng gọi log); việc ghép chuỗi %-format dời sang luồng ghi.
+    def prepare(self, record):
+        return record
+
+
+def parse_level(level):
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Mức log không hợp lệ: {level}")
+    return value
+
+
+def set_log_level(level):
+    logging.getLogger().setLevel(parse_level(level))
+    logging.info("set_log_level: Mức log hiện tại: %s", logging.getLevelName(get_log_level()))
+
+
+def get_log_level():
+    return logging.getLogger().level
+
+
+def setup_logging(log_dir, level=None, rate_limit=True):
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    os.makedirs(log_dir, exist_ok=True)
+    handler = TimedRotatingFileHandler(
+        filename=os.path.join(log_dir, LOG_FILE),
+        when="midnight",       # Tạo file mới mỗi ngày lúc 00:00
+        interval=1,
+        backupCount=7,         # Giữ lại 7 ngày log gần nhất
+        encoding="utf-8",
+        utc=False              # Dùng giờ địa phương
+    )
+    handler.setFormatter(_Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    try:
+        root.setLevel(parse_level(level or os.getenv(LEVEL_ENV) or DEFAULT_LEVEL))
+    except ValueError:
+        root.setLevel(parse_level(DEFAULT_LEVEL))
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)  # Ghi nốt các bản ghi còn trong hàng đợi khi thoát
+
+    logging.debug("Logger theo ngày đã được khởi tạo")
+    return _listener
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,76 @@
+# === Đọc nối tiếp file log (kiểu tail -f) ===
+# Ghi nhớ vị trí đã đọc và chỉ đọc phần byte mới ở mỗi lần tải lại. Lần đầu (hoặc sau khi
+# file được xoay vòng lúc nửa đêm) chỉ đọc phần đuôi đủ cho max_lines dòng cuối. Việc đọc
+# được gọi ngoài luồng Tk; giao diện chỉ nhận các khối văn bản đã gom theo tag.
+import os
+
+TAIL_BYTES = 256 * 1024  # lượng byte tối đa đọc ở lần đầu
+
+
+def classify(line):
+    # Tag màu của dòng log trong giao diện (cùng quy tắc như trước)
+    if "INFO" in line:
+        return "INFO"
+    if "WARNING" in line:
+        return "WARNING"
+    if "ERROR" in line:
+        return "ERROR"
+    return None
+
+
+def group_by_tag(lines):
+    # Gộp các dòng liên tiếp cùng tag thành một khối -> một lần insert cho mỗi khối
+    chunks = []
+    for line in lines:
+        tag = classify(line)
+        if chunks and chunks[-1][1] == tag:
+            chunks[-1][0].append(line)
+        else:
+            chunks.append(([line], tag))
+    return [("".join(parts), tag) for parts, tag in chunks]
+
+
+class LogTail:
+    def __init__(self, path, max_lines=2000, tail_bytes=TAIL_BYTES):
+        self.path = path
+        self.max_lines = max_lines
+        self.tail_bytes = tail_bytes
+        self._offset = None   # None: chưa đọc lần nào / cần đọc lại phần đuôi
+        self._ino = None
+        self._partial = b""   # dòng cuối chưa có ký tự xuống dòng
+
+    def reset(self):
+        self._offset = None
+        self._ino = None
+        self._partial = b""
+
+    def read_new(self):
+        # Trả về (reset, lines): reset=True khi giao diện phải xoá nội dung cũ
+        # (lần đầu, file bị xoay vòng hoặc bị cắt ngắn). FileNotFoundError nếu chưa có file.
+        st = os.stat(self.path)
+        reset = (self._offset is None or st.st_ino != self._ino or st.st_size < self._offset)
+        if reset:
+            self._partial = b""
+            start = max(0, st.st_size - self.tail_bytes)
+        else:
+            start = self._offset
+            if st.st_size == start:
+                return False, []
+
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        self._offset = start + len(data)
+        self._ino = st.st_ino
+
+        if reset and start > 0:
+            # Bỏ dòng đầu bị cắt dở khi đọc từ giữa file
+            newline = data.find(b"\n")
+            data = data[newline + 1:] if newline != -1 else b""
+
+        data = self._partial + data
+        complete, _, self._partial = data.rpartition(b"\n")
+        if not complete and not data.endswith(b"\n"):
+            return reset, []
+        lines = [line.decode("utf-8", errors="replace") + "\n" for line in complete.split(b"\n")]
+        return reset, lines[-self.max_lines:]
@@ -0,0 +1,219 @@
+# === Số liệu hiệu năng: bộ đếm và histogram độ trễ ===
+# Ghi lại độ trễ phát hiện → áp dụng, thời gian các lời gọi COM (duyệt endpoint, Activate,
+# SetMasterVolumeLevelScalar, SetDefaultEndpoint) và đọc/ghi cấu hình. Histogram dùng các
+# bucket cố định (ms) nên mỗi lần ghi chỉ là một bisect + cộng dưới một khóa; p50/p95/p99
+# được nội suy từ bucket khi đọc.
+#
+# Xem số liệu: ô "Số liệu hiệu năng" trong cửa sổ chính, hoặc chạy với --metrics-port N rồi
+# mở http://127.0.0.1:N/metrics (định dạng Prometheus) hay /metrics.json. Chỉ đọc, chỉ nghe
+# trên localhost.
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Biên trên của các bucket (ms); bucket cuối là +Inf
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max_ms
+                upper = min(upper, self.max_ms)
+                lower = min(lower, upper)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max_ms
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}    # (tên, nhãn) -> số
+        self._histograms = {}  # (tên, nhãn) -> Histogram
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        # Đo thời gian một khối lệnh, kể cả khi khối đó ném lỗi
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # --- Xuất số liệu ---
+    def snapshot(self):
+        with self._lock:
+            counters = [(name, labels, value) for (name, labels), value in self._counters.items()]
+            histograms = []
+            for (name, labels), h in self._histograms.items():
+                entry = {"count": h.count, "sum_ms": round(h.sum_ms, 3), "max_ms": round(h.max_ms, 3)}
+                for p in PERCENTILES:
+                    value = h.percentile(p)
+                    entry[f"p{p}_ms"] = round(value, 3) if value is not None else None
+                histograms.append((name, labels, entry))
+        return {
+            "time": time.time(),
+            "counters": [{"name": n, "labels": dict(l), "value": v} for n, l, v in sorted(counters)],
+            "histograms": [{"name": n, "labels": dict(l), **e} for n, l, e in sorted(histograms, key=lambda x: x[:2])],
+        }
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"volumesetter_{name}_total{_format_labels(labels)} {value}")
+            for (name, labels), h in sorted(self._histograms.items(), key=lambda x: x[0]):
+                metric = f"volumesetter_{name}_seconds"
+                cumulative = 0
+                for bound, n in zip(self.bucket_labels(h), h.counts):
+                    cumulative += n
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum_ms / 1000:.6f}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def bucket_labels(histogram):
+        return [f"{b / 1000:g}" for b in histogram.bounds] + ["+Inf"]
+
+    def format_summary(self):
+        # Văn bản ngắn cho ô số liệu trong giao diện
+        snap = self.snapshot()
+        lines = []
+        for h in snap["histograms"]:
+            labels = ",".join(f"{k}={v}" for k, v in h["labels"].items())
+            name = f"{h['name']}[{labels}]" if labels else h["name"]
+            lines.append(f"{name}: n={h['count']} p50={h['p50_ms']} p95={h['p95_ms']} p99={h['p99_ms']} ms")
+        for c in snap["counters"]:
+            labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+            name = f"{c['name']}[{labels}]" if labels else c["name"]
+            lines.append(f"{name}: {c['value']}")
+        return "\n".join(lines) if lines else "Chưa có số liệu"
+
+
+metrics = MetricsRegistry()
+
+
+# === Endpoint HTTP chỉ đọc trên localhost ===
+class MetricsServer:
+    def __init__(self, registry=None, port=0, host="127.0.0.1"):
+        self.registry = registry or metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # không ghi mỗi request vào debug.log
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error("MetricsServer: Không mở được cổng %s: %s", self.port, e)
+            return False
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+        logging.info("MetricsServer: Số liệu tại http://%s:%s/metrics", self.host, self.port)
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,83 @@
+# === Hàng đợi thông báo (toast) chạy nền ===
+# plyer.notification.notify có thể chặn hàng trăm ms (hoặc lâu hơn khi hệ thống toast
+# bận), nên luồng giám sát và luồng Tk chỉ post() vào hàng đợi rồi đi tiếp; một luồng
+# riêng hiển thị thông báo (gom theo khóa bằng debounce.Debouncer).
+#
+# Thông báo cùng khóa được gộp: chỉ nội dung mới nhất được giữ, và chỉ hiện sau khi
+# khóa đó yên QUIET_PERIOD giây (tối đa chờ MAX_DELAY giây nếu sự kiện dồn liên tục).
+# Ví dụ tai nghe Bluetooth kết nối/ngắt năm lần trong mười giây chỉ cho một thông báo
+# với trạng thái cuối. Giữa hai thông báo cách nhau ít nhất MIN_INTERVAL giây; thông
+# báo chờ quá MAX_AGE giây bị bỏ vì đã lỗi thời.
+import logging
+import time
+
+from debounce import Debouncer
+
+QUIET_PERIOD = 3.0   # giây
+MAX_DELAY = 15.0     # giây
+MIN_INTERVAL = 5.0   # giây
+MAX_AGE = 30.0       # giây
+
+DEVICE_CHANGED_KEY = "device_changed"
+BACKGROUND_KEY = "background"
+
+
+def plyer_notify(title, message, timeout=5):
+    # plyer chỉ được import ở lần thông báo đầu tiên
+    from plyer import notification
+    notification.notify(
+        title=title,
+        message=message,
+        app_name="VolumeSetter",
+        timeout=timeout  # thời gian hiển thị (giây)
+    )
+
+
+class NotificationDispatcher(Debouncer):
+    #   notifier(title, message, timeout): hàm hiển thị thật (có thể chặn)
+    #   clock(): nguồn thời gian, thay được khi kiểm thử
+    def __init__(self, notifier=plyer_notify, quiet_period=QUIET_PERIOD, max_delay=MAX_DELAY,
+                 min_interval=MIN_INTERVAL, max_age=MAX_AGE, clock=time.monotonic, autostart=True):
+        # Mỗi lượt chỉ hiện một thông báo: thông báo kế tiếp phải chờ min_interval
+        super().__init__(quiet_period, max_delay, clock=clock, autostart=autostart, batch=1,
+                         name="NotificationDispatcher")
+        self.notifier = notifier
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self._last_shown = None
+        self.shown = 0      # số thông báo đã hiển thị
+        self.dropped = 0    # số thông báo bị bỏ vì quá cũ
+
+    def post(self, key, title, message, timeout=5, quiet_period=None):
+        # Không bao giờ chặn: chỉ ghi vào hàng đợi. quiet_period=0 cho thông báo không cần gộp
+        self.put(key, {"title": title, "message": message, "timeout": timeout}, quiet_period)
+
+    def _due_at(self, item):
+        due = super()._due_at(item)
+        if self._last_shown is not None:
+            due = max(due, self._last_shown + self.min_interval)
+        return due
+
+    def _expire(self, now):
+        for key in [k for k, item in self._pending.items() if now - item["last"] > self.max_age]:
+            del self._pending[key]
+            self.dropped += 1
+            logging.debug("NotificationDispatcher: Bỏ thông báo quá cũ: %s", key)
+
+    def handle(self, key, item):
+        try:
+            self.notifier(item["title"], item["message"], item["timeout"])
+        except Exception as e:
+            logging.error("NotificationDispatcher: Lỗi khi hiển thị thông báo: %s", e)
+
+    def process(self, now=None):
+        now = self.clock() if now is None else now
+        if not super().process(now):
+            return False
+        with self._cond:
+            self._last_shown = now
+            self.shown += 1
+        return True
+
+
+dispatcher = NotificationDispatcher()
@@ -0,0 +1,298 @@
+# === Backend PulseAudio/PipeWire cho Linux (qua pactl) ===
+# Cùng vai trò với windows_audio: liệt kê sink, đặt âm lượng từng sink, đổi sink mặc
+# định. Thay đổi được nhận từ luồng `pactl subscribe` của server (không poll): mỗi dòng
+# "Event 'new'/'remove' on sink #N" hoặc "Event 'change' on server" được dịch sang
+# DeviceEvent như IMMNotificationClient, nên phản ứng trong vài ms và không tốn CPU khi
+# rảnh; "Event 'change' on sink #N" được báo cho hàm theo dõi âm lượng (watch_volume).
+# ID thiết bị là tên sink (ổn định qua các lần cắm lại), tên hiển thị là Description
+# của sink, nên volume_config.json dùng chung định dạng với bản Windows.
+#
+# Mọi lời gọi pactl đi qua `run(args) -> stdout` và `spawn() -> tiến trình có .stdout`,
+# thay được bằng server giả / luồng `pactl subscribe` giả để chạy không cần âm thanh thật.
+import logging
+import os
+import re
+import subprocess
+import threading
+
+import device_events
+from device_events import EventSource, make_event
+from device_registry import EndpointRecord, RENDER, ROLES, STATE_ACTIVE
+
+PACTL = "pactl"
+VOLUME_NORM = 65536  # PA_VOLUME_NORM: mức 100%
+RESTART_DELAY = 2.0  # giây chờ trước khi chạy lại `pactl subscribe` khi server khởi động lại
+
+_EVENT_RE = re.compile(r"Event '(\w+)' on ([\w-]+) #(-?\d+)")
+_VOLUME_RE = re.compile(r":\s*(\d+)\s*/")
+
+
+def _pactl_env():
+    # Đầu ra của pactl được dịch theo locale; ép về tiếng Anh để phân tích
+    env = dict(os.environ)
+    env["LC_ALL"] = "C"
+    return env
+
+
+def run_pactl(args, timeout=5):
+    result = subprocess.run([PACTL] + list(args), capture_output=True, text=True,
+                            env=_pactl_env(), timeout=timeout, check=True)
+    return result.stdout
+
+
+def spawn_subscribe():
+    return subprocess.Popen([PACTL, "subscribe"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True, env=_pactl_env(), bufsize=1)
+
+
+# === Phân tích đầu ra pactl ===
+def parse_sinks(text):
+    # `pactl list sinks` -> [{"index", "name", "description", "state", "volume"}]
+    sinks = []
+    sink = None
+    for line in text.splitlines():
+        if line.startswith("Sink #"):
+            sink = {"index": int(line[6:].strip()), "name": None, "description": None, "state": None, "volume": None}
+            sinks.append(sink)
+            continue
+        if sink is None:
+            continue
+        key, _, value = line.strip().partition(": ")
+        if key == "Name":
+            sink["name"] = value
+        elif key == "Description":
+            sink["description"] = value
+        elif key == "State":
+            sink["state"] = value
+        elif key == "Volume" and sink["volume"] is None:
+            sink["volume"] = parse_volume(value)
+    return [s for s in sinks if s["name"]]
+
+
+def parse_volume(text):
+    # "front-left: 42597 /  65% / -11.23 dB,   front-right: ..." -> mức của kênh đầu
+    match = _VOLUME_RE.search(text)
+    return int(match.group(1)) / VOLUME_NORM if match else None
+
+
+def parse_default_sink(text):
+    # `pactl info` -> tên sink mặc định
+    for line in text.splitlines():
+        if line.startswith("Default Sink:"):
+            return line.partition(":")[2].strip() or None
+    return None
+
+
+def parse_event(line):
+    # "Event 'remove' on sink #53" -> ("remove", "sink", 53)
+    match = _EVENT_RE.search(line)
+    if match is None:
+        return None
+    return match.group(1), match.group(2), int(match.group(3))
+
+
+class PactlClient:
+    def __init__(self, run=run_pactl):
+        self.run = run
+        self._lock = threading.Lock()
+        self.sink_names = {}  # chỉ số sink -> tên sink (sự kiện 'remove' chỉ có chỉ số)
+
+    def list_sinks(self):
+        sinks = parse_sinks(self.run(["list", "sinks"]))
+        with self._lock:
+            self.sink_names = {s["index"]: s["name"] for s in sinks}
+        return sinks
+
+    def default_sink(self):
+        return parse_default_sink(self.run(["info"]))
+
+    def set_default_sink(self, name):
+        self.run(["set-default-sink", name])
+
+    def set_sink_volume(self, name, level):
+        self.run(["set-sink-volume", name, str(int(round(level * VOLUME_NORM)))])
+
+    def get_sink_volume(self, name):
+        # Một sink, không liệt kê lại toàn bộ (mỗi sự kiện 'change' đều đọc mức)
+        try:
+            level = parse_volume(self.run(["get-sink-volume", name]))
+        except subprocess.CalledProcessError:
+            level = None  # pactl cũ (< 14) không có get-sink-volume
+        if level is not None:
+            return level
+        for sink in self.list_sinks():
+            if sink["name"] == name:
+                return sink["volume"]
+        raise LookupError(name)
+
+    def name_for_index(self, index, refresh=True):
+        name = self.sink_names.get(index)
+        if name is None and refresh:
+            self.list_sinks()
+            name = self.sink_names.get(index)
+        return name
+
+    def forget_index(self, index):
+        with self._lock:
+            return self.sink_names.pop(index, None)
+
+
+class PulseSinkVolume:
+    # Giao diện giống IAudioEndpointVolume để dùng chung VolumeHandlePool
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def SetMasterVolumeLevelScalar(self, level, context):
+        self.client.set_sink_volume(self.name, level)
+
+    def GetMasterVolumeLevelScalar(self):
+        return self.client.get_sink_volume(self.name)
+
+
+class PactlEventSource(EventSource):
+    # Đọc `pactl subscribe` trên một luồng riêng. Luồng bị chặn ở readline khi không có
+    # sự kiện; nếu tiến trình kết thúc (server khởi động lại) thì chạy lại và phát một
+    # sự kiện POLL để duyệt lại toàn bộ.
+    def __init__(self, client, spawn=spawn_subscribe, restart_delay=RESTART_DELAY):
+        self.client = client
+        self.spawn = spawn
+        self.restart_delay = restart_delay
+        self.default_sink = None
+        self.volume_watchers = {}  # tên sink -> on_change(tên sink, mức, muted)
+        self._emit = None
+        self._process = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self, emit):
+        try:
+            self._process = self.spawn()
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.error("PactlEventSource: Không chạy được `pactl subscribe`: %s", e)
+            return False
+        self._emit = emit
+        self._stopped.clear()
+        try:
+            self.default_sink = self.client.default_sink()
+        except Exception as e:
+            logging.debug("PactlEventSource: Không đọc được sink mặc định: %s", e)
+        self._thread = threading.Thread(target=self._run, name="PactlEventSource", daemon=True)
+        self._thread.start()
+        logging.info("PactlEventSource: Đã đăng ký nhận sự kiện từ PulseAudio/PipeWire")
+        return True
+
+    def stop(self):
+        self._stopped.set()
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.terminate()
+            except Exception:
+                pass
+
+    def _run(self):
+        while not self._stopped.is_set():
+            process = self._process
+            if process is None:
+                break
+            for line in process.stdout:
+                if self._stopped.is_set():
+                    return
+                try:
+                    self.handle_line(line)
+                except Exception as e:
+                    logging.error("PactlEventSource: Lỗi khi xử lý sự kiện '%s': %s", line.strip(), e)
+            try:
+                process.wait(timeout=1)
+            except Exception:
+                pass
+            if self._stopped.wait(self.restart_delay):
+                return
+            logging.warning("PactlEventSource: `pactl subscribe` đã dừng, chạy lại")
+            try:
+                self._process = self.spawn()
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.error("PactlEventSource: Không chạy lại được `pactl subscribe`: %s", e)
+                continue
+            self._emit(make_event(device_events.POLL))
+
+    def handle_line(self, line):
+        parsed = parse_event(line)
+        if parsed is None:
+            return
+        action, facility, index = parsed
+        if facility == "sink":
+            if action == "new":
+                name = self.client.name_for_index(index)
+                if name:
+                    self._emit(make_event(device_events.DEVICE_ADDED, name, RENDER))
+            elif action == "remove":
+                name = self.client.forget_index(index)
+                if name:
+                    self._emit(make_event(device_events.DEVICE_REMOVED, name, RENDER))
+            elif action == "change":
+                # Đổi âm lượng/trạng thái treo: chỉ đọc lại mức khi có người theo dõi sink này
+                self._notify_volume(self.client.name_for_index(index, refresh=False))
+        elif facility == "server" and action == "change":
+            default_sink = self.client.default_sink()
+            if default_sink and default_sink != self.default_sink:
+                self.default_sink = default_sink
+                # PulseAudio không có ERole: một sink mặc định cho mọi role
+                for role in ROLES:
+                    self._emit(make_event(device_events.DEFAULT_CHANGED, default_sink, RENDER, role))
+
+    def _notify_volume(self, name):
+        on_change = self.volume_watchers.get(name)
+        if on_change is not None:
+            on_change(name, self.client.get_sink_volume(name), False)
+
+
+class PulseAudioBackend:
+    def __init__(self, run=run_pactl, spawn=spawn_subscribe):
+        self.client = PactlClient(run)
+        self.source = PactlEventSource(self.client, spawn)
+
+    def _record(self, sink):
+        return EndpointRecord(sink["name"], sink["description"] or sink["name"], STATE_ACTIVE, RENDER)
+
+    def enumerate_endpoints(self):
+        records = [self._record(sink) for sink in self.client.list_sinks()]
+        default_sink = self.client.default_sink()
+        defaults = {(RENDER, role): default_sink for role in ROLES} if default_sink else {}
+        return records, defaults
+
+    def read_endpoint(self, device_id):
+        for sink in self.client.list_sinks():
+            if sink["name"] == device_id:
+                return self._record(sink)
+        raise LookupError(device_id)
+
+    def activate(self, device_id):
+        return PulseSinkVolume(self.client, device_id)
+
+    def set_default_endpoint(self, device_id, roles=ROLES):
+        self.client.set_default_sink(device_id)
+
+    def watch_volume(self, device_id, on_change):
+        self.source.volume_watchers[device_id] = on_change
+
+        def unwatch():
+            if self.source.volume_watchers.get(device_id) is on_change:
+                del self.source.volume_watchers[device_id]
+
+        return unwatch
+
+    # --- Tham số khởi tạo VolumeEngine ---
+    def engine_options(self):
+        from device_registry import DeviceRegistry
+        from volume_control import VolumeHandlePool
+        return {
+            "registry": DeviceRegistry(self.enumerate_endpoints, self.read_endpoint),
+            "volume_pool": VolumeHandlePool(self.activate),
+            "event_source": self.source,
+            "set_default_endpoint": self.set_default_endpoint,
+            "watch_volume": self.watch_volume,
+            "init_thread": None,
+            "backend": "pulse",
+        }
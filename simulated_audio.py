@@ -0,0 +1,216 @@
+# === Backend âm thanh giả lập (chạy trong tiến trình, không cần Windows) ===
+# Thay cho lớp COM trong windows_audio: danh sách endpoint, thiết bị mặc định theo
+# (flow, role), IAudioEndpointVolume và SetDefaultEndpoint, với độ trễ cấu hình được
+# cho mỗi lời gọi. Thay đổi phần cứng (đổi thiết bị mặc định, cắm/rút thiết bị) được
+# báo qua ScriptedEventSource giống IMMNotificationClient, nên VolumeEngine, registry,
+# vòng giám sát và view-model thật chạy được trên Linux (benchmark, tái hiện lỗi).
+import random
+import threading
+import time
+
+import device_events
+from device_events import ScriptedEventSource
+from device_registry import EndpointRecord, RENDER, ROLES, STATE_ACTIVE
+
+STATE_DISABLED = 0x2  # DEVICE_STATE_DISABLED
+
+
+class SimulatedEndpointVolume:
+    def __init__(self, backend, device_id):
+        self.backend = backend
+        self.device_id = device_id
+
+    def SetMasterVolumeLevelScalar(self, level, context):
+        self.backend._com_call("set_volume")
+        self.backend._set_level(self.device_id, level)
+
+    def GetMasterVolumeLevelScalar(self):
+        self.backend._com_call("get_volume")
+        return self.backend.levels.get(self.device_id, 1.0)
+
+
+class SimulatedAudioBackend:
+    #   devices: số endpoint phát; latency: độ trễ (giây) của mỗi lời gọi COM giả;
+    #   enumerate_latency: độ trễ thêm cho mỗi endpoint khi duyệt toàn bộ
+    def __init__(self, devices=4, latency=0.0, enumerate_latency=None, flow=RENDER, seed=1):
+        self.latency = latency
+        self.enumerate_latency = latency if enumerate_latency is None else enumerate_latency
+        self.flow = flow
+        self.random = random.Random(seed)
+        self.source = ScriptedEventSource()
+        self._lock = threading.Lock()
+        self.records = {}
+        self.defaults = {}
+        self.levels = {}  # device_id -> mức âm lượng hiện tại
+        self.calls = {}   # tên thao tác -> số lần gọi
+        self.next_index = 0
+        self.volume_changed = threading.Condition(self._lock)
+        self.volume_writes = 0
+        self.volume_watchers = {}  # device_id -> on_change(device_id, mức, muted)
+        for _ in range(devices):
+            self.add_device(notify=False)
+        if self.records:
+            first = next(iter(self.records))
+            for role in ROLES:
+                self.defaults[(flow, role)] = first
+
+    # --- Lời gọi COM giả ---
+    def _com_call(self, op, cost=None):
+        self.calls[op] = self.calls.get(op, 0) + 1
+        delay = self.latency if cost is None else cost
+        if delay:
+            time.sleep(delay)
+
+    def enumerate_endpoints(self):
+        with self._lock:
+            records = list(self.records.values())
+            defaults = dict(self.defaults)
+        self._com_call("enumerate_endpoints", self.latency + self.enumerate_latency * len(records))
+        return records, defaults
+
+    def read_endpoint(self, device_id):
+        self._com_call("read_endpoint")
+        with self._lock:
+            record = self.records.get(device_id)
+        if record is None:
+            raise LookupError(device_id)
+        return record
+
+    def activate(self, device_id):
+        self._com_call("activate", self.latency * 3)  # GetDevice + Activate + QueryInterface
+        if device_id not in self.records:
+            raise LookupError(device_id)
+        return SimulatedEndpointVolume(self, device_id)
+
+    def set_default_endpoint(self, device_id, roles=ROLES):
+        for role in roles:
+            self._com_call("set_default_endpoint")
+            self.set_default(device_id, roles=(role,))
+
+    def _set_level(self, device_id, level):
+        with self.volume_changed:
+            self.levels[device_id] = level
+            self.volume_writes += 1
+            self.volume_changed.notify_all()
+            on_change = self.volume_watchers.get(device_id)
+        # Như IAudioEndpointVolumeCallback: báo cho mọi thay đổi, kể cả do chính mình đặt
+        if on_change is not None:
+            on_change(device_id, level, False)
+
+    def watch_volume(self, device_id, on_change):
+        self._com_call("register_volume_callback")
+        with self._lock:
+            self.volume_watchers[device_id] = on_change
+
+        def unwatch():
+            with self._lock:
+                if self.volume_watchers.get(device_id) is on_change:
+                    del self.volume_watchers[device_id]
+
+        return unwatch
+
+    def user_set_volume(self, device_id, level):
+        # Người dùng chỉnh âm lượng (phím, flyout) ngoài VolumeSetter
+        self._set_level(device_id, level)
+
+    def wait_for_volume(self, writes, timeout=5.0):
+        # Chờ tới khi tổng số lần đặt âm lượng đạt `writes`; trả về False nếu hết thời gian
+        with self.volume_changed:
+            return self.volume_changed.wait_for(lambda: self.volume_writes >= writes, timeout)
+
+    # --- Thay đổi "phần cứng", báo qua nguồn sự kiện ---
+    # notify=False: chỉ đổi trạng thái, người gọi tự phát sự kiện (phát lại trace)
+    def add_device(self, name=None, notify=True, device_id=None, flow=None):
+        flow = self.flow if flow is None else flow
+        with self._lock:
+            index = self.next_index
+            self.next_index += 1
+            record = EndpointRecord(device_id or f"sim-{index}", name or f"Simulated Device {index}", STATE_ACTIVE, flow)
+            self.records[record.id] = record
+            self.levels[record.id] = 1.0
+        if notify:
+            self.source.inject(device_events.DEVICE_ADDED, record.id, flow)
+        return record.id
+
+    def remove_device(self, device_id, notify=True):
+        with self._lock:
+            record = self.records.pop(device_id, None)
+            if record is None:
+                return False
+        if notify:
+            self.source.inject(device_events.DEVICE_REMOVED, device_id, record.flow)
+        return True
+
+    def set_state(self, device_id, state, notify=True):
+        with self._lock:
+            record = self.records.get(device_id)
+            if record is None or record.state == state:
+                return False
+            self.records[device_id] = record._replace(state=state)
+        if notify:
+            self.source.inject(device_events.STATE_CHANGED, device_id, record.flow, state=state)
+        return True
+
+    def set_default(self, device_id, roles=ROLES, flow=None, notify=True):
+        # Windows báo OnDefaultDeviceChanged cho từng role
+        flow = self.flow if flow is None else flow
+        with self._lock:
+            for role in roles:
+                self.defaults[(flow, role)] = device_id
+        if notify:
+            for role in roles:
+                self.source.inject(device_events.DEFAULT_CHANGED, device_id, flow, role)
+
+    def load_snapshot(self, records, defaults):
+        # Trạng thái dạng DeviceRegistry.snapshot() (từ trace): thay toàn bộ, không phát sự kiện
+        with self._lock:
+            self.records = {r.id: r for r in (EndpointRecord(*item) for item in records)}
+            self.defaults = {(flow, role): device_id for flow, role, device_id in defaults}
+            for device_id in self.records:
+                self.levels.setdefault(device_id, 1.0)
+
+    def default_id(self, role=ROLES[1]):
+        return self.defaults.get((self.flow, role))
+
+    def active_ids(self):
+        with self._lock:
+            return [r.id for r in self.records.values() if r.state == STATE_ACTIVE]
+
+    def pick_other(self):
+        # Một thiết bị đang hoạt động khác thiết bị mặc định hiện tại
+        current = self.default_id()
+        candidates = [device_id for device_id in self.active_ids() if device_id != current]
+        return self.random.choice(candidates) if candidates else None
+
+    def churn(self):
+        # Một thay đổi ngẫu nhiên không đụng tới thiết bị mặc định: tắt/bật một thiết bị
+        # hoặc rút ra rồi cắm một thiết bị mới
+        current = self.default_id()
+        with self._lock:
+            candidates = [device_id for device_id in self.records if device_id != current]
+        if not candidates:
+            return self.add_device()
+        device_id = self.random.choice(candidates)
+        action = self.random.random()
+        if action < 0.5:
+            state = STATE_DISABLED if self.records[device_id].state == STATE_ACTIVE else STATE_ACTIVE
+            self.set_state(device_id, state)
+        else:
+            self.remove_device(device_id)
+            self.add_device()
+        return device_id
+
+    # --- Tham số khởi tạo VolumeEngine ---
+    def engine_options(self):
+        from device_registry import DeviceRegistry
+        from volume_control import VolumeHandlePool
+        return {
+            "registry": DeviceRegistry(self.enumerate_endpoints, self.read_endpoint),
+            "volume_pool": VolumeHandlePool(self.activate),
+            "event_source": self.source,
+            "set_default_endpoint": self.set_default_endpoint,
+            "watch_volume": self.watch_volume,
+            "init_thread": None,
+            "backend": "simulated",
+            "notify": None,
+        }
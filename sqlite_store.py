@@ -0,0 +1,246 @@
+# === Lưu cấu hình bằng SQLite (tùy chọn, bật bằng --store sqlite) ===
+# Cùng giao diện với ConfigCache (get/update/update_app/flush/record_apply) nên engine
+# và các hàm load_volume_config/save_config dùng được mà không đổi gì. Mỗi thay đổi là
+# một transaction nhỏ (upsert một dòng + một dòng lịch sử) thay vì ghi lại cả file JSON.
+#
+# Bảng:
+#   devices     : thiết bị theo FriendlyName (UNIQUE) và ID endpoint (có index)
+#   contexts    : mức âm lượng theo (thiết bị, ngữ cảnh)
+#   app_levels  : mức âm lượng theo (thiết bị, tiến trình) - khóa "apps" trong JSON
+#   volume_log  : lịch sử chỉ ghi thêm: người dùng lưu ("save") / ứng dụng áp dụng ("apply")
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config_store import APPS_KEY, CONFIG_FILE, resource_path
+from metrics import metrics
+from trace_recorder import tracer
+
+DB_FILE = "volume_config.db"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    endpoint_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_devices_endpoint ON devices(endpoint_id);
+CREATE TABLE IF NOT EXISTS contexts (
+    device INTEGER NOT NULL REFERENCES devices(id),
+    context TEXT NOT NULL,
+    level REAL NOT NULL,
+    PRIMARY KEY (device, context)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_levels (
+    device INTEGER NOT NULL REFERENCES devices(id),
+    process TEXT NOT NULL,
+    level REAL NOT NULL,
+    PRIMARY KEY (device, process)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS volume_log (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    device INTEGER NOT NULL REFERENCES devices(id),
+    context TEXT,
+    level REAL NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_volume_log_device_time ON volume_log(device, time);
+"""
+
+
+def get_db_path():
+    return os.path.join(os.getenv("APPDATA"), "VolumeSetter", DB_FILE)
+
+
+class SQLiteStore:
+    def __init__(self, path=None, json_path=None):
+        self.path = path or get_db_path()
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._data = None
+        self._data_version = None
+        self._device_ids = {}  # tên -> devices.id
+        self.reads = 0   # số lần nạp lại toàn bộ từ DB
+        self.writes = 0  # số transaction ghi
+        if json_path is not None:
+            self.migrate_from_json(json_path)
+
+    # --- Chuyển dữ liệu từ volume_config.json (một lần) ---
+    def migrate_from_json(self, json_path):
+        with self._lock:
+            if self._meta("migrated_from") is not None:
+                return False
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                data = self._bundled_default()
+            except Exception as e:
+                logging.error("SQLiteStore: Không đọc được %s để chuyển dữ liệu: %s", json_path, e)
+                return False
+
+            now = time.time()
+            with self._transaction() as cur:
+                for device_name, levels in data.items():
+                    device = self._device_id(cur, device_name)
+                    for context, level in levels.items():
+                        if context == APPS_KEY:
+                            cur.executemany(
+                                "INSERT OR REPLACE INTO app_levels(device, process, level) VALUES (?, ?, ?)",
+                                [(device, process.lower(), value) for process, value in level.items()])
+                        else:
+                            cur.execute("INSERT OR REPLACE INTO contexts(device, context, level) VALUES (?, ?, ?)",
+                                        (device, context, level))
+                cur.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from', ?)",
+                            (f"{json_path} @ {now:.0f}",))
+            logging.info("SQLiteStore: Đã chuyển %s thiết bị từ %s", len(data), json_path)
+            self._data = None
+            return True
+
+    @staticmethod
+    def _bundled_default():
+        try:
+            with open(resource_path(CONFIG_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @contextmanager
+    def _transaction(self):
+        start = time.perf_counter()
+        cur = self._conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            yield cur
+        except BaseException:
+            cur.execute("ROLLBACK")
+            # ID thiết bị vừa thêm trong transaction bị hủy không còn hợp lệ
+            self._device_ids = {}
+            self._data = None
+            raise
+        cur.execute("COMMIT")
+        self.writes += 1
+        metrics.observe("config_io", time.perf_counter() - start, op="write")
+        tracer.record("config_write", changes=1)
+
+    def _device_id(self, cur, device_name, endpoint_id=None):
+        device = self._device_ids.get(device_name)
+        if device is None:
+            cur.execute("INSERT OR IGNORE INTO devices(name, endpoint_id) VALUES (?, ?)", (device_name, endpoint_id))
+            device = cur.execute("SELECT id FROM devices WHERE name = ?", (device_name,)).fetchone()[0]
+            self._device_ids[device_name] = device
+        if endpoint_id is not None:
+            cur.execute("UPDATE devices SET endpoint_id = ? WHERE id = ? AND endpoint_id IS NOT ?",
+                        (endpoint_id, device, endpoint_id))
+        return device
+
+    # --- Đọc: toàn bộ cấu hình ở dạng dict giống JSON, nạp lại khi DB bị tiến trình khác sửa ---
+    def get(self):
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data is not None and data_version == self._data_version:
+                return self._data
+            self.reads += 1
+            data = {}
+            self._device_ids = {}
+            names = {}
+            for device, name in self._conn.execute("SELECT id, name FROM devices"):
+                names[device] = name
+                self._device_ids[name] = device
+                data[name] = {}
+            for device, context, level in self._conn.execute("SELECT device, context, level FROM contexts"):
+                data[names[device]][context] = level
+            for device, process, level in self._conn.execute("SELECT device, process, level FROM app_levels"):
+                data[names[device]].setdefault(APPS_KEY, {})[process] = level
+            self._data = data
+            self._data_version = data_version
+            tracer.record("config_read", devices=len(data))
+            return data
+
+    def get_level_by_endpoint(self, endpoint_id, context="default"):
+        row = self._conn.execute(
+            "SELECT c.level FROM devices d JOIN contexts c ON c.device = d.id WHERE d.endpoint_id = ? AND c.context = ?",
+            (endpoint_id, context)).fetchone()
+        return row[0] if row else None
+
+    def history(self, device_name, limit=100):
+        # [(time, context, level, kind)] mới nhất trước
+        return self._conn.execute(
+            "SELECT l.time, l.context, l.level, l.kind FROM volume_log l JOIN devices d ON d.id = l.device "
+            "WHERE d.name = ? ORDER BY l.time DESC LIMIT ?", (device_name, limit)).fetchall()
+
+    # --- Ghi: mỗi thay đổi một transaction ---
+    def update(self, device_name, volume_level, context="default"):
+        with self._lock:
+            data = self.get()
+            with self._transaction() as cur:
+                device = self._device_id(cur, device_name)
+                cur.execute("INSERT OR REPLACE INTO contexts(device, context, level) VALUES (?, ?, ?)",
+                            (device, context, volume_level))
+                cur.execute("INSERT INTO volume_log(time, device, context, level, kind) VALUES (?, ?, ?, ?, 'save')",
+                            (time.time(), device, context, volume_level))
+            levels = dict(data.get(device_name, {}))
+            levels[context] = volume_level
+            data[device_name] = levels
+            self._sync_version()
+
+    def update_app(self, device_name, process, volume_level):
+        with self._lock:
+            data = self.get()
+            process = process.lower()
+            with self._transaction() as cur:
+                device = self._device_id(cur, device_name)
+                cur.execute("INSERT OR REPLACE INTO app_levels(device, process, level) VALUES (?, ?, ?)",
+                            (device, process, volume_level))
+                cur.execute("INSERT INTO volume_log(time, device, context, level, kind) VALUES (?, ?, ?, ?, 'save')",
+                            (time.time(), device, f"{APPS_KEY}:{process}", volume_level))
+            levels = dict(data.get(device_name, {}))
+            apps = dict(levels.get(APPS_KEY, {}))
+            apps[process] = volume_level
+            levels[APPS_KEY] = apps
+            data[device_name] = levels
+            self._sync_version()
+
+    def record_apply(self, device_name, volume_level, context="default", device_id=None):
+        # Lịch sử mức đã áp dụng tự động; đồng thời ghi nhớ ID endpoint của thiết bị
+        with self._lock:
+            self.get()
+            with self._transaction() as cur:
+                device = self._device_id(cur, device_name, device_id)
+                cur.execute("INSERT INTO volume_log(time, device, context, level, kind) VALUES (?, ?, ?, ?, 'apply')",
+                            (time.time(), device, context, volume_level))
+            self._sync_version()
+
+    def _sync_version(self):
+        # Ghi của chính kết nối này không làm đổi data_version, nhưng lấy lại cho chắc chắn
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def flush(self):
+        return True  # mỗi thay đổi đã được commit ngay
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,61 @@
+# === Đo thời gian khởi động theo từng giai đoạn ===
+# Ghi lại thời điểm bắt đầu/kết thúc của từng giai đoạn (import, giám sát, Tk, tray...)
+# tính từ lúc tiến trình bắt đầu chạy mã Python, tương tự -X importtime nhưng theo
+# giai đoạn. Mỗi lần khởi động thêm một dòng JSON vào logs/startup_times.jsonl để
+# so sánh giữa các phiên bản.
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+REPORT_FILE = "startup_times.jsonl"
+
+
+class StartupTimer:
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.phases = []  # (tên, bắt đầu_ms, thời_lượng_ms)
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, (start - self.t0) * 1000, (end - start) * 1000))
+
+    def mark(self, name):
+        # Mốc tức thời (thời lượng 0), vd. "monitor ready"
+        self.phases.append((name, (time.perf_counter() - self.t0) * 1000, 0.0))
+
+    def format_report(self):
+        lines = ["startup: bắt đầu (ms) | thời lượng (ms) | giai đoạn"]
+        for name, start_ms, duration_ms in self.phases:
+            lines.append(f"startup: {start_ms:10.1f} | {duration_ms:10.1f} | {name}")
+        lines.append(f"startup: tổng {(time.perf_counter() - self.t0) * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def report(self, log_dir=None):
+        if self.reported:
+            return
+        self.reported = True
+        total_ms = (time.perf_counter() - self.t0) * 1000
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info("%s", self.format_report())
+
+        if log_dir is None:
+            return
+        record = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "total_ms": round(total_ms, 2),
+            "phases": [{"name": n, "start_ms": round(s, 2), "duration_ms": round(d, 2)} for n, s, d in self.phases],
+        }
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            with open(os.path.join(log_dir, REPORT_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.error("StartupTimer: Không ghi được báo cáo khởi động: %s", e)
@@ -0,0 +1,83 @@
+# Kiểm tra ConfigCache chỉ đọc file khi chữ ký (mtime, kích thước, inode) thay đổi, và tự
+# ghi lại khi lần ghi xuống đĩa bị lỗi
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigCache  # noqa: E402
+
+
+def write_config(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_get_reads_file_once_until_it_changes(tmp_path):
+    path = str(tmp_path / "volume_config.json")
+    write_config(path, {"Speakers": {"default": 0.5}})
+    cache = ConfigCache(path, flush_delay=None)
+
+    assert cache.get()["Speakers"]["default"] == 0.5
+    assert cache.reads == 1
+    for _ in range(100):
+        cache.get()
+    assert cache.reads == 1
+
+    # Tiến trình khác sửa file: mtime và kích thước mới -> đọc lại đúng một lần
+    write_config(path, {"Speakers": {"default": 0.25}, "Headphones": {"default": 0.4}})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get()["Speakers"]["default"] == 0.25
+    assert cache.get()["Headphones"]["default"] == 0.4
+    assert cache.reads == 2
+
+
+def test_save_and_flush_do_not_cause_extra_read(tmp_path):
+    path = str(tmp_path / "volume_config.json")
+    write_config(path, {"Speakers": {"default": 0.5}})
+    cache = ConfigCache(path, flush_delay=None)
+    cache.get()
+
+    cache.update("Speakers", 0.3, "music")
+    assert cache.flush()
+    assert cache.writes == 1
+    assert cache.get()["Speakers"] == {"default": 0.5, "music": 0.3}
+    assert cache.reads == 1
+
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["Speakers"]["music"] == 0.3
+
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    path = str(tmp_path / "volume_config.json")
+    write_config(path, {"Speakers": {"default": 0.5}})
+    cache = ConfigCache(path, flush_delay=0.01, retry_delay=0.05)
+    cache.get()
+
+    # File đích bị khóa (antivirus): mọi lần os.replace của lần ghi đầu (kể cả các lần thử
+    # lại bên trong write_json_atomic) đều lỗi
+    real_replace = os.replace
+    failures = {"left": 3}
+
+    def locked_replace(src, dst):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise PermissionError(13, "The process cannot access the file", dst)
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", locked_replace)
+    cache.update("Speakers", 0.3)
+    assert not cache.flush()
+    assert cache.failures == 1 and cache.writes == 0
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+    # Không có update() nào nữa: timer thử lại tự ghi
+    deadline = time.monotonic() + 5
+    while cache.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.writes == 1 and cache.failures == 0
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["Speakers"]["default"] == 0.3
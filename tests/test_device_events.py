@@ -0,0 +1,115 @@
+# DeviceMonitor với ScriptedEventSource trên Linux: một loạt DEFAULT_CHANGED (Windows báo cho
+# từng role) chỉ cho một lần áp dụng, và poll dự phòng vẫn phát hiện thay đổi không có sự kiện
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from device_events import (DEFAULT_CHANGED, POLL, DeviceMonitor, EventSource,  # noqa: E402
+                           ScriptedEventSource)
+from device_registry import RENDER, ROLES  # noqa: E402
+
+
+class Devices:
+    # Thiết bị mặc định "hiện tại" và các lần áp dụng (on_device_changed)
+    def __init__(self, current="Speakers"):
+        self.current = current
+        self.applied = []
+        self.changed = threading.Event()
+
+    def on_device_changed(self, name, event):
+        self.applied.append((name, event.kind))
+        self.changed.set()
+
+    def wait(self, timeout=2):
+        ok = self.changed.wait(timeout)
+        self.changed.clear()
+        return ok
+
+
+def make_monitor(devices, source, **options):
+    return DeviceMonitor(get_current_device=lambda: devices.current,
+                         on_device_changed=devices.on_device_changed, source=source, **options)
+
+
+def run_in_thread(monitor):
+    thread = threading.Thread(target=monitor.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_default_changed_burst_is_one_check_and_one_apply():
+    devices = Devices()
+    monitor = make_monitor(devices, ScriptedEventSource())
+    assert monitor.check()
+    assert devices.applied == [("Speakers", POLL)]
+
+    devices.current = "Headphones"
+    monitor.source.start(monitor.emit)
+    for role in ROLES:
+        monitor.source.inject(DEFAULT_CHANGED, "{headphones}", RENDER, role)
+
+    events = monitor._next_events(0.1)
+    assert [e.kind for e in events] == [DEFAULT_CHANGED] * len(ROLES)
+    assert monitor.check(events)
+    assert devices.applied[-1] == ("Headphones", DEFAULT_CHANGED)
+    assert 0 <= monitor.last_latency < 1.0
+    assert not monitor.check(events)  # thiết bị không đổi: không áp dụng lại
+
+
+def test_event_driven_monitor_applies_once_per_burst():
+    devices = Devices()
+    source = ScriptedEventSource()
+    monitor = make_monitor(devices, source, fallback_interval=30)
+    thread = run_in_thread(monitor)
+    try:
+        assert devices.wait()
+        assert monitor.event_driven
+
+        devices.current = "Headphones"
+        for role in ROLES:
+            source.inject(DEFAULT_CHANGED, "{headphones}", RENDER, role)
+        assert devices.wait()
+        time.sleep(0.1)
+        assert devices.applied == [("Speakers", POLL), ("Headphones", DEFAULT_CHANGED)]
+        assert monitor.last_latency < 0.5
+    finally:
+        monitor.stop()
+        thread.join(2)
+
+
+def test_fallback_poll_without_event_source():
+    class BrokenSource(EventSource):
+        # Không đăng ký được IMMNotificationClient
+        def start(self, emit):
+            return False
+
+    devices = Devices()
+    monitor = make_monitor(devices, BrokenSource(), poll_interval=0.02)
+    thread = run_in_thread(monitor)
+    try:
+        assert devices.wait()
+        assert not monitor.event_driven
+        devices.current = "Headphones"  # không có sự kiện nào: chỉ poll mới thấy
+        assert devices.wait()
+        assert devices.applied[-1] == ("Headphones", POLL)
+    finally:
+        monitor.stop()
+        thread.join(2)
+
+
+def test_fallback_poll_when_an_event_is_missed():
+    devices = Devices()
+    monitor = make_monitor(devices, ScriptedEventSource(), fallback_interval=0.05)
+    thread = run_in_thread(monitor)
+    try:
+        assert devices.wait()
+        assert monitor.event_driven
+        devices.current = "Headphones"
+        assert devices.wait()
+        assert devices.applied[-1] == ("Headphones", POLL)
+    finally:
+        monitor.stop()
+        thread.join(2)
@@ -0,0 +1,40 @@
+# RateLimitFilter: chỉ bớt các dòng DEBUG lặp lại, không bao giờ bỏ INFO/WARNING/ERROR
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_setup import RateLimitFilter, _Formatter  # noqa: E402
+
+
+def make_record(level, msg, *args, lineno=10):
+    return logging.LogRecord("root", level, "engine.py", lineno, msg, args, None)
+
+
+def test_only_repeated_debug_lines_are_limited():
+    now = [0.0]
+    limiter = RateLimitFilter(interval=60, burst=5, clock=lambda: now[0])
+
+    passed = [limiter.filter(make_record(logging.DEBUG, "check: %s", "Speakers")) for _ in range(20)]
+    assert passed.count(True) == 5
+
+    # Cùng chỗ gọi, tham số khác (thiết bị khác): tính riêng
+    assert limiter.filter(make_record(logging.DEBUG, "check: %s", "Headphones"))
+
+    # Lỗi và INFO từ chỗ gọi dùng chung không bao giờ bị bỏ
+    assert all(limiter.filter(make_record(logging.ERROR, "save_config: %s", "locked", lineno=20)) for _ in range(50))
+    assert all(limiter.filter(make_record(logging.INFO, "apply: %s", "Speakers", lineno=30)) for _ in range(50))
+
+
+def test_suppressed_count_is_reported_without_touching_the_message():
+    now = [0.0]
+    limiter = RateLimitFilter(interval=60, burst=1, clock=lambda: now[0])
+    for _ in range(4):
+        limiter.filter(make_record(logging.DEBUG, "poll: %s", 1))
+
+    now[0] = 61.0
+    record = make_record(logging.DEBUG, "poll: %s", 1)
+    assert limiter.filter(record)
+    assert record.msg == "poll: %s" and record.suppressed == 3
+    assert _Formatter("%(message)s").format(record) == "poll: 1 [đã bỏ qua 3 dòng tương tự]"
@@ -0,0 +1,74 @@
+# NotificationDispatcher với notifier và đồng hồ giả: gộp thông báo cùng khóa, khoảng cách
+# tối thiểu giữa hai thông báo, bỏ thông báo quá cũ
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifications import NotificationDispatcher  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_dispatcher(**options):
+    clock = FakeClock()
+    shown = []
+    dispatcher = NotificationDispatcher(notifier=lambda title, message, timeout: shown.append(message),
+                                        quiet_period=3.0, max_delay=15.0, min_interval=5.0, max_age=30.0,
+                                        clock=clock, autostart=False, **options)
+    return dispatcher, clock, shown
+
+
+def test_repeated_key_is_coalesced_to_latest_message():
+    dispatcher, clock, shown = make_dispatcher()
+    # Tai nghe kết nối/ngắt năm lần trong mười giây
+    for i in range(5):
+        clock.now = i * 2.0
+        dispatcher.post("device_changed", "Thiết bị", f"lần {i}")
+    assert dispatcher.coalesced == 4
+    assert dispatcher.next_due() == 8.0 + 3.0
+
+    clock.now = 10.9
+    assert not dispatcher.process()
+    clock.now = 11.0
+    assert dispatcher.process()
+    assert shown == ["lần 4"]
+    assert not dispatcher.process()
+
+
+def test_continuous_posts_are_shown_after_max_delay():
+    dispatcher, clock, shown = make_dispatcher()
+    for i in range(40):
+        clock.now = i * 0.5
+        dispatcher.post("device_changed", "Thiết bị", f"lần {i}")
+        dispatcher.process()
+    assert shown == ["lần 30"]  # giây thứ 15 dù sự kiện vẫn tới dồn
+
+
+def test_min_interval_uses_the_time_passed_to_process():
+    dispatcher, clock, shown = make_dispatcher()
+    dispatcher.post("a", "A", "a", quiet_period=0)
+    dispatcher.post("b", "B", "b", quiet_period=0)
+
+    # Đồng hồ thật ở rất xa: min_interval phải tính từ `now` được truyền vào
+    clock.now = 1000.0
+    assert dispatcher.process(now=10.0)
+    assert dispatcher._last_shown == 10.0
+    assert not dispatcher.process(now=14.9)
+    assert dispatcher.process(now=15.0)
+    assert shown == ["a", "b"]
+    assert dispatcher.shown == 2
+
+
+def test_stale_notifications_are_dropped():
+    dispatcher, clock, shown = make_dispatcher()
+    dispatcher.post("a", "A", "cũ")
+    clock.now = 31.0
+    assert not dispatcher.process()
+    assert dispatcher.dropped == 1 and shown == []
@@ -0,0 +1,182 @@
+# Backend PulseAudio với pactl giả: đầu ra `pactl list sinks` / `info` / `get-sink-volume`
+# và luồng `pactl subscribe` được dựng sẵn, không cần server âm thanh thật
+import io
+import os
+import subprocess
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import device_events  # noqa: E402
+from device_registry import RENDER, ROLES  # noqa: E402
+from pulse_audio import (PactlEventSource, PulseAudioBackend, parse_default_sink,  # noqa: E402
+                         parse_event, parse_sinks)
+
+LIST_SINKS = """Sink #53
+\tState: RUNNING
+\tName: alsa_output.pci-0000_00_1f.3.analog-stereo
+\tDescription: Built-in Audio Analog Stereo
+\tDriver: PipeWire
+\tMute: no
+\tVolume: front-left: 42597 /  65% / -11.23 dB,   front-right: 42597 /  65% / -11.23 dB
+\t        balance 0.00
+\tBase Volume: 65536 / 100% / 0.00 dB
+
+Sink #61
+\tState: SUSPENDED
+\tName: bluez_output.00_11_22_33_44_55.1
+\tDescription: BLS-B21 Headphones
+\tVolume: front-left: 32768 /  50% / -18.06 dB,   front-right: 32768 /  50% / -18.06 dB
+"""
+
+INFO = """Server String: /run/user/1000/pulse/native
+Server Name: PulseAudio (on PipeWire 1.0.5)
+Default Sink: alsa_output.pci-0000_00_1f.3.analog-stereo
+Default Source: alsa_input.pci-0000_00_1f.3.analog-stereo
+"""
+
+SPEAKERS = "alsa_output.pci-0000_00_1f.3.analog-stereo"
+HEADPHONES = "bluez_output.00_11_22_33_44_55.1"
+
+
+class FakePactl:
+    # Thay run_pactl: trả đầu ra dựng sẵn và ghi lại mọi lệnh
+    def __init__(self):
+        self.calls = []
+        self.default_sink = SPEAKERS
+        self.volumes = {SPEAKERS: 42597, HEADPHONES: 32768}
+
+    def __call__(self, args):
+        self.calls.append(list(args))
+        if args[:2] == ["list", "sinks"]:
+            return LIST_SINKS
+        if args == ["info"]:
+            return INFO.replace(SPEAKERS, self.default_sink, 1)
+        if args[0] == "get-sink-volume":
+            if args[1] not in self.volumes:
+                raise subprocess.CalledProcessError(1, args)
+            raw = self.volumes[args[1]]
+            return f"Volume: front-left: {raw} /  {raw * 100 // 65536}% / 0.00 dB,   front-right: {raw} /  0% / 0.00 dB\n"
+        if args[0] == "set-default-sink":
+            self.default_sink = args[1]
+            return ""
+        if args[0] == "set-sink-volume":
+            self.volumes[args[1]] = int(args[2])
+            return ""
+        raise AssertionError(f"lệnh pactl không mong đợi: {args}")
+
+    def count(self, *prefix):
+        return sum(1 for call in self.calls if call[:len(prefix)] == list(prefix))
+
+
+class FakeSubscribe:
+    # Thay `pactl subscribe`: mỗi lần spawn trả về một "tiến trình" với các dòng cho trước
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.spawned = 0
+
+    def __call__(self):
+        self.spawned += 1
+        lines = self.streams.pop(0) if self.streams else []
+        return _Process(lines)
+
+
+class _Process:
+    def __init__(self, lines):
+        self.stdout = io.StringIO("".join(line + "\n" for line in lines))
+
+    def wait(self, timeout=None):
+        return 0
+
+    def terminate(self):
+        pass
+
+
+def test_parse_pactl_output():
+    sinks = parse_sinks(LIST_SINKS)
+    assert [s["index"] for s in sinks] == [53, 61]
+    assert sinks[0]["name"] == SPEAKERS
+    assert sinks[0]["description"] == "Built-in Audio Analog Stereo"
+    assert sinks[0]["volume"] == 42597 / 65536
+    assert sinks[1]["state"] == "SUSPENDED"
+    assert parse_default_sink(INFO) == SPEAKERS
+    assert parse_event("Event 'remove' on sink #53") == ("remove", "sink", 53)
+    assert parse_event("Event 'change' on server #-1") == ("change", "server", -1)
+    assert parse_event("garbage") is None
+
+
+def make_source(pactl, *streams):
+    backend = PulseAudioBackend(run=pactl, spawn=FakeSubscribe(*streams))
+    events = []
+    backend.source.restart_delay = 0
+    backend.client.list_sinks()
+    backend.source.default_sink = pactl.default_sink
+    backend.source._emit = events.append
+    return backend, events
+
+
+def test_handle_line_maps_subscribe_events():
+    pactl = FakePactl()
+    backend, events = make_source(pactl)
+    source = backend.source
+
+    source.handle_line("Event 'remove' on sink #61\n")
+    assert events[-1][:3] == (device_events.DEVICE_REMOVED, HEADPHONES, RENDER)
+
+    source.handle_line("Event 'new' on sink #61\n")  # chỉ số chưa biết: liệt kê lại để lấy tên
+    assert events[-1][:3] == (device_events.DEVICE_ADDED, HEADPHONES, RENDER)
+
+    # Server đổi nhưng sink mặc định giữ nguyên: không có sự kiện
+    count = len(events)
+    source.handle_line("Event 'change' on server #-1\n")
+    assert len(events) == count
+
+    pactl.default_sink = HEADPHONES
+    source.handle_line("Event 'change' on server #-1\n")
+    assert [(e.kind, e.device_id, e.role) for e in events[count:]] == \
+        [(device_events.DEFAULT_CHANGED, HEADPHONES, role) for role in ROLES]
+
+
+def test_sink_change_reads_one_sink_volume():
+    pactl = FakePactl()
+    backend, _ = make_source(pactl)
+    changes = []
+    unwatch = backend.watch_volume(SPEAKERS, lambda *args: changes.append(args))
+    lists_before = pactl.count("list", "sinks")
+
+    pactl.volumes[SPEAKERS] = 16384
+    for _ in range(50):
+        backend.source.handle_line("Event 'change' on sink #53\n")
+    assert changes[-1] == (SPEAKERS, 0.25, False)
+    assert len(changes) == 50
+    assert pactl.count("get-sink-volume") == 50
+    assert pactl.count("list", "sinks") == lists_before  # không liệt kê lại sink cho mỗi sự kiện
+
+    # Sink không được theo dõi: không đọc mức
+    backend.source.handle_line("Event 'change' on sink #61\n")
+    assert pactl.count("get-sink-volume") == 50
+
+    unwatch()
+    backend.source.handle_line("Event 'change' on sink #53\n")
+    assert len(changes) == 50
+
+
+def test_subscribe_restart_emits_poll():
+    pactl = FakePactl()
+    spawn = FakeSubscribe(["Event 'remove' on sink #61"], [])
+    source = PactlEventSource(PulseAudioBackend(run=pactl).client, spawn, restart_delay=0)
+    source.client.list_sinks()
+    events = []
+    received = threading.Event()
+
+    def emit(event):
+        events.append(event)
+        if event.kind == device_events.POLL:
+            received.set()
+
+    assert source.start(emit)
+    assert received.wait(2)
+    source.stop()
+    assert events[0].kind == device_events.DEVICE_REMOVED
+    assert spawn.spawned >= 2
@@ -0,0 +1,63 @@
+# Trace ghi từ engine chạy trên backend giả lập, xuất ra file rồi phát lại bằng
+# benchmarks/replay_trace.py: các lần áp dụng âm lượng phải khớp với lần chạy gốc
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from config_store import ConfigCache, write_json_atomic  # noqa: E402
+from engine import VolumeEngine  # noqa: E402
+from replay_trace import replay  # noqa: E402
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+from trace_recorder import tracer  # noqa: E402
+
+
+def settle(engine):
+    # Chờ vòng giám sát lấy hết sự kiện rồi chờ luồng âm thanh xử lý xong
+    deadline = time.monotonic() + 5
+    while not engine.monitor.events.empty() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.02)
+    engine.audio.call(lambda: None)
+
+
+@pytest.fixture
+def recorded_trace(tmp_path):
+    logging.getLogger().setLevel(logging.CRITICAL)
+    config_path = str(tmp_path / "volume_config.json")
+    write_json_atomic(config_path, {f"Simulated Device {i}": {"default": round(0.1 + i / 20, 2)} for i in range(8)})
+    backend = SimulatedAudioBackend(4)
+    tracer.clear()
+    engine = VolumeEngine(config=ConfigCache(config_path, flush_delay=None), **backend.engine_options())
+    engine.start()
+    try:
+        assert backend.wait_for_volume(1)
+        settle(engine)
+        for _ in range(5):
+            writes = backend.volume_writes
+            backend.set_default(backend.pick_other())
+            assert backend.wait_for_volume(writes + 1)
+            settle(engine)
+        writes = backend.volume_writes
+        engine.cycle_output_device().result(5)  # lệnh chuyển của chính VolumeSetter (phím tắt, khay)
+        assert backend.volume_writes == writes + 1
+        settle(engine)
+        backend.churn()
+        settle(engine)
+        return engine.dump_trace(str(tmp_path / "trace.jsonl"))
+    finally:
+        engine.stop()
+
+
+@pytest.mark.parametrize("speed", [0, 10])
+def test_replay_reproduces_recorded_applies(recorded_trace, speed):
+    result = replay(recorded_trace, speed)
+    assert result["original"]["applies"] == 7
+    assert result["applies_match"], result["first_difference"]
+    assert result["replay"]["switches"] == result["original"]["switches"]
@@ -0,0 +1,86 @@
+# VolumeLearner trên backend giả lập với đồng hồ giả: bỏ qua mức do chính VolumeSetter đặt
+# (VolumeHandlePool.is_own_write) và gộp một loạt callback thành một lần lưu
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulated_audio import SimulatedAudioBackend  # noqa: E402
+from volume_control import VolumeHandlePool  # noqa: E402
+from volume_learning import VolumeLearner  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_learner(debounce=2.0, max_delay=10.0):
+    clock = FakeClock()
+    backend = SimulatedAudioBackend(2)
+    pool = VolumeHandlePool(backend.activate, clock=clock)
+    saved = []
+    learner = VolumeLearner(lambda device_id, level: saved.append((device_id, level)), pool.is_own_write,
+                            debounce=debounce, max_delay=max_delay, clock=clock, autostart=False)
+    device_id = backend.default_id()
+    backend.watch_volume(device_id, learner.on_change)
+    learner.observe(device_id, backend.levels[device_id])
+    return learner, backend, pool, clock, saved, device_id
+
+
+def test_own_writes_are_not_learned():
+    learner, backend, pool, clock, saved, device_id = make_learner()
+
+    pool.set_volume(device_id, 0.3)  # callback đến ngay trong lời gọi
+    assert learner.ignored == 1
+    clock.now += 5
+    assert learner.process() == 0
+
+    # Người dùng kéo rồi VolumeSetter áp dụng mức đã lưu: lần kéo đang chờ bị thay
+    backend.user_set_volume(device_id, 0.55)
+    clock.now += 0.5
+    pool.set_volume(device_id, 0.4)
+    clock.now += 5
+    assert learner.process() == 0
+    assert saved == []
+
+    # Hết cửa sổ OWN_WRITE_WINDOW: cùng mức đó do người dùng đặt thì được học
+    backend.user_set_volume(device_id, 0.6)
+    backend.user_set_volume(device_id, 0.4)
+    clock.now += 5
+    assert learner.process() == 1
+    assert saved == [(device_id, 0.4)]
+    assert learner.changes == 5 and learner.ignored == 2
+
+
+def test_burst_of_callbacks_is_saved_once():
+    learner, backend, _, clock, saved, device_id = make_learner()
+
+    # Lăn chuột 2 giây: 200 callback
+    for i in range(200):
+        clock.now = i / 100
+        backend.user_set_volume(device_id, 0.3 + 0.4 * (i + 1) / 200)
+    assert learner.next_due() == 1.99 + 2.0
+    clock.now = 3.5
+    assert learner.process() == 0
+    clock.now = 4.0
+    assert learner.process() == 1
+    assert saved == [(device_id, 0.7)]
+    assert learner.coalesced == 199
+
+    # Thay đổi nhỏ hơn min_delta so với mức vừa học: bỏ qua
+    backend.user_set_volume(device_id, 0.701)
+    assert learner.next_due() is None
+
+
+def test_continuous_drag_is_saved_after_max_delay():
+    learner, backend, _, clock, saved, device_id = make_learner(debounce=2.0, max_delay=10.0)
+    for i in range(150):
+        clock.now = i / 10
+        backend.user_set_volume(device_id, 0.1 + i / 200)
+        learner.process()
+    assert len(saved) == 1
+    assert saved[0][1] == 0.1 + 100 / 200  # lưu ở giây thứ 10 dù vẫn đang kéo, với mức lúc đó
@@ -0,0 +1,108 @@
+# Heap mốc của VolumeSchedule với đồng hồ giả: mốc tiếp theo, khung giờ qua nửa đêm,
+# đồng hồ bị chỉnh tiến (máy ngủ qua mốc) hoặc lùi
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from volume_schedule import VolumeSchedule, is_active, next_boundary, parse_rule  # noqa: E402
+
+QUIET = {"name": "Giờ yên tĩnh", "days": ["mon", "tue", "wed", "thu", "fri"],
+         "from": "22:00", "to": "07:00", "max": 0.2}
+MEETING = {"name": "Họp", "from": "22:00", "to": "23:00", "min": 0.5, "devices": ["capture:Mic"]}
+
+
+def at(day, hour, minute=0, second=0):
+    # 19/10/2026 là thứ Hai
+    return datetime(2026, 10, 18 + day, hour, minute, second)
+
+
+MON, TUE, WED, FRI, SAT, SUN = 1, 2, 3, 5, 6, 7
+
+
+class FakeNow:
+    def __init__(self, now):
+        self.value = now
+
+    def __call__(self):
+        return self.value
+
+
+def make_schedule(now, *rules):
+    clock = FakeNow(now)
+    changes = []
+    schedule = VolumeSchedule([parse_rule(r, i) for i, r in enumerate(rules)], on_change=changes.append, now=clock)
+    return schedule, clock, changes
+
+
+def test_next_boundary_of_overnight_rule():
+    rule = parse_rule(QUIET)
+    assert next_boundary(rule, at(MON, 12)) == at(MON, 22)
+    assert next_boundary(rule, at(MON, 22)) == at(TUE, 7)
+    assert next_boundary(rule, at(MON, 23)) == at(TUE, 7)
+    # Khung giờ qua nửa đêm thuộc về ngày bắt đầu: thứ Sáu kéo sang sáng thứ Bảy
+    assert next_boundary(rule, at(FRI, 23)) == at(SAT, 7)
+    assert next_boundary(rule, at(SAT, 12)) == at(MON + 7, 22)
+    assert is_active(rule, at(SAT, 6, 59))
+    assert not is_active(rule, at(SUN, 6))
+    assert not is_active(rule, at(TUE, 7))
+
+
+def test_heap_steps_through_boundaries():
+    schedule, clock, changes = make_schedule(at(MON, 21), QUIET, MEETING)
+    assert schedule.limits == {}
+    assert schedule.next_due() == at(MON, 22)
+
+    clock.value = schedule.next_due()
+    assert schedule.process()
+    # Hai luật cùng mốc 22:00: giới hạn chỉ được tính lại một lần
+    assert schedule.boundaries == 2 and changes == [schedule.limits]
+    assert schedule.active_rules() == ["Giờ yên tĩnh", "Họp"]
+    assert schedule.clamp("Speakers", 0.5) == 0.2
+    assert schedule.clamp("capture:Mic", 0.1) == 0.5  # luật loa không áp cho micro
+    assert schedule.clamp("capture:Other", 0.9) == 0.9
+
+    assert schedule.next_due() == at(MON, 23)
+    clock.value = at(MON, 23)
+    assert schedule.process()
+    assert schedule.active_rules() == ["Giờ yên tĩnh"]
+
+    clock.value = at(TUE, 7)
+    assert schedule.process()
+    assert schedule.limits == {} and schedule.clamp("Speakers", 0.5) == 0.5
+    assert schedule.next_due() == at(TUE, 22)
+    assert len(changes) == 3
+
+
+def test_clock_jumping_forward_is_handled_by_current_time():
+    # Máy ngủ từ 21:00 thứ Hai tới 08:00 thứ Ba: cả khung giờ đã qua, không bật/tắt giới hạn
+    schedule, clock, changes = make_schedule(at(MON, 21), QUIET)
+    clock.value = at(TUE, 8)
+    assert not schedule.process()
+    assert changes == [] and schedule.limits == {}
+    assert schedule.next_due() == at(TUE, 22)
+
+    # Ngủ tiếp tới giữa khung giờ kế tiếp: giới hạn có hiệu lực ngay
+    clock.value = at(WED, 1)
+    assert schedule.process()
+    assert schedule.clamp("Speakers", 1.0) == 0.2
+    assert schedule.next_due() == at(WED, 7)
+    assert schedule.resyncs == 1
+
+
+def test_clock_moved_backward_rebuilds_heap():
+    schedule, clock, changes = make_schedule(at(MON, 23), QUIET)
+    assert schedule.clamp("Speakers", 1.0) == 0.2
+    assert changes == [{None: (0.0, 0.2)}]  # giới hạn lúc khởi động
+
+    # Lùi ít hơn CLOCK_TOLERANCE (đồng bộ NTP): không dựng lại
+    clock.value = at(MON, 22, 59, 59)
+    assert not schedule.process()
+    assert schedule.resyncs == 1
+
+    clock.value = at(MON, 20)
+    assert schedule.process()
+    assert schedule.resyncs == 2
+    assert schedule.limits == {} and changes[-1] == {} and len(changes) == 2
+    assert schedule.next_due() == at(MON, 22)
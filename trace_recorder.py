@@ -0,0 +1,85 @@
+# === Ghi vết (trace) sự kiện thiết bị để tái hiện lỗi ===
+# Báo lỗi kiểu "cắm dock mà không áp dụng âm lượng" hay "vài giây lại nhảy về mức cũ"
+# không tái hiện được chỉ từ debug.log. Bộ ghi giữ các sự kiện thiết bị, thay đổi thiết
+# bị mặc định, lần đặt âm lượng, đọc/ghi cấu hình... kèm thời điểm trong một ring buffer
+# (deque có maxlen: bộ nhớ bị chặn, bản ghi cũ nhất bị đẩy ra). Mỗi lần ghi chỉ là một
+# append tuple, không định dạng chuỗi hay I/O; chỉ khi xuất (lệnh dump-trace) mới ghi ra
+# file JSONL: dòng đầu là header (thời điểm, trạng thái thiết bị/cấu hình lúc xuất), mỗi
+# dòng sau là {"t": giây tính từ bản ghi đầu, "kind": ..., ...}.
+#
+# Phát lại: benchmarks/replay_trace.py cho trace chạy lại qua VolumeEngine với backend
+# giả lập, ở tốc độ gốc hoặc nhanh hơn.
+import json
+import logging
+import os
+import time
+from collections import deque
+
+TRACE_VERSION = 1
+TRACE_CAPACITY = 20000  # số bản ghi giữ lại (vài MB khi xuất)
+
+
+def get_trace_path():
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(os.getenv("APPDATA"), "VolumeSetter", "logs", f"trace-{stamp}.jsonl")
+
+
+class TraceRecorder:
+    def __init__(self, capacity=TRACE_CAPACITY, enabled=True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        # Mốc để đổi perf_counter sang giờ thật khi xuất
+        self._wall = time.time()
+        self._perf = time.perf_counter()
+        self.recorded = 0
+
+    def record(self, kind, at=None, **fields):
+        # at: thời điểm perf_counter của chính sự việc (vd. DeviceEvent.timestamp)
+        if not self.enabled:
+            return
+        self._entries.append((time.perf_counter() if at is None else at, kind, fields))
+        self.recorded += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.recorded = 0
+
+    @property
+    def dropped(self):
+        return max(0, self.recorded - len(self._entries))
+
+    def entries(self):
+        # Bản ghi theo thứ tự thời gian, t tính bằng giây từ bản ghi đầu tiên
+        items = sorted(list(self._entries), key=lambda item: item[0])
+        if not items:
+            return [], None
+        first = items[0][0]
+        started = self._wall + (first - self._perf)
+        return [{"t": round(at - first, 6), "kind": kind, **fields} for at, kind, fields in items], started
+
+    def dump(self, path=None, header=None):
+        path = path or get_trace_path()
+        entries, started = self.entries()
+        head = {"trace": TRACE_VERSION, "started": started, "entries": len(entries),
+                "dropped": self.dropped, **(header or {})}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in [head] + entries:
+                f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, path)
+        logging.info("TraceRecorder: Đã xuất %s bản ghi ra %s", len(entries), path)
+        return path
+
+
+def load_trace(path):
+    # -> (header, [bản ghi])
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("trace") != TRACE_VERSION:
+        raise ValueError(f"Không phải file trace hợp lệ: {path}")
+    return lines[0], lines[1:]
+
+
+tracer = TraceRecorder()
@@ -0,0 +1,69 @@
+# === View-model cho cửa sổ chính ===
+# Mọi việc cần tới thiết bị (duyệt lại endpoint, đặt âm lượng) là lệnh trên luồng âm
+# thanh của engine (AudioWorker), không bao giờ trên luồng Tk. Giao diện chỉ nhận
+# DeviceSnapshot bất biến, và chỉ khi ảnh chụp khác lần gửi trước.
+import logging
+import threading
+from collections import namedtuple
+
+import engine as engine_module
+
+# devices: tuple tên thiết bị phát đang hoạt động; default_device: tên thiết bị mặc định
+DeviceSnapshot = namedtuple("DeviceSnapshot", "devices default_device context")
+
+
+class DeviceViewModel:
+    #   publish(snapshot): được gọi từ luồng nền, giao diện tự chuyển về luồng của mình
+    def __init__(self, engine, publish):
+        self.engine = engine
+        self.publish = publish
+        self.published = 0
+        self._last = None
+        self._lock = threading.Lock()
+        engine.add_listener(self._on_engine_event)
+
+    def snapshot(self):
+        # Chỉ đọc từ DeviceRegistry (đã nạp sẵn), không duyệt lại thiết bị
+        return DeviceSnapshot(tuple(self.engine.get_audio_devices()),
+                              self.engine.get_default_device_name(),
+                              self.engine.active_context)
+
+    def publish_if_changed(self, force=False):
+        snapshot = self.snapshot()
+        with self._lock:
+            if not force and snapshot == self._last:
+                return False
+            self._last = snapshot
+            self.published += 1
+        self.publish(snapshot)
+        return True
+
+    def _on_engine_event(self, kind, device_name):
+        # Chạy trên luồng giám sát sau mỗi lần kiểm tra / khi thiết bị hoặc ngữ cảnh đổi
+        if kind in (engine_module.CHECKED, engine_module.DEVICE_CHANGED, engine_module.CONTEXT_CHANGED):
+            self.publish_if_changed()
+
+    # --- Yêu cầu từ giao diện: chỉ xếp lệnh, kết quả về qua callback trên luồng âm thanh ---
+    def request_publish(self):
+        self.engine.audio.submit(self.publish_if_changed, True)
+
+    def request_refresh(self):
+        # Người dùng bấm 🔄: duyệt lại phần cứng một lần rồi gửi ảnh chụp nếu có thay đổi
+        self.engine.refresh_devices_async().add_done_callback(self._on_refreshed)
+
+    def _on_refreshed(self, future):
+        if future.exception() is not None:
+            logging.error("DeviceViewModel: Lỗi khi duyệt thiết bị: %s", future.exception())
+        self.publish_if_changed()
+
+    def request_apply_volume(self, device_name, level, context, on_done):
+        # on_done(ok) được gọi trên luồng âm thanh
+        def done(future):
+            ok = future.exception() is None and future.result()
+            if ok:
+                self.engine.save_config(device_name, level, context)
+            on_done(ok)
+        self.engine.set_volume_async(level).add_done_callback(done)
+
+    def stop(self):
+        self.engine.remove_listener(self._on_engine_event)
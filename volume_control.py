@@ -0,0 +1,123 @@
+# === Đặt âm lượng theo ID endpoint với handle được giữ lại ===
+# Mỗi endpoint chỉ Activate(IAudioEndpointVolume) một lần cho mỗi luồng COM; các lần
+# đặt âm lượng sau dùng lại handle. Handle bị bỏ khi thiết bị bị gỡ hoặc đổi trạng
+# thái, hoặc khi lời gọi COM thất bại (thiết bị đã bị vô hiệu hóa) thì kích hoạt lại một lần.
+#
+# Pool ghi nhớ các mức vừa đặt để callback thay đổi âm lượng (volume_learning) nhận ra
+# thay đổi do chính VolumeSetter gây ra.
+import logging
+import threading
+import time
+from collections import deque
+
+import device_events
+import windows_audio
+from metrics import metrics
+from trace_recorder import tracer
+
+OWN_WRITE_WINDOW = 1.0      # giây callback có thể đến sau lần đặt âm lượng của mình
+OWN_WRITE_TOLERANCE = 0.01  # sai số làm tròn mức (float32 của Windows, số nguyên của PulseAudio)
+
+
+class VolumeHandlePool:
+    #   activate(device_id) -> đối tượng có SetMasterVolumeLevelScalar/GetMasterVolumeLevelScalar
+    # Interface COM gắn với apartment của luồng đã tạo nó nên handle được giữ theo từng luồng.
+    def __init__(self, activate, clock=time.monotonic):
+        self._activate = activate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._handles = {}  # (thread_id, device_id) -> handle
+        self._writes = {}   # device_id -> deque((thời điểm, mức)) các lần đặt gần nhất
+        self.activations = 0
+
+    def get(self, device_id):
+        key = (threading.get_ident(), device_id)
+        handle = self._handles.get(key)
+        if handle is None:
+            with metrics.timer("com_call", op="activate"):
+                handle = self._activate(device_id)
+            with self._lock:
+                self._handles[key] = handle
+                self.activations += 1
+        return handle
+
+    def invalidate(self, device_id=None):
+        with self._lock:
+            if device_id is None:
+                self._handles.clear()
+            else:
+                for key in [k for k in self._handles if k[1] == device_id]:
+                    del self._handles[key]
+
+    def on_event(self, event):
+        if event.kind in (device_events.DEVICE_REMOVED, device_events.STATE_CHANGED, device_events.DEVICE_ADDED):
+            self.invalidate(event.device_id)
+
+    def _call(self, device_id, method, *args):
+        try:
+            return getattr(self.get(device_id), method)(*args)
+        except Exception as e:
+            # Handle cũ có thể đã hỏng (AUDCLNT_E_DEVICE_INVALIDATED): kích hoạt lại một lần
+            logging.debug("VolumeHandlePool: Kích hoạt lại handle cho %s sau lỗi: %s", device_id, e)
+            self.invalidate(device_id)
+            return getattr(self.get(device_id), method)(*args)
+
+    def set_volume(self, device_id, level):
+        # Ghi nhận trước khi gọi: callback có thể đến ngay trong lời gọi
+        with self._lock:
+            self._writes.setdefault(device_id, deque(maxlen=4)).append((self.clock(), level))
+        tracer.record("set_volume", device=device_id, level=level)
+        with metrics.timer("com_call", op="set_volume"):
+            self._call(device_id, "SetMasterVolumeLevelScalar", level, None)
+
+    def is_own_write(self, device_id, level, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            writes = list(self._writes.get(device_id, ()))
+        return any(now - at <= OWN_WRITE_WINDOW and abs(level - written) <= OWN_WRITE_TOLERANCE
+                   for at, written in writes)
+
+    def get_volume(self, device_id):
+        with metrics.timer("com_call", op="get_volume"):
+            return self._call(device_id, "GetMasterVolumeLevelScalar")
+
+
+volume_pool = VolumeHandlePool(windows_audio.activate_endpoint_volume)
+
+
+# === API đặt âm lượng theo thiết bị ===
+def set_volume(device_id, level):
+    try:
+        volume_pool.set_volume(device_id, level)
+        logging.info("set_volume: Đã đặt âm lượng %s cho endpoint %s", level, device_id)
+        return True
+    except Exception as e:
+        logging.error("set_volume: Lỗi khi đặt âm lượng cho endpoint %s: %s", device_id, e)
+        return False
+
+
+def get_volume(device_id):
+    try:
+        return volume_pool.get_volume(device_id)
+    except Exception as e:
+        logging.error("get_volume: Lỗi khi đọc âm lượng endpoint %s: %s", device_id, e)
+        return None
+
+
+def set_volumes(levels):
+    # Cập nhật nhiều thiết bị một lượt: {device_id: level} -> {device_id: True/False}
+    return {device_id: set_volume(device_id, level) for device_id, level in levels.items()}
+
+
+def ramp_volume(device_id, target, duration=0.5, steps=10, start=None):
+    # Tăng/giảm dần âm lượng tới target trong duration giây
+    if start is None:
+        start = get_volume(device_id)
+        if start is None:
+            return False
+    for i in range(1, steps + 1):
+        if not set_volume(device_id, start + (target - start) * i / steps):
+            return False
+        if i < steps:
+            time.sleep(duration / steps)
+    return True
@@ -0,0 +1,90 @@
+# === Theo dõi thay đổi âm lượng & tự học mức của người dùng ===
+# Khi người dùng chỉnh âm lượng bằng phím, bánh xe chuột hay flyout của Windows, mức mới
+# được lưu cho thiết bị (và ngữ cảnh đang áp dụng) như khi bấm "Áp dụng & Lưu". Thay đổi
+# đến từ callback của endpoint (IAudioEndpointVolumeCallback, sự kiện 'change' của sink
+# PulseAudio), không poll GetMasterVolumeLevelScalar.
+#
+# Callback chỉ ghi mức mới nhất vào hàng chờ (debounce.Debouncer) rồi trả về ngay. Một
+# thiết bị chỉ được lưu sau khi yên DEBOUNCE giây (tối đa MAX_DELAY giây nếu người dùng kéo
+# liên tục), nên một lần lăn chuột 2 giây bắn hàng trăm callback chỉ cho một lần ghi cấu
+# hình. Thay đổi do chính VolumeSetter đặt (is_own_write) bị bỏ qua để không tự học lại mức
+# vừa áp dụng.
+import time
+
+from debounce import Debouncer
+from metrics import metrics
+from trace_recorder import tracer
+
+DEBOUNCE = 2.0     # giây
+MAX_DELAY = 10.0   # giây
+MIN_DELTA = 0.005  # thay đổi nhỏ hơn (làm tròn, chỉ đổi mute) không tính
+
+
+class VolumeLearner(Debouncer):
+    #   save(device_id, level): lưu mức đã học, chạy trên luồng của learner
+    #   is_own_write(device_id, level) -> True nếu mức này do VolumeSetter vừa đặt
+    #   clock(): nguồn thời gian, thay được khi kiểm thử
+    def __init__(self, save, is_own_write=None, debounce=DEBOUNCE, max_delay=MAX_DELAY,
+                 min_delta=MIN_DELTA, clock=time.monotonic, autostart=True):
+        super().__init__(debounce, max_delay, clock=clock, autostart=autostart, name="VolumeLearner")
+        self.save = save
+        self.is_own_write = is_own_write
+        self.min_delta = min_delta
+        self._levels = {}   # device_id -> mức mốc (đã học, lúc bắt đầu theo dõi, hoặc do mình đặt)
+        self.changes = 0    # số callback nhận được
+        self.ignored = 0    # số thay đổi do chính VolumeSetter đặt
+        self.saved = 0      # số lần lưu mức đã học
+
+    def observe(self, device_id, level):
+        # Mức hiện tại lúc bắt đầu theo dõi: làm mốc, không học
+        with self._cond:
+            self._levels[device_id] = level
+
+    def forget(self, device_id):
+        with self._cond:
+            self._levels.pop(device_id, None)
+            self.cancel(device_id)
+
+    def on_change(self, device_id, level, muted=False):
+        # Gọi từ luồng callback của hệ thống: không gọi COM, không ghi file
+        own = self.is_own_write is not None and self.is_own_write(device_id, level)
+        tracer.record("volume_change", device=device_id, level=level, own=own)
+        with self._cond:
+            self.changes += 1
+            if own:
+                # Mức do VolumeSetter áp dụng thay cho lần kéo đang chờ của người dùng
+                self.ignored += 1
+                self._levels[device_id] = level
+                self.cancel(device_id)
+                return False
+            if not self.is_pending(device_id):
+                # So với mốc chứ không với callback trước: lăn chậm từng bước nhỏ vẫn được tính
+                baseline = self._levels.get(device_id)
+                if baseline is not None and abs(level - baseline) < self.min_delta:
+                    return False
+            self.put(device_id, level)
+        return True
+
+    def take_due(self, now=None):
+        with self._cond:
+            taken = super().take_due(now)
+            for device_id, level in taken:
+                self._levels[device_id] = level
+            return taken
+
+    def handle(self, device_id, level):
+        return self.save(device_id, level)
+
+    def process(self, now=None):
+        saved = super().process(now)
+        if saved:
+            with self._cond:
+                self.saved += saved
+            metrics.inc("volume_learned", saved)
+        return saved
+
+    def stop(self, flush=True):
+        # Lưu nốt các mức đang chờ (người dùng vừa chỉnh rồi thoát ngay)
+        super().stop()
+        if flush:
+            self.process(float("inf"))
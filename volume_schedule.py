@@ -0,0 +1,265 @@
+# === Lịch âm lượng theo giờ (vd. giờ yên tĩnh) ===
+# Luật trong schedule_rules.json giới hạn mức âm lượng theo khung giờ trong tuần:
+#   [{"name": "Giờ yên tĩnh", "days": ["mon", "tue", "wed", "thu", "fri"],
+#     "from": "22:00", "to": "07:00", "max": 0.2}]
+# Khung giờ qua nửa đêm thuộc về ngày bắt đầu. "devices" (tùy chọn) liệt kê tên thiết bị
+# (micro dùng khóa "capture:<tên>"); không có thì áp dụng cho mọi loa. "min"/"max" là
+# giới hạn dưới/trên của mức đã lưu; hết khung giờ thì mức đã lưu được áp dụng lại.
+#
+# Không lấy mẫu định kỳ: mốc bắt đầu/kết thúc tiếp theo của từng luật nằm trong một
+# heap, luồng lịch ngủ tới mốc gần nhất, xử lý mọi luật đến hạn rồi tính lại giới hạn
+# hiệu lực đúng một lần cho mốc đó. Mốc là giờ địa phương (không phải đồng hồ monotonic)
+# và luồng thức dậy ít nhất mỗi MAX_SLEEP giây, nên máy ngủ qua một mốc hay đồng hồ bị
+# chỉnh lùi/tiến vẫn cho kết quả đúng: mốc đã qua được xử lý theo giờ hiện tại, đồng hồ
+# lùi thì dựng lại heap.
+import heapq
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from config_store import CAPTURE_PREFIX
+
+RULES_FILE = "schedule_rules.json"
+MAX_SLEEP = 60.0       # giây, thức dậy kiểm tra đồng hồ dù chưa tới mốc
+CLOCK_TOLERANCE = 2.0  # giây, đồng hồ lùi quá mức này thì dựng lại lịch
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# days: tập thứ trong tuần (0 = thứ Hai); start/end: phút tính từ 0:00;
+# devices: tuple khóa thiết bị hoặc None (mọi loa)
+ScheduleRule = namedtuple("ScheduleRule", "name days start end min_level max_level devices")
+
+
+def get_rules_path():
+    return os.path.join(os.getenv("APPDATA"), "VolumeSetter", RULES_FILE)
+
+
+def _parse_minutes(text):
+    hours, _, minutes = str(text).partition(":")
+    value = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"Giờ không hợp lệ: {text}")
+    return value % (24 * 60)
+
+
+def parse_rule(data, index=0):
+    days = data.get("days") or DAY_NAMES
+    devices = data.get("devices")
+    rule = ScheduleRule(
+        name=data.get("name") or f"rule-{index}",
+        days=frozenset(DAY_NAMES.index(str(day).lower()[:3]) for day in days),
+        start=_parse_minutes(data["from"]),
+        end=_parse_minutes(data["to"]),
+        min_level=float(data.get("min", 0.0)),
+        max_level=float(data.get("max", 1.0)),
+        devices=tuple(devices) if devices else None,
+    )
+    if not 0 <= rule.min_level <= rule.max_level <= 1:
+        raise ValueError(f"Giới hạn không hợp lệ: min {rule.min_level}, max {rule.max_level}")
+    return rule
+
+
+def load_schedule_rules(path=None):
+    # Không có file thì không có lịch (không tạo luật mẫu để tránh tự giới hạn âm lượng)
+    path = path or get_rules_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logging.debug("load_schedule_rules: Chưa có file lịch âm lượng: %s", path)
+        return []
+    except Exception as e:
+        logging.error("load_schedule_rules: Lỗi đọc file lịch âm lượng: %s", e)
+        return []
+    rules = []
+    for index, item in enumerate(data):
+        try:
+            rules.append(parse_rule(item, index))
+        except (KeyError, ValueError, TypeError) as e:
+            logging.error("load_schedule_rules: Bỏ luật %s không hợp lệ: %s", index, e)
+    return rules
+
+
+# === Khung giờ của một luật ===
+def _windows(rule, day):
+    # Khung giờ bắt đầu vào ngày `day` (date) nếu luật áp dụng cho thứ đó
+    if day.weekday() not in rule.days:
+        return None
+    start = datetime(day.year, day.month, day.day) + timedelta(minutes=rule.start)
+    length = (rule.end - rule.start) % (24 * 60) or 24 * 60
+    return start, start + timedelta(minutes=length)
+
+
+def is_active(rule, now):
+    for offset in (-1, 0):
+        window = _windows(rule, now.date() + timedelta(days=offset))
+        if window is not None and window[0] <= now < window[1]:
+            return True
+    return False
+
+
+def next_boundary(rule, now):
+    # Mốc bắt đầu/kết thúc đầu tiên sau `now` (trong vòng tám ngày), None nếu luật rỗng
+    best = None
+    for offset in range(-1, 8):
+        window = _windows(rule, now.date() + timedelta(days=offset))
+        if window is None:
+            continue
+        for moment in window:
+            if moment > now and (best is None or moment < best):
+                best = moment
+        if best is not None and window[0] > now:
+            break  # các ngày sau chỉ cho mốc muộn hơn
+    return best
+
+
+class VolumeSchedule:
+    #   rules: danh sách ScheduleRule
+    #   on_change(limits): gọi trên luồng lịch khi giới hạn hiệu lực thay đổi
+    #   now(): giờ địa phương hiện tại (datetime), thay được khi kiểm thử/benchmark
+    def __init__(self, rules, on_change=None, now=datetime.now, max_sleep=MAX_SLEEP):
+        self.rules = list(rules)
+        self.on_change = on_change
+        self.now = now
+        self.max_sleep = max_sleep
+        self._cond = threading.Condition()
+        self._heap = []        # (mốc, chỉ số luật)
+        self._active = set()   # chỉ số luật đang hiệu lực
+        self._last_now = None
+        self.limits = {}       # khóa thiết bị (None = mọi loa) -> (min, max)
+        self.boundaries = 0    # số mốc đã xử lý
+        self.evaluations = 0   # số lần tính lại giới hạn
+        self.resyncs = 0       # số lần dựng lại lịch (khởi động, đồng hồ lùi)
+        self._stopped = False
+        self._thread = None
+        self.resync()
+
+    # --- Giới hạn hiệu lực ---
+    def _compute_limits(self):
+        self.evaluations += 1
+        limits = {}
+        for index in self._active:
+            rule = self.rules[index]
+            for key in rule.devices or (None,):
+                low, high = limits.get(key, (0.0, 1.0))
+                limits[key] = (max(low, rule.min_level), min(high, rule.max_level))
+        return limits
+
+    def limits_for(self, device_key):
+        # Chỉ tra bảng đã tính sẵn ở mốc gần nhất, không duyệt luật
+        limits = self.limits
+        low, high = limits.get(device_key, (0.0, 1.0))
+        if not str(device_key).startswith(CAPTURE_PREFIX) and None in limits:
+            low = max(low, limits[None][0])
+            high = min(high, limits[None][1])
+        return low, high
+
+    def clamp(self, device_key, level):
+        if not self.limits:
+            return level
+        low, high = self.limits_for(device_key)
+        return min(max(level, low), high)
+
+    def active_rules(self):
+        with self._cond:
+            return sorted(self.rules[index].name for index in self._active)
+
+    # --- Heap mốc ---
+    def resync(self, now=None):
+        # Tính lại toàn bộ từ giờ hiện tại: lúc khởi động và khi đồng hồ bị chỉnh lùi
+        now = self.now() if now is None else now
+        with self._cond:
+            self.resyncs += 1
+            self._active = {i for i, rule in enumerate(self.rules) if is_active(rule, now)}
+            self._heap = []
+            for index, rule in enumerate(self.rules):
+                moment = next_boundary(rule, now)
+                if moment is not None:
+                    self._heap.append((moment, index))
+            heapq.heapify(self._heap)
+            self._last_now = now
+            self._cond.notify()
+        return self._update_limits()
+
+    def next_due(self):
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def process(self, now=None):
+        # Xử lý mọi mốc đã đến hạn; trả về True nếu giới hạn hiệu lực thay đổi
+        now = self.now() if now is None else now
+        with self._cond:
+            clock_went_back = self._last_now is not None and \
+                (self._last_now - now).total_seconds() > CLOCK_TOLERANCE
+            if not clock_went_back:
+                self._last_now = now
+                changed = False
+                while self._heap and self._heap[0][0] <= now:
+                    _, index = heapq.heappop(self._heap)
+                    rule = self.rules[index]
+                    self.boundaries += 1
+                    # Theo giờ hiện tại chứ không theo mốc: ngủ qua nhiều mốc vẫn đúng
+                    active = is_active(rule, now)
+                    if active != (index in self._active):
+                        changed = True
+                        (self._active.add if active else self._active.discard)(index)
+                    moment = next_boundary(rule, now)
+                    if moment is not None:
+                        heapq.heappush(self._heap, (moment, index))
+                if not changed:
+                    return False
+        if clock_went_back:
+            logging.info("VolumeSchedule: Đồng hồ hệ thống bị chỉnh lùi, dựng lại lịch")
+            return self.resync(now)
+        return self._update_limits()
+
+    def _update_limits(self):
+        with self._cond:
+            limits = self._compute_limits()
+            if limits == self.limits:
+                return False
+            self.limits = limits
+        logging.info("VolumeSchedule: Luật đang hiệu lực: %s", self.active_rules() or "không có")
+        if self.on_change is not None:
+            try:
+                self.on_change(limits)
+            except Exception as e:
+                logging.error("VolumeSchedule: Lỗi khi áp dụng giới hạn mới: %s", e)
+        return True
+
+    # --- Luồng lịch ---
+    def start(self):
+        if not self.rules:
+            logging.info("VolumeSchedule: Không có luật lịch âm lượng, không khởi động")
+            return False
+        with self._cond:
+            if self._thread is not None:
+                return True
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="VolumeSchedule", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    due = self.next_due()
+                    delay = self.max_sleep if due is None else (due - self.now()).total_seconds()
+                    if delay <= 0:
+                        break
+                    if not self._cond.wait(min(delay, self.max_sleep)):
+                        break  # hết thời gian chờ: xem lại đồng hồ (máy ngủ, giờ bị chỉnh)
+                if self._stopped:
+                    return
+            try:
+                self.process()
+            except Exception as e:
+                logging.error("VolumeSchedule: Lỗi khi xử lý lịch âm lượng: %s", e)
@@ -0,0 +1,246 @@
+# === Lớp truy cập Core Audio (COM) của Windows ===
+# Gom các lời gọi pycaw/comtypes cấp thấp vào một chỗ. pycaw chỉ được import
+# bên trong hàm để các module khác (registry, monitor...) vẫn import được ngoài Windows.
+import logging
+import threading
+
+from device_registry import EndpointRecord, ROLES, FLOWS
+
+PKEY_FRIENDLY_NAME_FMTID = "{a45c254e-df1c-4efd-8020-67d146a850e0}"
+PKEY_FRIENDLY_NAME_PID = 14
+DEVICE_STATE_MASK_ALL = 0x0000000F
+
+_local = threading.local()
+
+
+def get_device_enumerator():
+    # Mỗi luồng COM giữ một IMMDeviceEnumerator riêng, tạo một lần
+    enumerator = getattr(_local, "enumerator", None)
+    if enumerator is None:
+        from pycaw.pycaw import AudioUtilities
+        enumerator = AudioUtilities.GetDeviceEnumerator()
+        _local.enumerator = enumerator
+    return enumerator
+
+
+def _friendly_name_key():
+    key = getattr(_local, "friendly_name_key", None)
+    if key is None:
+        from comtypes import GUID
+        from pycaw.api.mmdeviceapi.depend.structures import PROPERTYKEY
+        key = PROPERTYKEY()
+        key.fmtid = GUID(PKEY_FRIENDLY_NAME_FMTID)
+        key.pid = PKEY_FRIENDLY_NAME_PID
+        _local.friendly_name_key = key
+    return key
+
+
+def read_friendly_name(dev):
+    # Chỉ đọc đúng một thuộc tính thay vì cả property store như AudioUtilities.CreateDevice
+    try:
+        store = dev.OpenPropertyStore(0)  # STGM_READ
+        value = store.GetValue(_friendly_name_key())
+        name = value.GetValue()
+        value.clear()
+        return name
+    except Exception as e:
+        logging.debug("read_friendly_name: Không đọc được FriendlyName: %s", e)
+        return None
+
+
+def _make_record(dev, flow):
+    return EndpointRecord(dev.GetId(), read_friendly_name(dev), dev.GetState(), flow)
+
+
+def enumerate_endpoints():
+    # Một lượt duyệt: mọi endpoint của từng flow + thiết bị mặc định của từng role
+    enumerator = get_device_enumerator()
+    records = []
+    for flow in FLOWS:
+        collection = enumerator.EnumAudioEndpoints(flow, DEVICE_STATE_MASK_ALL)
+        if collection is None:
+            continue
+        for i in range(collection.GetCount()):
+            dev = collection.Item(i)
+            if dev is not None:
+                records.append(_make_record(dev, flow))
+
+    defaults = {}
+    for flow in FLOWS:
+        for role in ROLES:
+            try:
+                defaults[(flow, role)] = enumerator.GetDefaultAudioEndpoint(flow, role).GetId()
+            except Exception:
+                # Không có thiết bị mặc định cho flow/role này (vd. không có micro)
+                pass
+    return records, defaults
+
+
+def read_endpoint(device_id):
+    from pycaw.pycaw import IMMEndpoint
+    dev = get_device_enumerator().GetDevice(device_id)
+    flow = dev.QueryInterface(IMMEndpoint).GetDataFlow()
+    return _make_record(dev, flow)
+
+
+def activate_endpoint_volume(device_id):
+    # IAudioEndpointVolume của một endpoint cụ thể (không chỉ loa mặc định)
+    from comtypes import CLSCTX_ALL
+    from pycaw.pycaw import IAudioEndpointVolume
+    dev = get_device_enumerator().GetDevice(device_id)
+    interface = dev.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+    return interface.QueryInterface(IAudioEndpointVolume)
+
+
+def watch_endpoint_volume(device_id, on_change):
+    # Đăng ký IAudioEndpointVolumeCallback trên endpoint: Windows gọi OnNotify (trên luồng
+    # của nó) mỗi khi mức/mute đổi, kể cả từ phím âm lượng và flyout. Trả về hàm hủy đăng ký.
+    from pycaw.callbacks import AudioEndpointVolumeCallback
+
+    class VolumeChanged(AudioEndpointVolumeCallback):
+        def on_notify(self, new_volume, new_mute, event_context, channels, channel_volumes):
+            on_change(device_id, new_volume, bool(new_mute))
+
+    volume = activate_endpoint_volume(device_id)  # handle riêng, giữ tới khi hủy đăng ký
+    callback = VolumeChanged()
+    volume.RegisterControlChangeNotify(callback)
+
+    def unwatch():
+        volume.UnregisterControlChangeNotify(callback)
+
+    return unwatch
+
+
+def co_initialize():
+    from comtypes import CoInitialize
+    CoInitialize()
+
+
+def co_initialize_mta():
+    # Thông báo session (IAudioSessionNotification) chỉ được gửi tới apartment MTA
+    from comtypes import COINIT_MULTITHREADED, CoInitializeEx
+    CoInitializeEx(COINIT_MULTITHREADED)
+
+
+# === Audio session của từng endpoint ===
+def watch_sessions(device_id, on_created, on_expired):
+    # Đăng ký OnSessionCreated trên IAudioSessionManager2 của endpoint rồi liệt kê một lần
+    # các session đang có (lần gọi GetSessionEnumerator này cũng là điều kiện để Windows
+    # bắt đầu gửi thông báo). Trả về hàm hủy đăng ký.
+    from comtypes import CLSCTX_ALL
+    from pycaw.callbacks import AudioSessionEvents, AudioSessionNotification
+    from pycaw.pycaw import AudioSession, IAudioSessionControl2, IAudioSessionManager2
+
+    sessions = {}  # key -> AudioSession (giữ tham chiếu để callback không bị thu hồi)
+
+    class SessionEvents(AudioSessionEvents):
+        def __init__(self, key):
+            super().__init__()
+            self.key = key
+
+        def on_state_changed(self, new_state, new_state_id):
+            if new_state == "Expired":
+                forget(self.key)
+
+        def on_session_disconnected(self, disconnect_reason, disconnect_reason_id):
+            forget(self.key)
+
+    def forget(key):
+        session = sessions.pop(key, None)
+        if session is not None:
+            try:
+                session.unregister_notification()
+            except Exception:
+                pass
+            on_expired(key)
+
+    def add(session):
+        key = session.InstanceIdentifier
+        if key in sessions:
+            return
+        sessions[key] = session
+        session.register_notification(SessionEvents(key))
+        on_created(key, session.ProcessId, session.SimpleAudioVolume)
+
+    class SessionCreated(AudioSessionNotification):
+        def on_session_created(self, new_session):
+            # Callback nhận IAudioSessionControl thô: bọc lại như khi liệt kê session
+            try:
+                add(AudioSession(new_session.QueryInterface(IAudioSessionControl2)))
+            except Exception as e:
+                logging.warning("watch_sessions: Không đọc được session mới: %s", e)
+
+    dev = get_device_enumerator().GetDevice(device_id)
+    mgr = dev.Activate(IAudioSessionManager2._iid_, CLSCTX_ALL, None).QueryInterface(IAudioSessionManager2)
+    notification = SessionCreated()
+    mgr.RegisterSessionNotification(notification)
+
+    enumerator = mgr.GetSessionEnumerator()
+    for i in range(enumerator.GetCount()):
+        ctl = enumerator.GetSession(i)
+        if ctl is not None:
+            add(AudioSession(ctl.QueryInterface(IAudioSessionControl2)))
+
+    def unwatch():
+        mgr.UnregisterSessionNotification(notification)
+        for session in sessions.values():
+            try:
+                session.unregister_notification()
+            except Exception:
+                pass
+        sessions.clear()
+
+    return unwatch
+
+
+# === IPolicyConfig (API không công khai dùng để đổi thiết bị mặc định) ===
+CLSID_POLICY_CONFIG = "{870af99c-171d-4f9e-af0d-e63df40c2bc9}"
+IID_POLICY_CONFIG = "{f8679f50-850a-41cf-9c72-430f290290c8}"
+
+_policy_config_interface = None
+
+
+def _get_policy_config_interface():
+    # Định nghĩa interface một lần cho cả tiến trình (thứ tự vtable phải đúng như Windows)
+    global _policy_config_interface
+    if _policy_config_interface is None:
+        from ctypes import HRESULT, c_int, c_void_p
+        from ctypes.wintypes import LPCWSTR
+        from comtypes import GUID, IUnknown, STDMETHOD
+
+        class IPolicyConfig(IUnknown):
+            _iid_ = GUID(IID_POLICY_CONFIG)
+            _methods_ = [
+                STDMETHOD(HRESULT, "GetMixFormat", [LPCWSTR, c_void_p]),
+                STDMETHOD(HRESULT, "GetDeviceFormat", [LPCWSTR, c_int, c_void_p]),
+                STDMETHOD(HRESULT, "ResetDeviceFormat", [LPCWSTR]),
+                STDMETHOD(HRESULT, "SetDeviceFormat", [LPCWSTR, c_void_p, c_void_p]),
+                STDMETHOD(HRESULT, "GetProcessingPeriod", [LPCWSTR, c_int, c_void_p, c_void_p]),
+                STDMETHOD(HRESULT, "SetProcessingPeriod", [LPCWSTR, c_void_p]),
+                STDMETHOD(HRESULT, "GetShareMode", [LPCWSTR, c_void_p]),
+                STDMETHOD(HRESULT, "SetShareMode", [LPCWSTR, c_void_p]),
+                STDMETHOD(HRESULT, "GetPropertyValue", [LPCWSTR, c_int, c_void_p, c_void_p]),
+                STDMETHOD(HRESULT, "SetPropertyValue", [LPCWSTR, c_int, c_void_p, c_void_p]),
+                STDMETHOD(HRESULT, "SetDefaultEndpoint", [LPCWSTR, c_int]),
+                STDMETHOD(HRESULT, "SetEndpointVisibility", [LPCWSTR, c_int]),
+            ]
+
+        _policy_config_interface = IPolicyConfig
+    return _policy_config_interface
+
+
+def get_policy_config():
+    # Đối tượng PolicyConfig được tạo một lần cho mỗi luồng COM
+    policy_config = getattr(_local, "policy_config", None)
+    if policy_config is None:
+        from comtypes import CLSCTX_ALL, GUID, CoCreateInstance
+        policy_config = CoCreateInstance(GUID(CLSID_POLICY_CONFIG), _get_policy_config_interface(), CLSCTX_ALL)
+        _local.policy_config = policy_config
+    return policy_config
+
+
+def set_default_endpoint(device_id, roles=ROLES):
+    # Đặt thiết bị mặc định cho cả ba ERole (Console, Multimedia, Communications)
+    policy_config = get_policy_config()
+    for role in roles:
+        policy_config.SetDefaultEndpoint(device_id, role)